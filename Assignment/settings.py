@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 import dj_database_url
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -36,9 +37,10 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'main_app.metrics.RequestMetricsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'main_app.backends.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -47,7 +49,8 @@ ROOT_URLCONF = 'Assignment.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django templates, with render time reported to the request metrics.
+        'BACKEND': 'main_app.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -74,12 +77,90 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The "roster" cache holds rendered roster pages. Use a FileBasedCache
+# (ROSTER_CACHE_LOCATION is then a directory) to share it between workers.
+# The default cache also holds logged-in users, but only once
+# CACHE_BACKEND/CACHE_LOCATION point at a cache shared by every worker
+# (Redis, Memcached, a database or file cache): a process-local copy would
+# let other workers keep serving a user after a logout or a role change.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+    'roster': {
+        'BACKEND': os.environ.get('ROSTER_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('ROSTER_CACHE_LOCATION', 'roster'),
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('ROSTER_CACHE_MAX_ENTRIES', 1000)),
+            'CULL_FREQUENCY': 4,
+        },
+    },
+}
+ROSTER_CACHE_ALIAS = 'roster'
+
+# Sessions are stored in the database, so a logout ends the session for
+# every worker. With a shared cache configured, sessions are also read
+# through it and the logged-in user is cached for a few minutes, saving both
+# queries on each page view; a process-local cache would let other workers
+# keep serving a session or a user after it has gone.
+SHARED_CACHE = bool(os.environ.get('CACHE_BACKEND'))
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.cached_db' if SHARED_CACHE
+    else 'django.contrib.sessions.backends.db'
+)
+AUTH_USER_CACHE_ALIAS = 'default' if SHARED_CACHE else None
+AUTH_USER_CACHE_TIMEOUT = 5 * 60
+
+# Shift types, tasks and committees are kept in each process's memory. A
+# worker notices an edit made by another worker within this many seconds.
+CATALOG_CHECK_SECONDS = int(os.environ.get('CATALOG_CHECK_SECONDS', 5))
+
+
+# Background jobs
+# Long bulk operations are queued in the database and run by
+# `python manage.py run_jobs`. Set JOB_QUEUE_EAGER=1 to run them in-process
+# right after the request commits (single-process development only).
+
+JOB_QUEUE_EAGER = os.environ.get('JOB_QUEUE_EAGER') == '1'
+JOB_QUEUE_STALE_SECONDS = 30 * 60
+
+
+# Daily schedule PDFs
+# Rendered PDFs are kept on disk, named by a hash of their HTML, and the
+# least recently used files are removed once the directory exceeds the cap.
+
+PDF_CACHE_DIR = Path(os.environ.get('PDF_CACHE_DIR', Path(tempfile.gettempdir()) / 'roster_pdf_cache'))
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+
+# Files produced by export jobs, removed once older than EXPORT_MAX_AGE
+# seconds, and the processes used to render PDF ranges (defaults to one per
+# CPU).
+EXPORT_DIR = Path(os.environ.get('EXPORT_DIR', Path(tempfile.gettempdir()) / 'roster_exports'))
+EXPORT_MAX_AGE = int(os.environ.get('EXPORT_MAX_AGE', 7 * 24 * 60 * 60))
+PDF_EXPORT_WORKERS = int(os.environ.get('PDF_EXPORT_WORKERS', 0)) or None
+
+
+# Request metrics
+# Per-view timing and query histograms, served to managers at /metrics/ in
+# the Prometheus text format. Requests slower than METRICS_SLOW_REQUEST_MS
+# are logged with their most repeated SQL.
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+METRICS_SLOW_REQUEST_MS = int(os.environ.get('METRICS_SLOW_REQUEST_MS', 0)) or None
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 AUTH_USER_MODEL = 'main_app.User'
+# PhoneOrUsernameBackend also covers plain usernames, so a failed login
+# runs the password hasher once instead of once per backend.
 AUTHENTICATION_BACKENDS = [
-    'main_app.backends.PhoneOrUsernameBackend', # Your custom backend
-    'django.contrib.auth.backends.ModelBackend',      # The default backend
+    'main_app.backends.PhoneOrUsernameBackend',
 ]
 AUTH_PASSWORD_VALIDATORS = [
     {
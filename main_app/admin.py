@@ -2,7 +2,7 @@
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Committee, User, Shift, ShiftType, Assignment, SubAssignment, Clinic, EmergencyRole, Rotation, RotationDay, MonthlyTask, MonthlyAssignment, AssignmentGroup
+from .models import Committee, User, Shift, ShiftType, Assignment, SubAssignment, Clinic, EmergencyRole, Rotation, RotationDay, MonthlyTask, MonthlyAssignment, AssignmentGroup, Job
 
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'first_name', 'last_name', 'role', 'phone_number','assignment_group', 'is_active')
@@ -27,6 +27,11 @@ class MonthlyAssignmentAdmin(admin.ModelAdmin):
     list_filter = ('group', 'committee', 'staff', 'task', 'start_date', 'status') 
     search_fields = ('staff__first_name', 'staff__last_name', 'task__name', 'group__name', 'committee__name')
 
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'kind', 'status', 'progress', 'total', 'attempts', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('created_at', 'finished_at', 'locked_by', 'locked_at')
+
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Shift)
 admin.site.register(ShiftType)
@@ -38,4 +43,5 @@ admin.site.register(Rotation, RotationAdmin)
 admin.site.register(MonthlyTask)
 admin.site.register(MonthlyAssignment, MonthlyAssignmentAdmin)
 admin.site.register(AssignmentGroup) # Register new model
-admin.site.register(Committee)
\ No newline at end of file
+admin.site.register(Committee)
+admin.site.register(Job, JobAdmin)
\ No newline at end of file
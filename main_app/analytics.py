@@ -0,0 +1,269 @@
+# In main_app/analytics.py
+
+import calendar
+import datetime
+from collections import Counter, namedtuple
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import Count, Q, Sum
+
+from .catalogs import catalog
+from .models import AssignmentStatus, MonthlyAssignment, Shift, WorkloadRollup
+from .rollups import rollup_counts
+from .roster import SHIFT_TASK_FIELDS
+
+Kind = WorkloadRollup.Kind
+
+# Length in months of each reporting period offered on the analytics pages.
+PERIOD_MONTHS = {"month": 1, "quarter": 3, "year": 12}
+
+Period = namedtuple("Period", "name start end label previous next")
+
+
+def resolve_period(year, month, name="month"):
+    """Return the month, quarter or year containing ``year``/``month``.
+
+    ``previous`` and ``next`` are the first days of the neighbouring periods,
+    for the page's navigation links. Unknown names fall back to a month.
+    """
+    if name not in PERIOD_MONTHS:
+        name = "month"
+    length = PERIOD_MONTHS[name]
+    first_month = month - (month - 1) % length
+    start = datetime.date(year, first_month, 1)
+    end = start + relativedelta(months=length, days=-1)
+
+    if name == "year":
+        label = str(year)
+    elif name == "quarter":
+        label = f"Q{(first_month - 1) // 3 + 1} {year}"
+    else:
+        label = f"{calendar.month_name[month]} {year}"
+    return Period(
+        name,
+        start,
+        end,
+        label,
+        start - relativedelta(months=length),
+        start + relativedelta(months=length),
+    )
+
+
+def split_range(start_date, end_date):
+    """Split a date range into its whole months and the days left at each end.
+
+    Returns ``(months, edges)``: ``months`` is ``(first month, last month)``
+    as first-of-month dates, or None when no whole month fits; ``edges`` is a
+    list of ``(start, end)`` day ranges outside those months.
+    """
+    first_month = start_date.replace(day=1)
+    if first_month != start_date:
+        first_month += relativedelta(months=1)
+    last_month = end_date.replace(day=1)
+    if end_date != last_month + relativedelta(months=1, days=-1):
+        last_month -= relativedelta(months=1)
+    if first_month > last_month:
+        return None, [(start_date, end_date)]
+
+    edges = []
+    if start_date < first_month:
+        edges.append((start_date, first_month - datetime.timedelta(days=1)))
+    after_last_month = last_month + relativedelta(months=1)
+    if end_date >= after_last_month:
+        edges.append((after_last_month, end_date))
+    return (first_month, last_month), edges
+
+
+def _shift_counts(staff, ranges):
+    """Count shift types, statuses and task links over day ranges, from the shifts."""
+    def in_ranges(prefix=""):
+        condition = Q()
+        for start_date, end_date in ranges:
+            condition |= Q(**{f"{prefix}date__range": (start_date, end_date)})
+        return condition
+
+    counts = Counter()
+    rows = (
+        Shift.objects.filter(in_ranges(), staff=staff)
+        .values_list("shift_type_id", "status")
+        .annotate(total=Count("pk"))
+        .order_by()
+    )
+    for shift_type_id, status, total in rows:
+        counts[(Kind.SHIFT_TYPE.value, str(shift_type_id))] += total
+        counts[(Kind.STATUS.value, status)] += total
+
+    for task_type, field_name in SHIFT_TASK_FIELDS.items():
+        field = Shift._meta.get_field(field_name)
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        rows = (
+            field.remote_field.through.objects.filter(
+                in_ranges(f"{source}__"), **{f"{source}__staff": staff}
+            )
+            .values_list(f"{target}_id")
+            .annotate(total=Count("pk"))
+            .order_by()
+        )
+        for task_id, total in rows:
+            counts[(task_type, str(task_id))] += total
+    return counts
+
+
+def workload_counts(staff, start_date, end_date):
+    """Count a staff member's shifts by shift type, task and status.
+
+    Whole months are read from the WorkloadRollup table in one query; only
+    the partial months at either end of the range touch the shift tables.
+    Returns ``{(kind, key): count}`` with the keys used by WorkloadRollup.
+    """
+    months, edges = split_range(start_date, end_date)
+    counts = rollup_counts(staff, *months) if months else Counter()
+    if edges:
+        counts.update(_shift_counts(staff, edges))
+    return counts
+
+
+def staff_activity_counts(staff, start_date, end_date):
+    """Name the workload counts of a staff member for the analytics page.
+
+    Returns ``{"shift_types", "main", "sub", "clinic", "emergency",
+    "monthly_tasks"}``, each a Counter keyed by name. For whole months this
+    is one rollup query and one query for the monthly tasks, whatever the
+    length of the range; names come from the in-memory catalogs.
+    """
+    counts = workload_counts(staff, start_date, end_date)
+    kinds = [("shift_types", Kind.SHIFT_TYPE.value, "shift_types")]
+    kinds += [(task_type, task_type, field_name) for task_type, field_name in SHIFT_TASK_FIELDS.items()]
+
+    named = {}
+    for name, kind, catalog_name in kinds:
+        totals = {int(key): total for (k, key), total in counts.items() if k == kind}
+        named[name] = Counter()
+        for item in catalog(catalog_name):
+            if item.pk in totals:
+                named[name][item.name] += totals[item.pk]
+
+    named["monthly_tasks"] = Counter(
+        dict(
+            MonthlyAssignment.objects.filter(
+                staff=staff, start_date__range=(start_date, end_date)
+            )
+            .values_list("task__name")
+            .annotate(total=Count("pk"))
+            .order_by("task__name")
+        )
+    )
+    return named
+
+
+def shift_status_counts(staff, start_date, end_date):
+    """Count a staff member's assessed shifts (anything but pending) per status."""
+    return Counter(
+        {
+            key: total
+            for (kind, key), total in workload_counts(staff, start_date, end_date).items()
+            if kind == Kind.STATUS.value and key != AssignmentStatus.PENDING and total
+        }
+    )
+
+
+def status_counts(queryset):
+    """Count the rows of ``queryset`` per status with one grouped query."""
+    return Counter(
+        dict(
+            queryset.order_by("status")
+            .values_list("status")
+            .annotate(total=Count("pk"))
+        )
+    )
+
+
+# Statuses that count as assessed on the appraisal reports, in display order.
+ASSESSED_STATUSES = (
+    AssignmentStatus.COMPLETED,
+    AssignmentStatus.PARTIAL,
+    AssignmentStatus.NOT_COMPLETED,
+)
+
+AppraisalRow = namedtuple(
+    "AppraisalRow",
+    "staff daily daily_total daily_percent monthly monthly_total monthly_percent",
+)
+
+
+def completion_percent(counts):
+    total = sum(counts.values())
+    if not total:
+        return 0.0
+    return round(counts.get(AssignmentStatus.COMPLETED, 0) / total * 100, 1)
+
+
+def appraisal_rows(staff, start_date, end_date):
+    """Completion figures for every member of ``staff`` (a User queryset).
+
+    Shift statuses come from the rollups for whole months plus one grouped
+    query over the shifts for the partial months at either end; monthly
+    assignments are one grouped query. The cost does not depend on the
+    number of staff.
+    """
+    members = list(staff.order_by("first_name", "last_name"))
+    staff_ids = [member.pk for member in members]
+    assessed = [status.value for status in ASSESSED_STATUSES]
+    daily = {member.pk: Counter() for member in members}
+    monthly = {member.pk: Counter() for member in members}
+
+    months, edges = split_range(start_date, end_date)
+    if months:
+        rows = (
+            WorkloadRollup.objects.filter(
+                staff_id__in=staff_ids,
+                month__range=months,
+                kind=Kind.STATUS.value,
+                key__in=assessed,
+            )
+            .values_list("staff_id", "key")
+            .annotate(total=Sum("count"))
+            .order_by()
+        )
+        for staff_id, status, total in rows:
+            daily[staff_id][status] += total
+    if edges:
+        in_edges = Q()
+        for edge_start, edge_end in edges:
+            in_edges |= Q(date__range=(edge_start, edge_end))
+        rows = (
+            Shift.objects.filter(in_edges, staff_id__in=staff_ids, status__in=assessed)
+            .values_list("staff_id", "status")
+            .annotate(total=Count("pk"))
+            .order_by()
+        )
+        for staff_id, status, total in rows:
+            daily[staff_id][status] += total
+
+    rows = (
+        MonthlyAssignment.objects.filter(
+            staff_id__in=staff_ids,
+            end_date__gte=start_date,
+            start_date__lte=end_date,
+            status__in=assessed,
+        )
+        .values_list("staff_id", "status")
+        .annotate(total=Count("pk"))
+        .order_by()
+    )
+    for staff_id, status, total in rows:
+        monthly[staff_id][status] += total
+
+    return [
+        AppraisalRow(
+            member,
+            daily[member.pk],
+            sum(daily[member.pk].values()),
+            completion_percent(daily[member.pk]),
+            monthly[member.pk],
+            sum(monthly[member.pk].values()),
+            completion_percent(monthly[member.pk]),
+        )
+        for member in members
+    ]
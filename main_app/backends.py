@@ -1,31 +1,135 @@
 # In main_app/backends.py
 
+import re
+
+from django.conf import settings
+from django.contrib import auth
 from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Q
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
 from .models import User
 from phonenumber_field.phonenumber import to_python
 
+# Only input made of digits and phone punctuation is worth parsing as a
+# phone number; anything else is looked up as a username straight away.
+PHONE_LIKE = re.compile(r"^\+?[\d\s().-]{6,20}$")
+
 
 class PhoneOrUsernameBackend(ModelBackend):
+    """Log in with a username or a Bahraini phone number.
+
+    One query covers both fields, and the password hasher runs exactly once
+    per attempt: against the matching user, or against a throwaway password
+    when nobody matches, so response time does not reveal which accounts
+    exist.
+    """
+
     def authenticate(self, request, username=None, password=None, **kwargs):
-        phone_number = to_python(username, region="BH")
-
-        if phone_number and phone_number.is_valid():
-            try:
-                user = User.objects.get(phone_number=phone_number)
-            except User.DoesNotExist:
-                return None
-        else:
-            try:
-                user = User.objects.get(username=username)
-            except User.DoesNotExist:
-                return None
-
-        if user.check_password(password):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if not username or password is None:
+            return None
+
+        lookup = Q(username=username)
+        phone_number = None
+        if PHONE_LIKE.match(username):
+            phone_number = to_python(username, region="BH")
+            if phone_number and phone_number.is_valid():
+                lookup |= Q(phone_number=phone_number)
+            else:
+                phone_number = None
+
+        candidates = list(User.objects.filter(lookup)[:2])
+        # A phone number match wins over a username that happens to be digits.
+        user = next((c for c in candidates if phone_number and c.phone_number == phone_number), None)
+        if user is None:
+            user = next((c for c in candidates if c.username == username), None)
+
+        if user is None:
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
             return user
         return None
-    
+
     def get_user(self, user_id):
         try:
-            return User.objects.get(pk=user_id)
+            user = User.objects.get(pk=user_id)
         except User.DoesNotExist:
-            return None
\ No newline at end of file
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+# Caches private to one process: a user cached there would outlive a logout
+# or a role change made through another worker.
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+def user_cache():
+    """The cache shared by every worker that holds logged-in users, or None."""
+    alias = getattr(settings, "AUTH_USER_CACHE_ALIAS", None)
+    if not alias:
+        return None
+    cache = caches[alias]
+    return None if isinstance(cache, PROCESS_LOCAL_CACHES) else cache
+
+
+def user_cache_key(user_id):
+    return f"auth_user:{user_id}"
+
+
+def forget_user(user_id):
+    """Drop a cached user; called whenever the user row changes."""
+    cache = user_cache()
+    if cache is not None:
+        cache.delete(user_cache_key(user_id))
+
+
+def get_cached_user(request):
+    """``django.contrib.auth.get_user`` with the user kept in the cache.
+
+    A cached user is only used when the session's auth hash matches it, so
+    a password change (which changes the hash) never revives an old
+    session, and a cached user who has been deactivated is never let in.
+    On any mismatch the user is loaded and verified the normal way and the
+    cache refreshed. Without a shared cache this is ``auth.get_user``.
+    """
+    cache = user_cache()
+    if cache is None:
+        return auth.get_user(request)
+    session = request.session
+    user_id = session.get(auth.SESSION_KEY)
+    backend_path = session.get(auth.BACKEND_SESSION_KEY)
+    session_hash = session.get(auth.HASH_SESSION_KEY)
+    if user_id is None or backend_path not in settings.AUTHENTICATION_BACKENDS or not session_hash:
+        return auth.get_user(request)
+
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+    if (
+        user is not None
+        and user.is_active
+        and constant_time_compare(session_hash, user.get_session_auth_hash())
+    ):
+        user.backend = backend_path
+        return user
+
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+    else:
+        cache.delete(key)
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """Django's AuthenticationMiddleware, reading ``request.user`` through the cache."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
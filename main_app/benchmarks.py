@@ -0,0 +1,229 @@
+# In main_app/benchmarks.py
+
+import datetime
+import statistics
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import urls
+from .catalogs import registry as catalog_registry
+from .models import Job, MonthlyAssignment, Shift, User
+from .roster_cache import roster_cache
+
+# One GET per view. ``user`` is the fixture to log in as (None for an
+# anonymous request), ``kwargs`` and ``query`` build the URL from the
+# fixtures. Budgets apply to the first, cold-cache request: ``max_queries``
+# must not grow with the size of the unit. ``max_ms`` is 1.5 times the
+# slowest cold request over three runs of ``manage.py benchmark_views`` at
+# its default size (300 staff, a year of shifts, local SQLite), rounded up
+# to the next 250 ms; re-measure when a change moves a view's baseline.
+Case = namedtuple("Case", "name user max_queries max_ms kwargs query", defaults=(None, None))
+
+Fixtures = namedtuple("Fixtures", "today manager leader nurse shift monthly_assignment job")
+
+
+def _day(f):
+    return {"year": f.today.year, "month": f.today.month, "day": f.today.day}
+
+
+def _month(f):
+    return {"year": f.today.year, "month": f.today.month}
+
+
+def _report_range(f):
+    return {
+        "start_date": f.today.replace(day=1) - datetime.timedelta(days=60),
+        "end_date": f.today,
+    }
+
+
+CASES = [
+    Case("index", "manager", 5, 250),
+    Case("login", None, 0, 250),
+    # A cold month renders every staff x day cell; later requests hit the
+    # roster cache.
+    Case("monthly_roster", "manager", 15, 6250, _month),
+    Case("daily_detail", "manager", 10, 750, _day),
+    Case("daily_detail_pdf", "manager", 10, 3250, _day),
+    Case("daily_assign_redirect", "manager", 5, 250),
+    Case("daily_assign", "manager", 20, 250, _day),
+    Case("bulk_assign", "manager", 10, 250),
+    Case("create_shift", "manager", 15, 250),
+    Case("create_shift_for_staff", "manager", 15, 250, lambda f: {"staff_id": f.nurse.pk}),
+    Case("edit_shift", "manager", 15, 250, lambda f: {"pk": f.shift.pk}),
+    Case("delete_shift", "manager", 5, 250, lambda f: {"pk": f.shift.pk}),
+    Case("create_user", "manager", 5, 250),
+    Case("my_schedule", "nurse", 10, 250),
+    Case("checklist", "leader", 10, 250),
+    Case("manager_review", "manager", 10, 250, None, lambda f: {"date": f.today.isoformat()}),
+    Case("profile", "nurse", 5, 250),
+    Case("profile_edit", "nurse", 5, 250),
+    Case("password_change", "nurse", 5, 250),
+    Case("password_change_done", "nurse", 5, 250),
+    Case("staff_list", "manager", 10, 250),
+    Case("staff_lookup", "manager", 5, 250, None, lambda f: {"q": f.nurse.first_name[:3]}),
+    Case("staff_detail", "manager", 10, 250, lambda f: {"pk": f.nurse.pk}),
+    Case("staff_edit", "manager", 10, 250, lambda f: {"pk": f.nurse.pk}),
+    Case("staff_analytics", "manager", 15, 250, lambda f: {"pk": f.nurse.pk, **_month(f)}),
+    Case(
+        "appraisal_analytics",
+        "manager",
+        15,
+        250,
+        None,
+        lambda f: {"staff": f.nurse.pk, **_report_range(f)},
+    ),
+    Case("appraisal_batch", "manager", 10, 250, None, _report_range),
+    Case("monthly_assignment_list", "manager", 10, 250),
+    Case("monthly_assignment_create", "manager", 10, 250),
+    Case("monthly_assignment_edit", "manager", 10, 250, lambda f: {"pk": f.monthly_assignment.pk}),
+    Case("monthly_assignment_delete", "manager", 5, 250, lambda f: {"pk": f.monthly_assignment.pk}),
+    Case("monthly_assignment_display", "manager", 10, 250, _month),
+    Case("monthly_assignment_bulk_assign", "manager", 15, 250, _month),
+    Case("monthly_assignment_today", "manager", 5, 250),
+    Case("roster_pdf_export", "manager", 5, 250),
+    Case(
+        "roster_csv_export",
+        "manager",
+        30,
+        500,
+        None,
+        lambda f: {"export": "shifts", "start_date": f.today.replace(day=1), "end_date": f.today},
+    ),
+    Case("roster_import", "manager", 5, 250),
+    Case("roster_pdf_download", "manager", 5, 250, lambda f: {"pk": f.job.pk}),
+    Case("job_status", "manager", 5, 250, lambda f: {"pk": f.job.pk}),
+    Case("job_poll", "manager", 5, 250, lambda f: {"pk": f.job.pk}),
+    Case("metrics", "manager", 5, 250),
+    Case("api_monthly_roster", "manager", 15, 7000, _month),
+    Case("api_daily_detail", "manager", 10, 250, _day),
+    Case("api_my_schedule", "nurse", 10, 250),
+]
+
+# URL names with no benchmark, and why.
+SKIPPED = {
+    "logout": "POST only, and ends the benchmark client's session.",
+}
+
+
+def unbenchmarked_views():
+    """URL names in main_app.urls that have neither a case nor a reason to skip."""
+    names = {pattern.name for pattern in urls.urlpatterns if pattern.name}
+    return names - {case.name for case in CASES} - set(SKIPPED)
+
+
+def build_fixtures(today=None):
+    """Pick the objects the benchmark URLs point at from a seeded database.
+
+    Also records a finished PDF export job, with a placeholder file, so the
+    job and download views have something to show.
+    """
+    today = today or datetime.date.today()
+    manager = User.objects.filter(role=User.Role.NURSE_MANAGER, is_active=True).order_by("pk").first()
+    leader_shift = (
+        Shift.objects.filter(date=today, assignments__name__icontains="Team Leader")
+        .select_related("staff")
+        .order_by("pk")
+        .first()
+    )
+    shift = Shift.objects.filter(date=today).exclude(pk=getattr(leader_shift, "pk", None)).order_by("pk").first()
+    if manager is None or leader_shift is None or shift is None:
+        raise ValueError("The database has no manager or no team leader shift today; seed a dataset first.")
+
+    export_dir = Path(settings.EXPORT_DIR)
+    export_dir.mkdir(parents=True, exist_ok=True)
+    file_name = "benchmark_roster.pdf"
+    (export_dir / file_name).write_bytes(b"%PDF-1.4\n%%EOF\n")
+    job = Job.objects.create(
+        kind="export_roster_pdf",
+        idempotency_key=f"benchmark-{today.isoformat()}-{time.time_ns()}",
+        status=Job.Status.SUCCEEDED,
+        result={"file": file_name, "days": 1},
+        created_by=manager,
+    )
+    return Fixtures(
+        today=today,
+        manager=manager,
+        leader=leader_shift.staff,
+        nurse=shift.staff,
+        shift=shift,
+        monthly_assignment=MonthlyAssignment.objects.order_by("pk").first(),
+        job=job,
+    )
+
+
+def _clear_caches():
+    caches[roster_cache.alias].clear()
+    caches["default"].clear()
+    # The catalogs live as long as the worker process; measure with them loaded.
+    catalog_registry.clear()
+    catalog_registry.warm()
+
+
+def _request(client, path, query):
+    started = time.perf_counter()
+    response = client.get(path, query)
+    if response.streaming:
+        b"".join(response.streaming_content)
+    elif hasattr(response, "render") and not response.is_rendered:
+        response.render()
+    elapsed = (time.perf_counter() - started) * 1000
+    response.close()
+    return response, elapsed
+
+
+def run_case(case, fixtures, repeat=3):
+    """Time one view: a cold-cache request, then ``repeat`` warm ones."""
+    client = Client()
+    user = getattr(fixtures, case.user) if case.user else None
+    if user is not None:
+        client.force_login(user)
+    path = reverse(f"main_app:{case.name}", kwargs=case.kwargs(fixtures) if case.kwargs else None)
+    query = case.query(fixtures) if case.query else {}
+
+    _clear_caches()
+    # Each request resets the query log, which would shift the capture window.
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        response, cold_ms = _request(client, path, query)
+    warm = [_request(client, path, query)[1] for _ in range(repeat)]
+    return {
+        "name": case.name,
+        "path": path,
+        "status": response.status_code,
+        "queries": len(queries),
+        "cold_ms": round(cold_ms, 2),
+        "warm_ms": round(statistics.median(warm), 2) if warm else None,
+        "max_queries": case.max_queries,
+        "max_ms": case.max_ms,
+    }
+
+
+def budget_failures(result, check_latency=True):
+    """Human-readable reasons a result breaks its case's budgets."""
+    failures = []
+    if result["status"] >= 400:
+        failures.append(f"HTTP {result['status']}")
+    if result["queries"] > result["max_queries"]:
+        failures.append(f"{result['queries']} queries (budget {result['max_queries']})")
+    if check_latency and result["cold_ms"] > result["max_ms"]:
+        failures.append(f"{result['cold_ms']:.0f} ms (budget {result['max_ms']} ms)")
+    return failures
+
+
+def run_benchmarks(fixtures, cases=CASES, repeat=3, check_latency=True):
+    """Run every case; return its results, each with a ``failures`` list."""
+    results = []
+    for case in cases:
+        result = run_case(case, fixtures, repeat)
+        result["failures"] = budget_failures(result, check_latency)
+        results.append(result)
+    return results
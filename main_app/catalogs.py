@@ -0,0 +1,128 @@
+# In main_app/catalogs.py
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Assignment, Clinic, Committee, EmergencyRole, MonthlyTask, ShiftType, SubAssignment
+from .roster_cache import CATALOG_SCOPE, bump_versions, current_version
+
+# name -> (model, display ordering). The task catalogs are named after their
+# Shift field, so SHIFT_TASK_FIELDS values can be used as catalog names.
+CATALOGS = {
+    "shift_types": (ShiftType, ("start_time", "name")),
+    "assignments": (Assignment, ("name",)),
+    "sub_assignments": (SubAssignment, ("name",)),
+    "clinics": (Clinic, ("name",)),
+    "emergency_roles": (EmergencyRole, ("name",)),
+    "monthly_tasks": (MonthlyTask, ("name",)),
+    "committees": (Committee, ("name",)),
+}
+
+CATALOG_FOR_MODEL = {model: name for name, (model, _) in CATALOGS.items()}
+
+
+class Catalog:
+    """One reference table held in memory: its rows in display order and by id.
+
+    The rows are shared by every request in the process; treat them as
+    read-only.
+    """
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.by_id = {item.pk: item for item in self.items}
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, pk):
+        return self.by_id.get(pk)
+
+    def name(self, pk, default=""):
+        item = self.by_id.get(pk)
+        return item.name if item is not None else default
+
+    def names(self, ids):
+        """Names of the rows in ``ids``, in display order."""
+        ids = set(ids)
+        return [item.name for item in self.items if item.pk in ids]
+
+
+class CatalogRegistry:
+    """Process-local copies of the small reference tables.
+
+    Each catalog is loaded on first use. Every worker compares the shared
+    ``catalog`` version counter with the one it loaded at most once every
+    ``CATALOG_CHECK_SECONDS``, and drops all its catalogs when the counter
+    has moved, so between checks reading a catalog costs no query at all.
+    The worker that made a change drops its copies straight away.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catalogs = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def get(self, name):
+        self._check_version()
+        catalog = self._catalogs.get(name)
+        if catalog is None:
+            model, ordering = CATALOGS[name]
+            catalog = Catalog(model.objects.order_by(*ordering))
+            with self._lock:
+                catalog = self._catalogs.setdefault(name, catalog)
+        return catalog
+
+    def _check_version(self):
+        now = time.monotonic()
+        interval = getattr(settings, "CATALOG_CHECK_SECONDS", 5)
+        if self._version is not None and now - self._checked_at < interval:
+            return
+        # Read before any catalog is loaded, so a change racing the load
+        # leaves an older version behind and is picked up on the next check.
+        self.sync(current_version(CATALOG_SCOPE), now)
+
+    def sync(self, version, now=None):
+        """Drop the loaded catalogs unless they are those of ``version``.
+
+        The roster cache calls this with the version it has just read before
+        building an entry, so the entry never carries names from catalogs
+        this worker has not reloaded yet.
+        """
+        with self._lock:
+            if version != self._version:
+                self._catalogs.clear()
+                self._version = version
+            self._checked_at = time.monotonic() if now is None else now
+
+    def warm(self):
+        """Load every catalog now rather than on first use."""
+        for name in CATALOGS:
+            self.get(name)
+
+    def clear(self):
+        with self._lock:
+            self._catalogs.clear()
+            self._version = None
+
+
+registry = CatalogRegistry()
+
+
+def catalog(name):
+    return registry.get(name)
+
+
+def invalidate_catalogs():
+    """Make every worker reload its catalogs; called when a catalog row changes."""
+    bump_versions([CATALOG_SCOPE])
+    registry.clear()
+    # A reload between the change and the commit may have read the old rows.
+    transaction.on_commit(registry.clear)
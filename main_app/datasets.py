@@ -0,0 +1,365 @@
+# In main_app/datasets.py
+
+import datetime
+import random
+from collections import Counter
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .models import (
+    Assignment,
+    AssignmentGroup,
+    AssignmentStatus,
+    Clinic,
+    Committee,
+    EmergencyRole,
+    MonthlyAssignment,
+    MonthlyTask,
+    Rotation,
+    RotationDay,
+    Shift,
+    ShiftType,
+    SubAssignment,
+    User,
+)
+from .rollups import rebuild_rollups
+from .roster import SHIFT_TASK_FIELDS
+from .roster_cache import invalidate_all
+
+SHIFT_TYPES = [
+    # name, start hour, end hour, share of worked shifts
+    ("Morning", 7, 14, 0.5),
+    ("Afternoon", 14, 21, 0.3),
+    ("Night", 21, 7, 0.2),
+]
+
+TEAM_LEADER = "Team Leader"
+
+# Shift many-to-many field -> (catalog model, names, chance a shift has one).
+TASK_CATALOGS = {
+    "assignments": (
+        Assignment,
+        [
+            TEAM_LEADER,
+            "Triage",
+            "Dressing Room",
+            "Injection Room",
+            "Vaccination",
+            "Antenatal Care",
+            "Child Health",
+            "Chronic Disease",
+            "Health Education",
+            "Emergency Room",
+        ],
+        1.0,
+    ),
+    "sub_assignments": (
+        SubAssignment,
+        ["Sterilization", "Stock Check", "Crash Cart", "Cold Chain", "Infection Control", "Documentation"],
+        0.3,
+    ),
+    "clinics": (
+        Clinic,
+        ["Diabetes", "Hypertension", "Asthma", "Well Baby", "Antenatal", "Dental", "Mental Health"],
+        0.2,
+    ),
+    "emergency_roles": (
+        EmergencyRole,
+        ["Code Blue Leader", "Airway", "Compressions", "Medication", "Recorder", "Runner"],
+        0.1,
+    ),
+}
+
+MONTHLY_TASKS = [
+    "Audit",
+    "Crash Cart Check",
+    "Stock Ordering",
+    "Fridge Temperature Log",
+    "Infection Control Round",
+    "Staff Education",
+]
+GROUPS = ["Group 1", "Group 2", "Group 3", "Clinic Team"]
+COMMITTEES = ["Medical Equipment", "Health Promotion", "Quality", "Safety"]
+
+# name -> one shift type name (or None for a day off) per day of the cycle.
+ROTATIONS = {
+    "4 On / 2 Off": ["Morning"] * 4 + [None] * 2,
+    "Week A Rotation": ["Morning"] * 5 + [None] * 2,
+    "Week B Rotation": ["Afternoon"] * 5 + [None] * 2,
+    "Nights 3 On / 4 Off": ["Night"] * 3 + [None] * 4,
+}
+
+# Synthetic staff get employee ids from here up, and phone numbers derived
+# from the same index, so several generated sets can share a database.
+EMPLOYEE_ID_BASE = 900_000
+
+# Outcome of assessed shifts and monthly tasks.
+STATUS_WEIGHTS = [
+    (AssignmentStatus.COMPLETED, 0.8),
+    (AssignmentStatus.PARTIAL, 0.12),
+    (AssignmentStatus.NOT_COMPLETED, 0.08),
+]
+
+# Chance a staff member works on any given day (five days in seven).
+WORKING_DAY_CHANCE = 5 / 7
+
+
+def _get_or_create_catalog(model, names):
+    """Return ``{name: pk}`` for ``names``, inserting the missing ones in one go."""
+    existing = dict(model.objects.filter(name__in=names).values_list("name", "pk"))
+    model.objects.bulk_create([model(name=name) for name in names if name not in existing])
+    return dict(model.objects.filter(name__in=names).values_list("name", "pk"))
+
+
+def seed_catalogs():
+    """Create the shift types, task catalogs, groups, committees and rotations.
+
+    Safe to run against a database that already has some of them; existing
+    rows are reused by name.
+    """
+    for name, start_hour, end_hour, _ in SHIFT_TYPES:
+        ShiftType.objects.get_or_create(
+            name=name,
+            defaults={"start_time": datetime.time(start_hour), "end_time": datetime.time(end_hour)},
+        )
+    shift_types = dict(
+        ShiftType.objects.filter(name__in=[name for name, *_ in SHIFT_TYPES]).values_list("name", "pk")
+    )
+
+    for name, days in ROTATIONS.items():
+        rotation, created = Rotation.objects.get_or_create(name=name, defaults={"length_in_days": len(days)})
+        if created:
+            RotationDay.objects.bulk_create(
+                [
+                    RotationDay(
+                        rotation=rotation,
+                        day_number=number,
+                        shift_type_id=shift_types[shift_type] if shift_type else None,
+                        is_day_off=shift_type is None,
+                    )
+                    for number, shift_type in enumerate(days, start=1)
+                ]
+            )
+
+    return {
+        "shift_types": shift_types,
+        "tasks": {
+            field_name: _get_or_create_catalog(model, names)
+            for field_name, (model, names, _) in TASK_CATALOGS.items()
+        },
+        "monthly_tasks": _get_or_create_catalog(MonthlyTask, MONTHLY_TASKS),
+        "groups": _get_or_create_catalog(AssignmentGroup, GROUPS),
+        "committees": _get_or_create_catalog(Committee, COMMITTEES),
+    }
+
+
+def seed_staff(count, rng, groups, password="password", prefix="synth"):
+    """Bulk-create ``count`` staff across the roles and groups; return their pks.
+
+    About one in a hundred is a nurse manager and one in eight MAS. Every
+    account gets the same password, hashed once. Employee ids and phone
+    numbers continue after any synthetic staff already in the database.
+    """
+    password_hash = make_password(password)
+    group_ids = list(groups.values())
+    managers = max(1, count // 100)
+    last_id = (
+        User.objects.filter(employee_id__gte=EMPLOYEE_ID_BASE)
+        .order_by("-employee_id")
+        .values_list("employee_id", flat=True)
+        .first()
+    )
+    first = 0 if last_id is None else last_id - EMPLOYEE_ID_BASE + 1
+    users = []
+    for number in range(count):
+        index = first + number
+        if number < managers:
+            role = User.Role.NURSE_MANAGER
+        elif rng.random() < 0.125:
+            role = User.Role.MAS
+        else:
+            role = User.Role.NURSE
+        users.append(
+            User(
+                username=f"{prefix}{number:06d}",
+                password=password_hash,
+                first_name=f"{prefix.title()}{number:06d}",
+                last_name=rng.choice(["Ali", "Hasan", "Ahmed", "Mohamed", "Yusuf", "Ebrahim"]),
+                phone_number=f"+9733{index:07d}",
+                employee_id=EMPLOYEE_ID_BASE + index,
+                role=role,
+                assignment_group_id=rng.choice(group_ids),
+            )
+        )
+    User.objects.bulk_create(users, batch_size=1000)
+    return list(
+        User.objects.filter(employee_id__gte=EMPLOYEE_ID_BASE + first)
+        .order_by("employee_id")
+        .values_list("pk", flat=True)
+    )
+
+
+def _weighted(rng, weights):
+    values = [value for value, _ in weights]
+    return rng.choices(values, [weight for _, weight in weights])[0]
+
+
+def _flush_shifts(pending, batch_size):
+    """Insert a batch of ``(Shift, {field_name: [task ids]})`` and their links."""
+    shifts = Shift.objects.bulk_create([shift for shift, _ in pending], batch_size=batch_size)
+    links = 0
+    for field_name in SHIFT_TASK_FIELDS.values():
+        field = Shift._meta.get_field(field_name)
+        through = field.remote_field.through
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        rows = [
+            through(**{f"{source}_id": shift.pk, f"{target}_id": task_id})
+            for shift, (_, tasks) in zip(shifts, pending)
+            for task_id in tasks.get(field_name, ())
+        ]
+        through.objects.bulk_create(rows, batch_size=batch_size)
+        links += len(rows)
+    return links
+
+
+def seed_shifts(
+    staff_ids, start_date, days, catalogs, rng, assessed_until=None, batch_size=2000, progress=None
+):
+    """Bulk-create a roster of shifts, with tasks, for ``days`` days from ``start_date``.
+
+    Each staff member works about five days in seven; every day and shift
+    type gets one team leader, everyone else one main assignment and, now
+    and then, a sub-assignment, clinic or emergency role. Shifts before
+    ``assessed_until`` get an assessment status. Rows are written
+    ``batch_size`` shifts at a time, so memory stays flat at any scale;
+    ``progress(shifts, day)`` is called after each batch. Returns
+    ``(shifts, links)``.
+    """
+    shift_type_weights = [(catalogs["shift_types"][name], share) for name, _, _, share in SHIFT_TYPES]
+    tasks = {field_name: list(ids.values()) for field_name, ids in catalogs["tasks"].items()}
+    leader_id = catalogs["tasks"]["assignments"][TEAM_LEADER]
+    main_ids = [task_id for task_id in tasks["assignments"] if task_id != leader_id]
+
+    shifts = links = 0
+    pending = []
+    for offset in range(days):
+        day = start_date + datetime.timedelta(days=offset)
+        has_leader = set()
+        for staff_id in staff_ids:
+            if rng.random() >= WORKING_DAY_CHANCE:
+                continue
+            shift_type_id = _weighted(rng, shift_type_weights)
+            if shift_type_id in has_leader:
+                shift_tasks = {"assignments": [rng.choice(main_ids)]}
+            else:
+                has_leader.add(shift_type_id)
+                shift_tasks = {"assignments": [leader_id]}
+            for field_name, (_, _, chance) in TASK_CATALOGS.items():
+                if field_name != "assignments" and rng.random() < chance:
+                    shift_tasks[field_name] = [rng.choice(tasks[field_name])]
+
+            status = AssignmentStatus.PENDING
+            if assessed_until is not None and day < assessed_until:
+                status = _weighted(rng, STATUS_WEIGHTS)
+            pending.append(
+                (
+                    Shift(
+                        staff_id=staff_id,
+                        date=day,
+                        shift_type_id=shift_type_id,
+                        status=status,
+                        is_approved_by_manager=status != AssignmentStatus.PENDING,
+                    ),
+                    shift_tasks,
+                )
+            )
+            if len(pending) >= batch_size:
+                with transaction.atomic():
+                    links += _flush_shifts(pending, batch_size)
+                shifts += len(pending)
+                pending = []
+                if progress:
+                    progress(shifts, day)
+    if pending:
+        with transaction.atomic():
+            links += _flush_shifts(pending, batch_size)
+        shifts += len(pending)
+    return shifts, links
+
+
+def seed_monthly_assignments(staff_ids, start_date, end_date, catalogs, rng, assessed_until=None, batch_size=2000):
+    """Give most staff one monthly task per month between the two dates."""
+    task_ids = list(catalogs["monthly_tasks"].values())
+    committee_ids = list(catalogs["committees"].values())
+    group_for_staff = dict(User.objects.filter(pk__in=staff_ids).values_list("pk", "assignment_group_id"))
+
+    assignments = []
+    month = start_date.replace(day=1)
+    while month <= end_date:
+        month_end = month + relativedelta(months=1, days=-1)
+        for staff_id in staff_ids:
+            if rng.random() >= 0.6:
+                continue
+            status = AssignmentStatus.PENDING
+            if assessed_until is not None and month_end < assessed_until:
+                status = _weighted(rng, STATUS_WEIGHTS)
+            assignments.append(
+                MonthlyAssignment(
+                    staff_id=staff_id,
+                    task_id=rng.choice(task_ids),
+                    start_date=month,
+                    end_date=month_end,
+                    group_id=group_for_staff[staff_id],
+                    committee_id=rng.choice(committee_ids) if rng.random() < 0.3 else None,
+                    status=status,
+                )
+            )
+        month += relativedelta(months=1)
+    MonthlyAssignment.objects.bulk_create(assignments, batch_size=batch_size)
+    return len(assignments)
+
+
+def seed_dataset(
+    staff=200,
+    start_date=None,
+    days=365,
+    seed=0,
+    assessed_until=None,
+    batch_size=2000,
+    prefix="synth",
+    password="password",
+    progress=None,
+):
+    """Fill the database with a deterministic synthetic unit.
+
+    The same arguments always produce the same rows. ``start_date`` defaults
+    to the first of the month a year ago, ``assessed_until`` to today.
+    Catalog entries are reused by name; staff are new accounts named
+    ``prefix`` plus a number. Everything is written with bulk inserts, and
+    the workload rollups and roster cache are brought up to date at the end.
+    Returns a Counter of the rows created.
+    """
+    today = datetime.date.today()
+    if start_date is None:
+        start_date = (today - relativedelta(years=1)).replace(day=1)
+    if assessed_until is None:
+        assessed_until = today
+    end_date = start_date + datetime.timedelta(days=days - 1)
+    rng = random.Random(seed)
+
+    created = Counter()
+    catalogs = seed_catalogs()
+    staff_ids = seed_staff(staff, rng, catalogs["groups"], password, prefix)
+    created["staff"] = len(staff_ids)
+    created["shifts"], created["task_links"] = seed_shifts(
+        staff_ids, start_date, days, catalogs, rng, assessed_until, batch_size, progress
+    )
+    created["monthly_assignments"] = seed_monthly_assignments(
+        staff_ids, start_date, end_date, catalogs, rng, assessed_until, batch_size
+    )
+    created["rollups"] = rebuild_rollups(start_date, end_date, staff_ids)
+    invalidate_all()
+    return created
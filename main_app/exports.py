@@ -0,0 +1,359 @@
+# In main_app/exports.py
+
+import csv
+import datetime
+import itertools
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Q
+from pypdf import PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+
+from .models import MonthlyAssignment, Shift
+from .pdf_cache import content_key, get_pdf_cache, render_into_cache
+from .roster import SHIFT_TASK_FIELDS, daily_pdf_html
+
+
+class PdfPageStream:
+    """Write the pages of many small PDFs into one file as they arrive.
+
+    pypdf's PdfWriter holds the whole document until it is written. Here
+    each source is parsed on its own, its objects renumbered and written
+    out straight away; only their offsets and the page references are kept,
+    so memory does not grow with the number of pages. Call ``close()`` to
+    write the page tree, cross-reference table and trailer.
+    """
+
+    HEADER = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+
+    def __init__(self, destination):
+        self.destination = destination
+        self.offsets = []
+        self.kids = ArrayObject()
+        destination.write(self.HEADER)
+        self.catalog = self._reserve()
+        self.page_tree = self._reserve()
+
+    def _reserve(self):
+        self.offsets.append(None)
+        return IndirectObject(len(self.offsets), 0, None)
+
+    def _write(self, reference, obj):
+        self.offsets[reference.idnum - 1] = self.destination.tell()
+        self.destination.write(f"{reference.idnum} 0 obj\n".encode())
+        obj.write_to_stream(self.destination)
+        self.destination.write(b"\nendobj\n")
+
+    def append(self, source):
+        """Append every page of the PDF file object ``source``."""
+        reader = PdfReader(source)
+        numbers = {}
+        queue = []
+
+        def renumber(reference):
+            key = (reference.idnum, reference.generation)
+            if key not in numbers:
+                numbers[key] = self._reserve()
+                queue.append((numbers[key], reference.get_object()))
+            return numbers[key]
+
+        pages = set()
+        for page in reader.pages:
+            # The flattened page carries the attributes it inherited from
+            # the source's page tree, which is not copied.
+            page.pop(NameObject("/Parent"), None)
+            reference = self._reserve()
+            numbers[(page.indirect_reference.idnum, page.indirect_reference.generation)] = reference
+            queue.append((reference, page))
+            pages.add(reference.idnum)
+            self.kids.append(reference)
+
+        while queue:
+            reference, obj = queue.pop()
+            _point_references(obj, renumber)
+            if reference.idnum in pages:
+                obj[NameObject("/Parent")] = self.page_tree
+            self._write(reference, obj)
+
+    def close(self):
+        self._write(self.page_tree, DictionaryObject({
+            NameObject("/Type"): NameObject("/Pages"),
+            NameObject("/Kids"): self.kids,
+            NameObject("/Count"): NumberObject(len(self.kids)),
+        }))
+        self._write(self.catalog, DictionaryObject({
+            NameObject("/Type"): NameObject("/Catalog"),
+            NameObject("/Pages"): self.page_tree,
+        }))
+        xref = self.destination.tell()
+        self.destination.write(f"xref\n0 {len(self.offsets) + 1}\n0000000000 65535 f \n".encode())
+        for offset in self.offsets:
+            self.destination.write(f"{offset:010d} 00000 n \n".encode())
+        self.destination.write(
+            f"trailer\n<< /Size {len(self.offsets) + 1} /Root {self.catalog.idnum} 0 R >>\n"
+            f"startxref\n{xref}\n%%EOF\n".encode()
+        )
+
+
+def _point_references(obj, renumber):
+    """Replace, in place, every source reference nested in ``obj`` with ``renumber(reference)``.
+
+    References into the output have no ``pdf``; they come from direct
+    objects shared between pages, e.g. inherited resources, and are kept.
+    """
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, DictionaryObject):
+            entries = [(key, item.raw_get(key)) for key in list(item.keys())]
+        else:
+            entries = list(enumerate(item))
+        for key, value in entries:
+            if isinstance(value, IndirectObject):
+                if value.pdf is not None:
+                    item[key] = renumber(value)
+            elif isinstance(value, (DictionaryObject, ArrayObject)):
+                stack.append(value)
+
+
+def export_roster_pdf(start_date, end_date, output, workers=None, progress=None):
+    """Write the daily schedules for start..end into one PDF at ``output``.
+
+    Days go through a window of a few at a time: each day's HTML is built
+    just before it is needed, days missing from the PDF cache are rendered
+    by a pool of ``workers`` processes, and each finished day is appended
+    to the output file in date order, so peak memory depends on the window
+    rather than the length of the range. Pass ``workers=1`` to render in
+    this process. The file appears at ``output`` only once complete.
+    ``progress(done, total)`` is called after each day. Returns the number
+    of days written.
+    """
+    cache = get_pdf_cache()
+    total = (end_date - start_date).days + 1
+    days = (start_date + datetime.timedelta(days=offset) for offset in range(total))
+    workers = workers or getattr(settings, "PDF_EXPORT_WORKERS", None) or os.cpu_count() or 1
+
+    executor = None
+    if workers > 1 and total > 1:
+        # "spawn" keeps the workers from inheriting this process's database
+        # connections; they only ever run xhtml2pdf.
+        executor = ProcessPoolExecutor(
+            max_workers=min(workers, total),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    # Two days per worker keeps every worker busy while the oldest is appended.
+    window = 2 * workers if executor is not None else 1
+
+    def schedule(day):
+        html = daily_pdf_html(day)
+        future = None
+        if executor is not None and not cache.path(content_key(html)).exists():
+            future = executor.submit(render_into_cache, cache.directory, cache.max_bytes, html)
+        return html, future
+
+    partial = f"{output}.part"
+    in_flight = deque()
+    try:
+        with open(partial, "wb") as destination:
+            document = PdfPageStream(destination)
+            for done in range(1, total + 1):
+                for day in itertools.islice(days, window - len(in_flight)):
+                    in_flight.append(schedule(day))
+                html, future = in_flight.popleft()
+                if future is not None:
+                    future.result()
+                # Renders here on a miss: with one worker, or if evicted since.
+                _, handle = cache.get_or_render(html)
+                with handle:
+                    document.append(handle)
+                if progress:
+                    progress(done, total)
+            document.close()
+        os.replace(partial, output)
+    except BaseException:
+        if os.path.exists(partial):
+            os.unlink(partial)
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return total
+
+
+def prune_exports(directory, max_age):
+    """Delete the files in ``directory`` last written more than ``max_age`` seconds ago."""
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in Path(directory).glob("*"):
+        try:
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+class Echo:
+    """File-like object whose write() hands the line back, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    """Yield CSV-encoded lines one at a time, for StreamingHttpResponse."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+SHIFT_EXPORT_HEADER = [
+    "Date",
+    "Staff",
+    "Employee ID",
+    "Shift Type",
+    "Start",
+    "End",
+    "Assignments",
+    "Sub-Assignments",
+    "Clinics",
+    "Emergency Roles",
+    "Status",
+    "Approved",
+    "Notes",
+]
+
+
+def _shift_chunks(start_date, end_date, chunk_size):
+    """Yield the range's shifts as lists of dicts, ``chunk_size`` at a time.
+
+    Pages are fetched by (date, pk) keyset rather than OFFSET, so every
+    chunk is an index range scan however deep the export goes.
+    """
+    shifts = Shift.objects.filter(date__range=(start_date, end_date)).order_by("date", "pk")
+    last = None
+    while True:
+        page = shifts
+        if last is not None:
+            page = page.filter(Q(date__gt=last[0]) | Q(date=last[0], pk__gt=last[1]))
+        rows = list(
+            page.values(
+                "pk",
+                "date",
+                "staff__first_name",
+                "staff__last_name",
+                "staff__employee_id",
+                "shift_type__name",
+                "shift_type__start_time",
+                "shift_type__end_time",
+                "status",
+                "is_approved_by_manager",
+                "notes",
+            )[:chunk_size]
+        )
+        if not rows:
+            return
+        yield rows
+        last = (rows[-1]["date"], rows[-1]["pk"])
+
+
+def iter_shift_rows(start_date, end_date, chunk_size=2000):
+    """Yield one flat CSV row per shift in start..end.
+
+    Each chunk costs one query for the shifts and one per task through
+    table, so memory and query count depend on ``chunk_size``, not on the
+    length of the range.
+    """
+    for chunk in _shift_chunks(start_date, end_date, chunk_size):
+        shift_ids = [row["pk"] for row in chunk]
+        tasks = {}
+        for field_name in SHIFT_TASK_FIELDS.values():
+            field = Shift._meta.get_field(field_name)
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            links = (
+                field.remote_field.through.objects.filter(**{f"{source}_id__in": shift_ids})
+                .values_list(f"{source}_id", f"{target}__name")
+                .order_by(f"{target}__name")
+            )
+            for shift_id, name in links:
+                tasks.setdefault((shift_id, field_name), []).append(name)
+
+        for row in chunk:
+            yield [
+                row["date"].isoformat(),
+                f"{row['staff__first_name']} {row['staff__last_name']}".strip(),
+                row["staff__employee_id"] or "",
+                row["shift_type__name"],
+                row["shift_type__start_time"].strftime("%H:%M"),
+                row["shift_type__end_time"].strftime("%H:%M"),
+                *(
+                    "; ".join(tasks.get((row["pk"], field_name), ()))
+                    for field_name in SHIFT_TASK_FIELDS.values()
+                ),
+                row["status"],
+                "yes" if row["is_approved_by_manager"] else "no",
+                row["notes"] or "",
+            ]
+
+
+MONTHLY_ASSIGNMENT_EXPORT_HEADER = [
+    "Start",
+    "End",
+    "Staff",
+    "Employee ID",
+    "Task",
+    "Group",
+    "Committee",
+    "Status",
+    "Notes",
+]
+
+
+def iter_monthly_assignment_rows(start_date, end_date, chunk_size=2000):
+    """Yield one CSV row per monthly assignment overlapping start..end."""
+    assignments = (
+        MonthlyAssignment.objects.filter(end_date__gte=start_date, start_date__lte=end_date)
+        .order_by("start_date", "pk")
+        .values_list(
+            "start_date",
+            "end_date",
+            "staff__first_name",
+            "staff__last_name",
+            "staff__employee_id",
+            "task__name",
+            "group__name",
+            "committee__name",
+            "status",
+            "notes",
+        )
+    )
+    for start, end, first_name, last_name, employee_id, task, group, committee, status, notes in (
+        assignments.iterator(chunk_size=chunk_size)
+    ):
+        yield [
+            start.isoformat(),
+            end.isoformat(),
+            f"{first_name} {last_name}".strip(),
+            employee_id or "",
+            task,
+            group or "",
+            committee or "",
+            status,
+            notes or "",
+        ]
+
+
+# Export name -> (header, row iterator), shared by the view and the command.
+CSV_EXPORTS = {
+    "shifts": (SHIFT_EXPORT_HEADER, iter_shift_rows),
+    "monthly_assignments": (MONTHLY_ASSIGNMENT_EXPORT_HEADER, iter_monthly_assignment_rows),
+}
@@ -1,8 +1,95 @@
 # In main_app/forms.py
 
+import uuid
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
-from .models import Shift, User, Rotation, MonthlyAssignment
+from django.urls import reverse
+from .catalogs import catalog
+from .models import AssignmentGroup, AssignmentStatus, Committee, Shift, User, Rotation, MonthlyAssignment
+from .staff_search import STAFF_ORDERING, staff_label
+
+class StaffPickerMixin:
+    """Staff select that renders only the chosen staff members.
+
+    js/staff_picker.js adds a search box that fetches the other options from
+    the staff lookup endpoint, so the page does not grow with headcount.
+    Submitted values are still validated against the field's queryset.
+    """
+
+    class Media:
+        js = ['js/staff_picker.js']
+
+    def __init__(self, attrs=None, role=None, group=None):
+        attrs = {'class': 'form-select staff-picker', **(attrs or {})}
+        if role:
+            attrs['data-role'] = role
+        if group:
+            attrs['data-group'] = group
+        super().__init__(attrs)
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-lookup-url'] = reverse('main_app:staff_lookup')
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        choices = []
+        field = getattr(self.choices, 'field', None)
+        if field is not None and field.empty_label is not None:
+            choices.append(('', field.empty_label))
+        chosen = [pk for pk in value if pk.isdigit()]
+        if chosen:
+            choices += [
+                (member.pk, staff_label(member))
+                for member in User.objects.filter(pk__in=chosen).order_by(*STAFF_ORDERING)
+            ]
+        all_choices, self.choices = self.choices, choices
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = all_choices
+
+class StaffPicker(StaffPickerMixin, forms.Select):
+    pass
+
+class StaffPickerMultiple(StaffPickerMixin, forms.SelectMultiple):
+    pass
+
+class CatalogChoicesMixin:
+    """Render the fields in ``catalog_fields`` from the in-memory catalogs.
+
+    Only the choices shown are taken from the catalog; submitted values are
+    still validated against the field's queryset.
+    """
+    catalog_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field_name, catalog_name in self.catalog_fields.items():
+            field = self.fields[field_name]
+            choices = [(item.pk, field.label_from_instance(item)) for item in catalog(catalog_name)]
+            if field.empty_label is not None:
+                choices.insert(0, ('', field.empty_label))
+            field.choices = choices
+
+class DateRangeFormMixin:
+    """Check that ``end_date`` is not before ``start_date``.
+
+    Set ``max_days`` to also limit how many days the range may span.
+    """
+    max_days = None
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date:
+            if end_date < start_date:
+                self.add_error('end_date', "End date must be on or after the start date.")
+            elif self.max_days is not None and (end_date - start_date).days >= self.max_days:
+                self.add_error('end_date', f"Choose at most {self.max_days} days at a time.")
+        return cleaned_data
 
 class StaffUpdateForm(forms.ModelForm):
     class Meta:
@@ -10,12 +97,21 @@ class StaffUpdateForm(forms.ModelForm):
         # Fields a manager can edit
         fields = ['username', 'first_name', 'last_name', 'phone_number', 'employee_id', 'role', 'assignment_group', 'is_active']
         
-class ShiftForm(forms.ModelForm):
+class ShiftForm(CatalogChoicesMixin, forms.ModelForm):
+    catalog_fields = {
+        'shift_type': 'shift_types',
+        'assignments': 'assignments',
+        'sub_assignments': 'sub_assignments',
+        'clinics': 'clinics',
+        'emergency_roles': 'emergency_roles',
+    }
+
     class Meta:
         model = Shift
         fields = ['staff', 'date', 'shift_type', 'assignments',
                   'sub_assignments', 'clinics', 'emergency_roles', 'notes']
         widgets = {
+            'staff': StaffPicker,
             'date': forms.DateInput(attrs={'type': 'date'}),
             'assignments': forms.CheckboxSelectMultiple,
             'sub_assignments': forms.CheckboxSelectMultiple,
@@ -31,10 +127,13 @@ class CustomUserCreationForm(UserCreationForm):
 class DateSelectionForm(forms.Form):
     date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
 
-class RotationAssignForm(forms.Form):
+def new_idempotency_key():
+    return uuid.uuid4().hex
+
+class RotationAssignForm(DateRangeFormMixin, forms.Form):
     employees = forms.ModelMultipleChoiceField(
         queryset=User.objects.filter(is_active=True).order_by('first_name'),
-        widget=forms.CheckboxSelectMultiple,
+        widget=StaffPickerMultiple,
         required=True
     )
     rotation = forms.ModelChoiceField(
@@ -43,29 +142,190 @@ class RotationAssignForm(forms.Form):
     )
     start_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
     end_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    start_offset = forms.IntegerField(
+        min_value=0,
+        initial=0,
+        required=False,
+        help_text="Rotation day (0 = day 1) the first employee starts on."
+    )
+    stagger = forms.IntegerField(
+        min_value=0,
+        initial=0,
+        required=False,
+        help_text="Start each following employee this many rotation days later."
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        help_text="Only report how many shifts would be created and deleted."
+    )
+    idempotency_key = forms.CharField(
+        widget=forms.HiddenInput,
+        required=False,
+        max_length=64,
+        initial=new_idempotency_key
+    )
+
+    def get_offsets(self):
+        """Each employee's rotation offset, staggered in primary key order.
+
+        Names change; keying the order on them would move everyone's
+        pattern when a rotation is re-applied after a rename.
+        """
+        start_offset = self.cleaned_data.get('start_offset') or 0
+        stagger = self.cleaned_data.get('stagger') or 0
+        employee_ids = sorted(employee.pk for employee in self.cleaned_data['employees'])
+        return {
+            employee_id: start_offset + index * stagger
+            for index, employee_id in enumerate(employee_ids)
+        }
 
 class ProfileUpdateForm(forms.ModelForm):
     class Meta:
         model = User
         fields = ['first_name', 'last_name', 'phone_number','employee_id']
 
-class MonthlyAssignmentForm(forms.ModelForm):
+class MonthlyAssignmentForm(CatalogChoicesMixin, forms.ModelForm):
+    catalog_fields = {'task': 'monthly_tasks'}
+
     class Meta:
         model = MonthlyAssignment
         fields = ['staff', 'task', 'start_date', 'end_date', 'notes']
         widgets = {
+            'staff': StaffPicker,
             'start_date': forms.DateInput(attrs={'type': 'date'}),
             'end_date': forms.DateInput(attrs={'type': 'date'}),
         }
 
+class ListFilterMixin:
+    """Compact GET filter shown above a paged list (list_filter_form.html)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            if isinstance(field.widget, forms.Select):
+                field.widget.attrs.setdefault('class', 'form-select form-select-sm')
+            else:
+                field.widget.attrs.setdefault('class', 'form-control form-control-sm')
+
+    def filter_data(self):
+        """The fields filled in; invalid ones are ignored rather than failing the list."""
+        self.is_valid()
+        return getattr(self, 'cleaned_data', {})
+
+class MonthlyAssignmentFilterForm(ListFilterMixin, CatalogChoicesMixin, forms.Form):
+    catalog_fields = {'committee': 'committees'}
+
+    start_date = forms.DateField(label="From", required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    end_date = forms.DateField(label="To", required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    group = forms.ModelChoiceField(
+        queryset=AssignmentGroup.objects.order_by('name'), required=False, empty_label="All groups"
+    )
+    committee = forms.ModelChoiceField(
+        queryset=Committee.objects.all(), required=False, empty_label="All committees"
+    )
+    status = forms.ChoiceField(choices=[('', "Any status"), *AssignmentStatus.choices], required=False)
+
+    def filter(self, queryset):
+        data = self.filter_data()
+        if data.get('start_date'):
+            queryset = queryset.filter(end_date__gte=data['start_date'])
+        if data.get('end_date'):
+            queryset = queryset.filter(start_date__lte=data['end_date'])
+        if data.get('group'):
+            queryset = queryset.filter(group=data['group'])
+        if data.get('committee'):
+            queryset = queryset.filter(committee=data['committee'])
+        if data.get('status'):
+            queryset = queryset.filter(status=data['status'])
+        return queryset
+
+class StaffFilterForm(ListFilterMixin, forms.Form):
+    role = forms.ChoiceField(choices=[('', "Any role"), *User.Role.choices], required=False)
+    group = forms.ModelChoiceField(
+        queryset=AssignmentGroup.objects.order_by('name'), required=False, empty_label="All groups"
+    )
+    status = forms.ChoiceField(
+        choices=[('', "Active"), ('inactive', "Inactive"), ('all', "All")], required=False
+    )
+
+    def filter(self, queryset):
+        data = self.filter_data()
+        status = data.get('status')
+        if status != 'all':
+            queryset = queryset.filter(is_active=status != 'inactive')
+        if data.get('role'):
+            queryset = queryset.filter(role=data['role'])
+        if data.get('group'):
+            queryset = queryset.filter(assignment_group=data['group'])
+        return queryset
+
+class ScheduleFilterForm(ListFilterMixin, forms.Form):
+    start_date = forms.DateField(label="From", required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    end_date = forms.DateField(label="To", required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    status = forms.ChoiceField(choices=[('', "Any status"), *AssignmentStatus.choices], required=False)
+
+    def filter(self, queryset, today):
+        """Upcoming shifts unless a start date is given."""
+        data = self.filter_data()
+        queryset = queryset.filter(date__gte=data.get('start_date') or today)
+        if data.get('end_date'):
+            queryset = queryset.filter(date__lte=data['end_date'])
+        if data.get('status'):
+            queryset = queryset.filter(status=data['status'])
+        return queryset
+
 class AppraisalFilterForm(forms.Form):
     staff = forms.ModelChoiceField(
         queryset=User.objects.filter(is_active=True).order_by('first_name'),
+        widget=StaffPicker,
         label="Select Staff Member",
         required=True
     )
     start_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}), required=True)
     end_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}), required=True)
 
+class AppraisalBatchForm(DateRangeFormMixin, forms.Form):
+    start_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}), required=True)
+    end_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}), required=True)
+    group = forms.ModelChoiceField(
+        queryset=AssignmentGroup.objects.order_by('name'),
+        label="Assignment Group",
+        required=False,
+        empty_label="All active staff"
+    )
+
+class RosterPdfExportForm(DateRangeFormMixin, forms.Form):
+    max_days = 366
+
+    start_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    end_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    idempotency_key = forms.CharField(
+        widget=forms.HiddenInput,
+        required=False,
+        initial=new_idempotency_key
+    )
+
+class RosterCsvExportForm(DateRangeFormMixin, forms.Form):
+    EXPORT_CHOICES = [
+        ('shifts', 'Daily shifts'),
+        ('monthly_assignments', 'Monthly assignments'),
+    ]
+
+    export = forms.ChoiceField(choices=EXPORT_CHOICES, label="Data")
+    start_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    end_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+
+class RosterImportForm(forms.Form):
+    file = forms.FileField(
+        label="CSV file",
+        help_text="Same columns as the daily shifts export; task names separated by \";\".",
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        initial=True,
+        label="Dry run",
+        help_text="Check the file and report what would be imported without saving anything.",
+    )
+
 class MonthlyTaskBulkAssignForm(forms.Form):
     pass
\ No newline at end of file
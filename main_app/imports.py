@@ -0,0 +1,203 @@
+# In main_app/imports.py
+
+import csv
+import datetime
+
+from django.db import transaction
+
+from .models import AssignmentStatus, Shift, ShiftType, User
+from .rollups import rebuild_rollups
+from .roster import SHIFT_TASK_FIELDS
+from .roster_cache import invalidate_dates
+
+# CSV column -> Shift many-to-many field, as written by the shift export.
+TASK_COLUMNS = {
+    "Assignments": "assignments",
+    "Sub-Assignments": "sub_assignments",
+    "Clinics": "clinics",
+    "Emergency Roles": "emergency_roles",
+}
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y")
+TRUE_VALUES = {"yes", "y", "true", "1"}
+
+# Stop collecting errors past this many; the file needs fixing anyway.
+MAX_ERRORS = 200
+
+
+class ImportReport:
+    """Outcome of a roster import: counts, and errors by CSV line number."""
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.shifts = 0
+        self.links = 0
+        self.errors = []
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    @property
+    def written(self):
+        return self.ok and not self.dry_run
+
+    def error(self, line, message):
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+
+def _name_map(queryset, *fields):
+    """Map lower-cased names to primary keys; names used twice map to None."""
+    names = {}
+    for pk, *values in queryset.values_list("pk", *fields):
+        name = " ".join(str(value) for value in values if value).strip().lower()
+        if name:
+            names[name] = None if name in names else pk
+    return names
+
+
+def _parse_date(value):
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value.strip(), date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+class RosterLookups:
+    """Every catalog the import resolves names against, loaded once."""
+
+    def __init__(self):
+        self.shift_types = _name_map(ShiftType.objects.all(), "name")
+        self.tasks = {
+            field_name: _name_map(Shift._meta.get_field(field_name).related_model.objects.all(), "name")
+            for field_name in SHIFT_TASK_FIELDS.values()
+        }
+        staff = User.objects.filter(is_active=True)
+        self.employee_ids = {
+            str(employee_id): pk
+            for pk, employee_id in staff.exclude(employee_id=None).values_list("pk", "employee_id")
+        }
+        self.usernames = _name_map(staff, "username")
+        self.full_names = _name_map(staff, "first_name", "last_name")
+        self.statuses = {}
+        for status in AssignmentStatus:
+            self.statuses[status.value.lower()] = status.value
+            self.statuses[status.label.lower()] = status.value
+
+    def staff(self, employee_id, name):
+        if employee_id:
+            return self.employee_ids.get(employee_id)
+        name = name.lower()
+        return self.usernames.get(name) or self.full_names.get(name)
+
+
+def import_shifts(lines, dry_run=False, batch_size=1000):
+    """Import shifts, with their tasks, from CSV text lines.
+
+    The columns are those of the shift export: Date, Staff (username or full
+    name) and/or Employee ID, Shift Type, the four task columns (names
+    separated by ";") and optionally Status, Approved and Notes. Every row is checked
+    against in-memory lookups and against the shifts already stored before
+    anything is written; if any row is invalid, or with ``dry_run``, nothing
+    is written and the report says what would have happened. Otherwise the
+    shifts and their links go in with batched bulk_create calls in one
+    transaction.
+    """
+    report = ImportReport(dry_run)
+    reader = csv.DictReader(lines)
+    columns = set(reader.fieldnames or ())
+    if "Date" not in columns or "Shift Type" not in columns or not columns & {"Staff", "Employee ID"}:
+        report.error(1, "The file needs Date, Shift Type and Staff or Employee ID columns.")
+        return report
+
+    lookups = RosterLookups()
+    parsed = {}
+    for row in reader:
+        report.rows += 1
+        line = reader.line_num
+        day = _parse_date(row.get("Date") or "")
+        staff_name = (row.get("Staff") or "").strip()
+        employee_id = (row.get("Employee ID") or "").strip()
+        staff_id = lookups.staff(employee_id, staff_name)
+        shift_type_id = lookups.shift_types.get((row.get("Shift Type") or "").strip().lower())
+        status = lookups.statuses.get((row.get("Status") or "").strip().lower(), AssignmentStatus.PENDING)
+        approved = (row.get("Approved") or "").strip().lower() in TRUE_VALUES
+
+        if day is None:
+            report.error(line, f"Unreadable date {row.get('Date')!r}.")
+        if staff_id is None:
+            report.error(line, f"Unknown or ambiguous staff member {employee_id or staff_name!r}.")
+        if shift_type_id is None:
+            report.error(line, f"Unknown shift type {row.get('Shift Type')!r}.")
+
+        tasks = {}
+        for column, field_name in TASK_COLUMNS.items():
+            tasks[field_name] = set()
+            for name in (row.get(column) or "").split(";"):
+                if not name.strip():
+                    continue
+                task_id = lookups.tasks[field_name].get(name.strip().lower())
+                if task_id is None:
+                    report.error(line, f"Unknown {column.lower()} entry {name.strip()!r}.")
+                else:
+                    tasks[field_name].add(task_id)
+
+        if day is None or staff_id is None or shift_type_id is None:
+            continue
+        key = (staff_id, day, shift_type_id)
+        if key in parsed:
+            report.error(line, f"Duplicates line {parsed[key][0]} (same staff, date and shift type).")
+            continue
+        parsed[key] = (line, status, approved, (row.get("Notes") or "").strip(), tasks)
+
+    if parsed:
+        dates = [day for _, day, _ in parsed]
+        existing = Shift.objects.filter(
+            date__range=(min(dates), max(dates)),
+            staff_id__in={staff_id for staff_id, _, _ in parsed},
+        ).values_list("staff_id", "date", "shift_type_id")
+        for key in existing:
+            if key in parsed:
+                report.error(parsed[key][0], "A shift for this staff member, date and shift type already exists.")
+
+    report.errors.sort()
+    report.shifts = len(parsed)
+    report.links = sum(len(ids) for *_, tasks in parsed.values() for ids in tasks.values())
+    if not report.written:
+        return report
+
+    with transaction.atomic():
+        shifts = Shift.objects.bulk_create(
+            [
+                Shift(
+                    staff_id=staff_id,
+                    date=day,
+                    shift_type_id=shift_type_id,
+                    status=status,
+                    is_approved_by_manager=approved,
+                    notes=notes,
+                )
+                for (staff_id, day, shift_type_id), (_, status, approved, notes, _) in parsed.items()
+            ],
+            batch_size=batch_size,
+        )
+        for field_name in SHIFT_TASK_FIELDS.values():
+            field = Shift._meta.get_field(field_name)
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            through.objects.bulk_create(
+                [
+                    through(**{f"{source}_id": shift.pk, f"{target}_id": task_id})
+                    for shift, (*_, tasks) in zip(shifts, parsed.values())
+                    for task_id in tasks[field_name]
+                ],
+                batch_size=batch_size,
+            )
+        invalidate_dates({day for _, day, _ in parsed})
+        rebuild_rollups(min(dates), max(dates), {staff_id for staff_id, _, _ in parsed})
+    return report
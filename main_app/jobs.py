@@ -0,0 +1,201 @@
+# In main_app/jobs.py
+
+import datetime
+import logging
+import traceback
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .exports import export_roster_pdf, prune_exports
+from .models import Job, Rotation
+from .services import apply_rotation, save_monthly_assignments
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+# Seconds to wait before retrying a failed attempt, indexed by attempt number.
+RETRY_BACKOFF = (30, 120, 600)
+
+# Staff whose rotation is written per transaction by the apply_rotation job.
+ROTATION_BATCH_STAFF = 20
+
+
+def job_handler(kind):
+    """Register ``func(job, **params)`` as the handler for jobs of ``kind``.
+
+    Handlers must be safe to run more than once: a job is retried after an
+    exception and re-run if its worker dies mid-way.
+    """
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def submit(kind, params, idempotency_key=None, user=None, max_attempts=3):
+    """Queue a job, or return the existing one for ``idempotency_key``.
+
+    Submitting the same key twice (a double click, a resent form) never
+    creates a second job. A key whose job already failed for good is queued
+    again from scratch.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"No job handler registered for {kind!r}")
+
+    job, created = Job.objects.get_or_create(
+        idempotency_key=idempotency_key or uuid.uuid4().hex,
+        defaults={
+            "kind": kind,
+            "params": params,
+            "created_by": user,
+            "max_attempts": max_attempts,
+        },
+    )
+    if not created and job.status == Job.Status.FAILED:
+        job.status = Job.Status.QUEUED
+        job.attempts = 0
+        job.error = ""
+        job.run_after = timezone.now()
+        job.save(update_fields=["status", "attempts", "error", "run_after"])
+
+    if getattr(settings, "JOB_QUEUE_EAGER", False) and not job.is_finished:
+        transaction.on_commit(lambda: run_pending(worker_id="eager"))
+    return job
+
+
+def requeue_stale(timeout=None):
+    """Put jobs back in the queue whose worker stopped reporting.
+
+    A worker reports through ``Job.set_progress``, so a handler running
+    longer than the timeout has to report progress as it goes.
+    """
+    timeout = timeout or getattr(settings, "JOB_QUEUE_STALE_SECONDS", 30 * 60)
+    cutoff = timezone.now() - datetime.timedelta(seconds=timeout)
+    return Job.objects.filter(status=Job.Status.RUNNING, locked_at__lt=cutoff).update(
+        status=Job.Status.QUEUED, locked_by="", locked_at=None
+    )
+
+
+def claim_next(worker_id):
+    """Atomically take the oldest runnable job, or return None.
+
+    ``skip_locked`` lets several workers poll the table without blocking on
+    each other; on SQLite, which has no row locks, the status filter on the
+    UPDATE keeps two workers from claiming the same job.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.Status.QUEUED, run_after__lte=now)
+            .order_by("run_after", "pk")
+            .first()
+        )
+        if job is None:
+            return None
+        claimed = Job.objects.filter(pk=job.pk, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING,
+            attempts=job.attempts + 1,
+            locked_by=worker_id,
+            locked_at=now,
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job):
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No job handler registered for {job.kind!r}")
+        result = handler(job, **job.params)
+    except Exception:
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            delay = RETRY_BACKOFF[min(job.attempts, len(RETRY_BACKOFF)) - 1]
+            job.status = Job.Status.QUEUED
+            job.run_after = timezone.now() + datetime.timedelta(seconds=delay)
+        else:
+            job.status = Job.Status.FAILED
+            job.finished_at = timezone.now()
+        logger.exception("Job %s failed (attempt %s)", job.pk, job.attempts)
+    else:
+        job.status = Job.Status.SUCCEEDED
+        job.result = result or {}
+        job.error = ""
+        job.finished_at = timezone.now()
+    job.locked_by = ""
+    job.locked_at = None
+    job.save(
+        update_fields=[
+            "status",
+            "result",
+            "error",
+            "run_after",
+            "finished_at",
+            "locked_by",
+            "locked_at",
+        ]
+    )
+    return job
+
+
+def run_pending(worker_id="inline", limit=None):
+    """Run runnable jobs until the queue is empty (or ``limit`` is reached)."""
+    done = 0
+    while limit is None or done < limit:
+        job = claim_next(worker_id)
+        if job is None:
+            break
+        run_job(job)
+        done += 1
+    return done
+
+
+@job_handler("apply_rotation")
+def apply_rotation_job(job, rotation_id, staff_ids, start_date, end_date, offsets=None):
+    rotation_days = list(Rotation.objects.get(pk=rotation_id).days.all())
+    start_date = datetime.date.fromisoformat(start_date)
+    end_date = datetime.date.fromisoformat(end_date)
+    # JSON object keys are always strings.
+    offsets = {int(staff_id): offset for staff_id, offset in (offsets or {}).items()}
+
+    # Each batch of staff is replaced in its own transaction, so progress and
+    # the heartbeat are seen by other workers while the job runs. A re-run
+    # replaces the same ranges again.
+    totals = {"created": 0, "deleted": 0}
+    job.set_progress(0, len(staff_ids))
+    for index in range(0, len(staff_ids), ROTATION_BATCH_STAFF):
+        batch = staff_ids[index:index + ROTATION_BATCH_STAFF]
+        result = apply_rotation(rotation_days, batch, start_date, end_date, offsets=offsets)
+        for key in totals:
+            totals[key] += result[key]
+        job.set_progress(index + len(batch))
+    return totals
+
+
+@job_handler("save_monthly_assignments")
+def save_monthly_assignments_job(job, year, month, selections):
+    return save_monthly_assignments(year, month, selections)
+
+
+@job_handler("export_roster_pdf")
+def export_roster_pdf_job(job, start_date, end_date):
+    directory = Path(settings.EXPORT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    prune_exports(directory, settings.EXPORT_MAX_AGE)
+    filename = f"roster_{start_date}_{end_date}_job{job.pk}.pdf"
+    days = export_roster_pdf(
+        datetime.date.fromisoformat(start_date),
+        datetime.date.fromisoformat(end_date),
+        directory / filename,
+        progress=job.set_progress,
+    )
+    return {"file": filename, "days": days}
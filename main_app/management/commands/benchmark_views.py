@@ -0,0 +1,116 @@
+import datetime
+import json
+import platform
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from main_app.benchmarks import CASES, build_fixtures, run_benchmarks, unbenchmarked_views
+from main_app.datasets import seed_dataset
+
+LOCAL_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "benchmark"},
+    settings.ROSTER_CACHE_ALIAS: {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "benchmark-roster",
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway SQLite database with a synthetic unit, request every "
+        "view and check its query and latency budgets."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--staff", type=int, default=300)
+        parser.add_argument("--days", type=int, default=365, help="Days of shifts, ending a few weeks after today.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--repeat", type=int, default=3, help="Warm requests per view after the cold one.")
+        parser.add_argument("--only", nargs="+", metavar="URL_NAME", help="Benchmark just these views.")
+        parser.add_argument("-o", "--output", default="benchmark-results.json")
+        parser.add_argument("--baseline", help="Earlier results file to compare against.")
+        parser.add_argument("--no-latency", action="store_true", help="Enforce query budgets only.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The benchmark runs on local SQLite only; unset DATABASE_URL.")
+        missing = unbenchmarked_views()
+        if missing:
+            raise CommandError(f"No benchmark case for: {', '.join(sorted(missing))}.")
+        cases = CASES
+        if options["only"]:
+            cases = [case for case in CASES if case.name in options["only"]]
+
+        baseline = {}
+        if options["baseline"]:
+            with open(options["baseline"]) as handle:
+                baseline = {result["name"]: result for result in json.load(handle)["results"]}
+
+        today = datetime.date.today()
+        start_date = today - datetime.timedelta(days=max(options["days"] - 30, 1))
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir, override_settings(
+                CACHES=LOCAL_CACHES,
+                EXPORT_DIR=f"{temp_dir}/exports",
+                PDF_CACHE_DIR=f"{temp_dir}/pdf_cache",
+            ):
+                started = time.perf_counter()
+                dataset = seed_dataset(
+                    staff=options["staff"], start_date=start_date, days=options["days"], seed=options["seed"]
+                )
+                seed_seconds = time.perf_counter() - started
+                self.stdout.write(
+                    f"Seeded {dataset['shifts']} shifts for {dataset['staff']} staff in {seed_seconds:.1f}s."
+                )
+                results = run_benchmarks(
+                    build_fixtures(today), cases, options["repeat"], check_latency=not options["no_latency"]
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for result in results:
+            line = (
+                f"{result['name']:<32} {result['status']:>3} {result['queries']:>4} q "
+                f"{result['cold_ms']:>9.1f} ms cold {result['warm_ms']:>9.1f} ms warm"
+            )
+            previous = baseline.get(result["name"])
+            if previous:
+                line += (
+                    f"  ({result['queries'] - previous['queries']:+d} q, "
+                    f"{result['cold_ms'] - previous['cold_ms']:+.1f} ms)"
+                )
+            if result["failures"]:
+                line += "  OVER BUDGET: " + "; ".join(result["failures"])
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+
+        with open(options["output"], "w") as handle:
+            json.dump(
+                {
+                    "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "django": django.get_version(),
+                    "python": platform.python_version(),
+                    "options": {key: options[key] for key in ("staff", "days", "seed", "repeat")},
+                    "dataset": dict(dataset),
+                    "seed_seconds": round(seed_seconds, 2),
+                    "results": results,
+                },
+                handle,
+                indent=2,
+            )
+        self.stdout.write(f"Wrote {options['output']}.")
+
+        failed = [result["name"] for result in results if result["failures"]]
+        if failed:
+            raise CommandError(f"{len(failed)} view(s) over budget: {', '.join(failed)}.")
@@ -0,0 +1,39 @@
+import csv
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.exports import CSV_EXPORTS
+
+
+class Command(BaseCommand):
+    help = "Write shifts or monthly assignments for a date range as CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("export", choices=sorted(CSV_EXPORTS))
+        parser.add_argument("start", type=datetime.date.fromisoformat, help="First day (YYYY-MM-DD).")
+        parser.add_argument("end", type=datetime.date.fromisoformat, help="Last day (YYYY-MM-DD).")
+        parser.add_argument("-o", "--output", help="Output file (default: standard output).")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        start, end = options["start"], options["end"]
+        if end < start:
+            raise CommandError("The end date must be on or after the start date.")
+        header, rows = CSV_EXPORTS[options["export"]]
+
+        output = open(options["output"], "w", newline="") if options["output"] else sys.stdout
+        try:
+            writer = csv.writer(output)
+            writer.writerow(header)
+            written = 0
+            for row in rows(start, end, chunk_size=options["chunk_size"]):
+                writer.writerow(row)
+                written += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        if options["output"]:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {written} row(s) to {options['output']}."))
@@ -0,0 +1,26 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.exports import export_roster_pdf
+
+
+class Command(BaseCommand):
+    help = "Write the daily schedules for a date range into one PDF."
+
+    def add_arguments(self, parser):
+        parser.add_argument("start", type=datetime.date.fromisoformat, help="First day (YYYY-MM-DD).")
+        parser.add_argument("end", type=datetime.date.fromisoformat, help="Last day (YYYY-MM-DD).")
+        parser.add_argument("-o", "--output", help="Output file (default roster_<start>_<end>.pdf).")
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Rendering processes (default: one per CPU)."
+        )
+
+    def handle(self, *args, **options):
+        start, end = options["start"], options["end"]
+        if end < start:
+            raise CommandError("The end date must be on or after the start date.")
+        output = options["output"] or f"roster_{start}_{end}.pdf"
+
+        days = export_roster_pdf(start, end, output, workers=options["workers"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {days} day(s) to {output}."))
@@ -0,0 +1,72 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from main_app.datasets import seed_dataset
+from main_app.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a deterministic synthetic unit: staff, catalogs, "
+        "rotations, shifts with tasks and monthly assignments."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--staff", type=int, default=500)
+        parser.add_argument("--years", type=float, default=1.0, help="Length of the roster (default 1).")
+        parser.add_argument(
+            "--start",
+            type=datetime.date.fromisoformat,
+            help="First roster day, YYYY-MM-DD (default: first of the month, --years back).",
+        )
+        parser.add_argument(
+            "--assessed-until",
+            type=datetime.date.fromisoformat,
+            help="Shifts before this day get an assessment status (default: today).",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--prefix", default="synth", help="Username prefix of the generated staff.")
+        parser.add_argument("--password", default="password", help="Password of every generated account.")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options["staff"] < 1 or options["years"] <= 0:
+            raise CommandError("--staff and --years must be positive.")
+        if User.objects.filter(username__startswith=options["prefix"]).exists():
+            raise CommandError(f"Users named {options['prefix']}* already exist; choose another --prefix.")
+
+        days = round(options["years"] * 365)
+        start_date = options["start"]
+        if start_date is None:
+            start_date = (datetime.date.today() - datetime.timedelta(days=days)).replace(day=1)
+
+        self.stdout.write(
+            f"Generating {days} days of shifts for {options['staff']} staff from {start_date} "
+            f"on {connection.vendor}..."
+        )
+        started = time.perf_counter()
+
+        def progress(shifts, day):
+            self.stdout.write(f"  {shifts} shifts, up to {day}", ending="\r")
+            self.stdout.flush()
+
+        created = seed_dataset(
+            staff=options["staff"],
+            start_date=start_date,
+            days=days,
+            seed=options["seed"],
+            assessed_until=options["assessed_until"],
+            batch_size=options["batch_size"],
+            prefix=options["prefix"],
+            password=options["password"],
+            progress=progress if options["verbosity"] > 0 else None,
+        )
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write("")
+        for name, count in created.items():
+            self.stdout.write(f"  {name.replace('_', ' ')}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"Done in {elapsed:.1f}s."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.imports import import_shifts
+
+
+class Command(BaseCommand):
+    help = "Import shifts and their tasks from a CSV file in the shift export format."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file to import.")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate the file and report what would be imported without saving anything.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], newline="", encoding="utf-8-sig") as handle:
+                report = import_shifts(handle, dry_run=options["dry_run"], batch_size=options["batch_size"])
+        except OSError as e:
+            raise CommandError(e)
+
+        for line, message in report.errors:
+            self.stderr.write(f"Line {line}: {message}")
+        if not report.ok:
+            raise CommandError(f"Nothing was imported: {len(report.errors)} problem(s) in {report.rows} row(s).")
+
+        summary = f"{report.shifts} shift(s) with {report.links} task link(s)"
+        if report.dry_run:
+            self.stdout.write(f"Dry run: {summary} would be imported.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Imported {summary}."))
@@ -0,0 +1,40 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.rollups import rebuild_rollups, verify_rollups
+
+
+def month_arg(value):
+    return datetime.datetime.strptime(value, "%Y-%m").date()
+
+
+class Command(BaseCommand):
+    help = "Recompute the workload rollup tables from the shifts, or check them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=month_arg, help="First month (YYYY-MM).")
+        parser.add_argument("--end", type=month_arg, help="Last month (YYYY-MM).")
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only compare the stored rollups with fresh counts; exit non-zero on drift.",
+        )
+
+    def handle(self, *args, **options):
+        start, end = options["start"], options["end"]
+
+        if options["verify"]:
+            drift = verify_rollups(start, end)
+            for (staff_id, month, kind, key), (stored, expected) in sorted(drift.items()):
+                self.stdout.write(
+                    f"staff {staff_id} {month:%Y-%m} {kind}={key}: "
+                    f"stored {stored}, expected {expected}"
+                )
+            if drift:
+                raise CommandError(f"{len(drift)} rollup row(s) out of date.")
+            self.stdout.write(self.style.SUCCESS("Rollups are up to date."))
+            return
+
+        written = rebuild_rollups(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup row(s)."))
@@ -0,0 +1,40 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from main_app.jobs import claim_next, requeue_stale, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (rotations, bulk monthly assignments, exports)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the queue once and exit.")
+        parser.add_argument(
+            "--sleep", type=float, default=2.0, help="Seconds to wait when the queue is empty."
+        )
+        parser.add_argument(
+            "--max-jobs", type=int, default=None, help="Exit after running this many jobs."
+        )
+
+    def handle(self, *args, **options):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        ran = 0
+        self.stdout.write(f"Job worker {worker_id} started.")
+
+        while options["max_jobs"] is None or ran < options["max_jobs"]:
+            requeue_stale()
+            job = claim_next(worker_id)
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+
+            job = run_job(job)
+            ran += 1
+            self.stdout.write(f"{job} after {job.attempts} attempt(s).")
+
+        self.stdout.write(self.style.SUCCESS(f"Ran {ran} job(s)."))
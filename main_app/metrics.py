@@ -0,0 +1,227 @@
+# In main_app/metrics.py
+
+import bisect
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# name -> (help text, buckets), in exposition order.
+HISTOGRAMS = {
+    "request_duration_seconds": ("Wall time of the request.", SECONDS_BUCKETS),
+    "db_duration_seconds": ("Time spent in SQL statements.", SECONDS_BUCKETS),
+    "template_duration_seconds": ("Time spent rendering templates.", SECONDS_BUCKETS),
+    "db_queries": ("SQL statements issued.", COUNT_BUCKETS),
+    "db_duplicate_queries": ("SQL statements repeating an earlier statement's SQL.", COUNT_BUCKETS),
+}
+
+METRIC_PREFIX = "nursing_"
+
+# Label for requests that did not resolve to a URL pattern (404s, static).
+UNRESOLVED = "<unresolved>"
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects it."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+
+class Registry:
+    """Per-process histograms keyed by metric and view name.
+
+    Each worker process keeps its own numbers; Prometheus scrapes and sums
+    them per instance like any other multi-process exporter.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def observe(self, view, values):
+        with self.lock:
+            for name, value in values.items():
+                key = (name, view)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(HISTOGRAMS[name][1])
+                self.histograms[key].observe(value)
+
+    def clear(self):
+        with self.lock:
+            self.histograms.clear()
+
+    def render(self):
+        """The histograms in the Prometheus text exposition format."""
+        with self.lock:
+            snapshot = {
+                key: (histogram.buckets, list(histogram.counts), histogram.sum)
+                for key, histogram in self.histograms.items()
+            }
+        lines = []
+        for name, (help_text, _) in HISTOGRAMS.items():
+            metric = METRIC_PREFIX + name
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for (key_name, view), (buckets, counts, total) in sorted(snapshot.items()):
+                if key_name != name:
+                    continue
+                label = view.replace("\\", "\\\\").replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip((*buckets, "+Inf"), counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{view="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{view="{label}"}} {total:.6f}')
+                lines.append(f'{metric}_count{{view="{label}"}} {cumulative}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class RequestStats:
+    """What one request spent, filled in by the query and template hooks."""
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.statements = Counter()
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.statements[sql] += 1
+
+    @property
+    def queries(self):
+        return sum(self.statements.values())
+
+    @property
+    def duplicate_queries(self):
+        return self.queries - len(self.statements)
+
+    def top_repeated(self, limit=5):
+        return [(sql, count) for sql, count in self.statements.most_common(limit) if count > 1]
+
+
+_current = ContextVar("request_stats", default=None)
+
+
+@contextmanager
+def timed_templates():
+    """Add the enclosed rendering to the current request's template time.
+
+    Nested renders (a render_to_string inside a template tag) count once.
+    """
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    stats.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.template_depth -= 1
+        if not stats.template_depth:
+            stats.template_seconds += time.perf_counter() - started
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed_templates():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing every render for the metrics."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else UNRESOLVED
+
+
+class RequestMetricsMiddleware:
+    """Record wall, DB and template time and query counts per URL name.
+
+    With ``METRICS_SLOW_REQUEST_MS`` set, requests slower than that are
+    logged with their most repeated SQL, which is usually an N+1 loop.
+    Work done while a streaming response is consumed is not counted.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, "METRICS_SLOW_REQUEST_MS", None)
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats.record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        elapsed = time.perf_counter() - started
+
+        view = view_name(request)
+        registry.observe(
+            view,
+            {
+                "request_duration_seconds": elapsed,
+                "db_duration_seconds": stats.db_seconds,
+                "template_duration_seconds": stats.template_seconds,
+                "db_queries": stats.queries,
+                "db_duplicate_queries": stats.duplicate_queries,
+            },
+        )
+        if self.slow_ms is not None and elapsed * 1000 >= self.slow_ms:
+            self.log_slow_request(request, view, response, elapsed, stats)
+        return response
+
+    def log_slow_request(self, request, view, response, elapsed, stats):
+        lines = [
+            f"Slow request: {request.method} {request.path} ({view}) -> {response.status_code} "
+            f"in {elapsed * 1000:.0f} ms; {stats.queries} queries ({stats.duplicate_queries} repeated) "
+            f"in {stats.db_seconds * 1000:.0f} ms; templates {stats.template_seconds * 1000:.0f} ms"
+        ]
+        for sql, count in stats.top_repeated():
+            lines.append(f"  {count}x {sql[:300]}")
+        logger.warning("\n".join(lines))
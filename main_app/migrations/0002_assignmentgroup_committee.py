@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssignmentGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='e.g., Group 1, Clinic Team', max_length=50, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Committee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='e.g., Medical Equipment, Health Promotion', max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Committees',
+            },
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='assignment_group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='staff_members', to='main_app.assignmentgroup'),
+        ),
+        migrations.AlterField(
+            model_name='monthlyassignment',
+            name='group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='main_app.assignmentgroup'),
+        ),
+        migrations.AlterField(
+            model_name='monthlyassignment',
+            name='committee',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='main_app.committee'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0002_assignmentgroup_committee'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RosterVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=32, unique=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0004_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkloadRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month.')),
+                ('kind', models.CharField(choices=[('shift_type', 'Shift type'), ('main', 'Main assignment'), ('sub', 'Sub-assignment'), ('clinic', 'Clinic'), ('emergency', 'Emergency role'), ('status', 'Status')], max_length=16)),
+                ('key', models.CharField(max_length=32)),
+                ('count', models.IntegerField(default=0)),
+                ('staff', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='workload_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('staff', 'month', 'kind', 'key'), name='workload_rollup_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0005_workloadrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='monthlyassignment',
+            index=models.Index(fields=['start_date', 'end_date'], name='monthly_assign_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthlyassignment',
+            index=models.Index(fields=['staff', 'status', 'start_date'], name='monthly_assign_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(fields=['date', 'shift_type'], name='shift_date_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(fields=['staff', 'status', 'date'], name='shift_staff_status_date_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+from collections import Counter
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+# Frozen copies of roster.SHIFT_TASK_FIELDS and the WorkloadRollup kinds:
+# migrations must not depend on code that may change later.
+SHIFT_TASK_FIELDS = {
+    "main": "assignments",
+    "sub": "sub_assignments",
+    "clinic": "clinics",
+    "emergency": "emergency_roles",
+}
+
+
+def fill_workload_rollups(apps, schema_editor):
+    """Count every existing shift into WorkloadRollup, as rollups.rebuild_rollups does.
+
+    The table was created empty; without this, the analytics pages show no
+    work for any month before the deploy.
+    """
+    Shift = apps.get_model("main_app", "Shift")
+    WorkloadRollup = apps.get_model("main_app", "WorkloadRollup")
+
+    counts = Counter()
+    rows = (
+        Shift.objects.annotate(month=TruncMonth("date"))
+        .values_list("staff_id", "month", "shift_type_id", "status")
+        .annotate(total=Count("pk"))
+        .order_by()
+    )
+    for staff_id, month, shift_type_id, status, total in rows:
+        counts[(staff_id, month, "shift_type", str(shift_type_id))] += total
+        counts[(staff_id, month, "status", str(status))] += total
+
+    for task_type, field_name in SHIFT_TASK_FIELDS.items():
+        field = Shift._meta.get_field(field_name)
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        rows = (
+            field.remote_field.through.objects.annotate(month=TruncMonth(f"{source}__date"))
+            .values_list(f"{source}__staff_id", "month", f"{target}_id")
+            .annotate(total=Count("pk"))
+            .order_by()
+        )
+        for staff_id, month, task_id, total in rows:
+            counts[(staff_id, month, task_type, str(task_id))] = total
+
+    WorkloadRollup.objects.all().delete()
+    WorkloadRollup.objects.bulk_create(
+        [
+            WorkloadRollup(staff_id=staff_id, month=month, kind=kind, key=key, count=total)
+            for (staff_id, month, kind, key), total in counts.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0007_user_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_workload_rollups, migrations.RunPython.noop),
+    ]
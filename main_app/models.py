@@ -2,6 +2,8 @@
 
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
 
 class AssignmentStatus(models.TextChoices):
@@ -54,6 +56,16 @@ class User(AbstractUser):
     def __str__(self):
         return self.get_full_name() or self.username
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Staff picker: case-insensitive prefix search on each name,
+            # and keyset paging in display order.
+            models.Index(Lower('first_name'), name='user_first_name_lower_idx'),
+            models.Index(Lower('last_name'), name='user_last_name_lower_idx'),
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+            models.Index(fields=['first_name', 'last_name', 'id'], name='user_name_order_idx'),
+        ]
+
 # --- Shift and Task Models ---
 
 class ShiftType(models.Model):
@@ -103,7 +115,17 @@ class Shift(models.Model):
         return f"Shift for {self.staff} on {self.date} ({self.shift_type.name})"
 
     class Meta:
+        # The unique index leads with (staff, date), so it already serves a
+        # staff member's shifts over a date range.
         unique_together = ('staff', 'date', 'shift_type')
+        indexes = [
+            # Daily schedule, checklist and monthly roster: one day or a
+            # date range, optionally narrowed to a shift type.
+            models.Index(fields=['date', 'shift_type'], name='shift_date_type_idx'),
+            # Appraisal counts per staff member and status over a date
+            # range; covers the whole grouped query.
+            models.Index(fields=['staff', 'status', 'date'], name='shift_staff_status_date_idx'),
+        ]
 
 class Rotation(models.Model):
     name = models.CharField(max_length=100, unique=True, help_text="e.g., 'Week A Rotation', '4 On / 2 Off'")
@@ -171,6 +193,13 @@ class MonthlyAssignment(models.Model):
 
     class Meta:
         ordering = ['group', 'task__name', 'start_date'] 
+        indexes = [
+            # Assignments overlapping a month, and the exact-month lookups
+            # of the bulk monthly assign.
+            models.Index(fields=['start_date', 'end_date'], name='monthly_assign_dates_idx'),
+            # Appraisal counts per staff member and status.
+            models.Index(fields=['staff', 'status', 'start_date'], name='monthly_assign_status_idx'),
+        ]
 
     def __str__(self):
         details = f"{self.staff.get_full_name()} - {self.task.name}"
@@ -179,4 +208,107 @@ class MonthlyAssignment(models.Model):
         if self.committee:
             details += f" [{self.committee}]"
         details += f" ({self.start_date} to {self.end_date})"
-        return details
\ No newline at end of file
+        return details
+
+class RosterVersion(models.Model):
+    """Change counter for one slice of the roster: a date, a month, or everything.
+
+    Cached roster pages embed these counters in their keys, so bumping a
+    counter makes every dependent entry unreachable in all workers at once.
+    """
+    scope = models.CharField(max_length=32, unique=True)
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.scope} (v{self.version})"
+
+
+class WorkloadRollup(models.Model):
+    """Number of a staff member's shifts in one month with a given attribute.
+
+    One row per (staff, month, kind, key): e.g. kind "shift_type" with the
+    shift type id as key, kind "clinic" with a clinic id, or kind "status"
+    with an AssignmentStatus value. Kept up to date by the signals in
+    ``main_app.signals`` and by the bulk services; ``manage.py rebuild_rollups``
+    recomputes or verifies them from the shift tables.
+    """
+    class Kind(models.TextChoices):
+        SHIFT_TYPE = 'shift_type', 'Shift type'
+        MAIN = 'main', 'Main assignment'
+        SUB = 'sub', 'Sub-assignment'
+        CLINIC = 'clinic', 'Clinic'
+        EMERGENCY = 'emergency', 'Emergency role'
+        STATUS = 'status', 'Status'
+
+    staff = models.ForeignKey(User, on_delete=models.CASCADE, related_name='workload_rollups')
+    month = models.DateField(help_text="First day of the month.")
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+    key = models.CharField(max_length=32)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['staff', 'month', 'kind', 'key'], name='workload_rollup_unique'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.staff} {self.month:%Y-%m} {self.kind}={self.key}: {self.count}"
+
+
+
+class Job(models.Model):
+    """A unit of background work, stored in the database and run by `manage.py run_jobs`."""
+    class Status(models.TextChoices):
+        QUEUED = 'QUEUED', 'Queued'
+        RUNNING = 'RUNNING', 'Running'
+        SUCCEEDED = 'SUCCEEDED', 'Succeeded'
+        FAILED = 'FAILED', 'Failed'
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    idempotency_key = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'run_after'], name='job_ready_idx')]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.Status.SUCCEEDED, self.Status.FAILED)
+
+    def set_progress(self, progress, total=None):
+        """Record progress; also the worker's heartbeat, so a long job is not requeued as stale."""
+        self.progress = progress
+        if total is not None:
+            self.total = total
+        self.locked_at = timezone.now()
+        Job.objects.filter(pk=self.pk).update(
+            progress=self.progress, total=self.total, locked_at=self.locked_at
+        )
@@ -0,0 +1,72 @@
+# In main_app/pagination.py
+
+import base64
+import json
+from collections import namedtuple
+
+from django.db.models import Q
+
+KeysetPage = namedtuple("KeysetPage", "items next_cursor")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    # Dates and the like travel as strings; the field lookups parse them back.
+    data = json.dumps([value if isinstance(value, (int, str)) else str(value) for value in values])
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, length):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as error:
+        raise InvalidCursor("Malformed page cursor.") from error
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor("Malformed page cursor.")
+    return values
+
+
+def seek_filter(ordering, values):
+    """Match the rows that come after ``values`` in ``ordering``.
+
+    ``ordering`` lists non-null fields, each optionally prefixed with "-",
+    ending with a unique one. The redundant bound on the leading field lets
+    the database seek into an index on it instead of scanning from the start.
+    """
+    after = None
+    for field, value in reversed(list(zip(ordering, values))):
+        name = field.lstrip("-")
+        past = Q(**{f"{name}__{'lt' if field.startswith('-') else 'gt'}": value})
+        after = past if after is None else past | (Q(**{name: value}) & after)
+    leading = ordering[0]
+    bound = Q(**{f"{leading.lstrip('-')}__{'lte' if leading.startswith('-') else 'gte'}": values[0]})
+    return bound & after
+
+
+def keyset_page(queryset, ordering, cursor=None, per_page=50):
+    """Return one page of ``queryset`` and the cursor of the next one.
+
+    Unlike OFFSET paging, every page costs the same however deep it is,
+    and rows added or removed meanwhile do not shift the following pages.
+    Raises InvalidCursor for a cursor that was not produced here.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(seek_filter(ordering, decode_cursor(cursor, len(ordering))))
+    items = list(queryset[: per_page + 1])
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor([_attribute(last, field.lstrip("-")) for field in ordering])
+    return KeysetPage(items, next_cursor)
+
+
+def _attribute(item, path):
+    for name in path.split("__"):
+        item = getattr(item, name)
+    return item
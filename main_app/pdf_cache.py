@@ -0,0 +1,137 @@
+# In main_app/pdf_cache.py
+
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+import xhtml2pdf
+from django.conf import settings
+from xhtml2pdf import pisa
+
+# Bump to discard every cached PDF, e.g. after changing the PDF stylesheet
+# in a way that does not show up in the rendered HTML.
+PDF_FORMAT_VERSION = "1"
+
+
+class PdfRenderError(Exception):
+    """xhtml2pdf could not turn the HTML into a PDF."""
+
+
+def content_key(html):
+    """Name a PDF after everything that determines its bytes.
+
+    The HTML already reflects the day's shifts and the templates, so any
+    roster edit yields a new key and a stale PDF can never be served.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{PDF_FORMAT_VERSION}:{xhtml2pdf.__version__}\n".encode())
+    digest.update(html.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def render_pdf(html):
+    result = BytesIO()
+    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
+    if pdf.err:
+        raise PdfRenderError(pdf.err)
+    return result.getvalue()
+
+
+class PdfCache:
+    """Rendered PDFs on disk, one file per content key.
+
+    Files are written atomically, so readers never see a partial PDF. A hit
+    refreshes the file's modification time; once the directory grows past
+    ``max_bytes`` the least recently used files are removed until it is back
+    under 90% of the cap.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def path(self, key):
+        return self.directory / f"{key}.pdf"
+
+    def get(self, key):
+        """Open the cached PDF for ``key``, or return None on a miss."""
+        path = self.path(key)
+        try:
+            handle = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        # Opened first, so a concurrent prune cannot pull the file away.
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return handle
+
+    def put(self, key, data):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(temp_path, self.path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.prune()
+
+    def ensure(self, html):
+        """Render ``html`` into the cache unless it is already there; return its key."""
+        key = content_key(html)
+        if not self.path(key).exists():
+            self.put(key, render_pdf(html))
+        return key
+
+    def get_or_render(self, html):
+        """Return ``(key, file)`` for the PDF of ``html``, rendering it on a miss."""
+        key = content_key(html)
+        handle = self.get(key)
+        if handle is None:
+            data = render_pdf(html)
+            self.put(key, data)
+            handle = BytesIO(data)
+        return key, handle
+
+    def prune(self):
+        files = []
+        for path in self.directory.glob("*.pdf"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+
+def render_into_cache(directory, max_bytes, html):
+    """Process-pool entry point: render ``html`` into the cache at ``directory``.
+
+    Lives here rather than next to its caller because spawned workers import
+    it before Django is set up, so its module must not import any models.
+    """
+    return PdfCache(directory, max_bytes).ensure(html)
+
+
+def get_pdf_cache():
+    return PdfCache(settings.PDF_CACHE_DIR, settings.PDF_CACHE_MAX_BYTES)
@@ -0,0 +1,188 @@
+# In main_app/rollups.py
+
+import calendar
+import datetime
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Shift, WorkloadRollup
+from .roster import SHIFT_TASK_FIELDS, iter_shift_tasks
+
+Kind = WorkloadRollup.Kind
+
+
+def month_bounds(day):
+    """Return the first and last day of ``day``'s month."""
+    return day.replace(day=1), day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def month_of(day):
+    """First day of ``day``'s month; accepts an ISO string as models may hold one."""
+    if isinstance(day, str):
+        day = datetime.date.fromisoformat(day)
+    return day.replace(day=1)
+
+
+def shift_keys(staff_id, date, shift_type_id, status):
+    """Rollup keys a shift counts towards, ignoring its tasks."""
+    month = month_of(date)
+    return [
+        (staff_id, month, Kind.SHIFT_TYPE.value, str(shift_type_id)),
+        (staff_id, month, Kind.STATUS.value, str(status)),
+    ]
+
+
+def task_key(staff_id, date, task_type, task_id):
+    return (staff_id, month_of(date), task_type, str(task_id))
+
+
+def shift_deltas(shift, sign=1, with_tasks=False):
+    """Counter of rollup changes for adding (or, with ``sign=-1``, removing) a shift.
+
+    ``with_tasks`` also counts the shift's task links, read from the through
+    tables (four queries).
+    """
+    deltas = Counter()
+    for key in shift_keys(shift.staff_id, shift.date, shift.shift_type_id, shift.status):
+        deltas[key] += sign
+    if with_tasks:
+        for task in iter_shift_tasks(pk=shift.pk):
+            deltas[task_key(shift.staff_id, shift.date, task.task_type, task.task_id)] += sign
+    return deltas
+
+
+def apply_deltas(deltas):
+    """Add ``{(staff_id, month, kind, key): delta}`` to the stored counts.
+
+    Each key is a single ``count = count + delta`` UPDATE, so concurrent
+    writers never lose each other's changes. Rows that drop to zero are
+    removed.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    WorkloadRollup.objects.bulk_create(
+        [
+            WorkloadRollup(staff_id=staff_id, month=month, kind=kind, key=key, count=0)
+            for (staff_id, month, kind, key), delta in deltas.items()
+            if delta > 0
+        ],
+        ignore_conflicts=True,
+    )
+    for (staff_id, month, kind, key), delta in deltas.items():
+        WorkloadRollup.objects.filter(
+            staff_id=staff_id, month=month, kind=kind, key=key
+        ).update(count=F("count") + delta)
+    WorkloadRollup.objects.filter(
+        count__lte=0,
+        staff_id__in={key[0] for key in deltas},
+        month__in={key[1] for key in deltas},
+    ).delete()
+
+
+def compute_rollups(start_date=None, end_date=None, staff_ids=None):
+    """Count from the shift tables what the rollups should hold.
+
+    Both dates are widened to whole months. One grouped query over the
+    shifts and one per task through table.
+    """
+    shift_filters = {}
+    if start_date is not None:
+        shift_filters["date__gte"] = month_bounds(start_date)[0]
+    if end_date is not None:
+        shift_filters["date__lte"] = month_bounds(end_date)[1]
+    if staff_ids is not None:
+        shift_filters["staff_id__in"] = list(staff_ids)
+
+    expected = Counter()
+    rows = (
+        Shift.objects.filter(**shift_filters)
+        .annotate(month=TruncMonth("date"))
+        .values_list("staff_id", "month", "shift_type_id", "status")
+        .annotate(total=Count("pk"))
+        .order_by()
+    )
+    for staff_id, month, shift_type_id, status, total in rows:
+        for key in shift_keys(staff_id, month, shift_type_id, status):
+            expected[key] += total
+
+    for task_type, field_name in SHIFT_TASK_FIELDS.items():
+        field = Shift._meta.get_field(field_name)
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        rows = (
+            field.remote_field.through.objects.filter(
+                **{f"{source}__{lookup}": value for lookup, value in shift_filters.items()}
+            )
+            .annotate(month=TruncMonth(f"{source}__date"))
+            .values_list(f"{source}__staff_id", "month", f"{target}_id")
+            .annotate(total=Count("pk"))
+            .order_by()
+        )
+        for staff_id, month, task_id, total in rows:
+            expected[(staff_id, month, task_type, str(task_id))] = total
+    return expected
+
+
+def _stored_rollups(start_date=None, end_date=None, staff_ids=None):
+    rollups = WorkloadRollup.objects.all()
+    if start_date is not None:
+        rollups = rollups.filter(month__gte=month_bounds(start_date)[0])
+    if end_date is not None:
+        rollups = rollups.filter(month__lte=month_bounds(end_date)[0])
+    if staff_ids is not None:
+        rollups = rollups.filter(staff_id__in=list(staff_ids))
+    return rollups
+
+
+def rebuild_rollups(start_date=None, end_date=None, staff_ids=None):
+    """Replace the rollups for the given months (and staff) with fresh counts.
+
+    Used by the bulk services, which write shifts without signals, and by
+    ``manage.py rebuild_rollups``. Returns the number of rows written.
+    """
+    expected = compute_rollups(start_date, end_date, staff_ids)
+    with transaction.atomic():
+        _stored_rollups(start_date, end_date, staff_ids).delete()
+        WorkloadRollup.objects.bulk_create(
+            [
+                WorkloadRollup(staff_id=staff_id, month=month, kind=kind, key=key, count=total)
+                for (staff_id, month, kind, key), total in expected.items()
+            ],
+            batch_size=500,
+        )
+    return len(expected)
+
+
+def verify_rollups(start_date=None, end_date=None, staff_ids=None):
+    """Return ``{key: (stored, expected)}`` for every rollup that is wrong."""
+    expected = compute_rollups(start_date, end_date, staff_ids)
+    stored = Counter(
+        {
+            (staff_id, month, kind, key): count
+            for staff_id, month, kind, key, count in _stored_rollups(
+                start_date, end_date, staff_ids
+            ).values_list("staff_id", "month", "kind", "key", "count")
+        }
+    )
+    return {
+        key: (stored[key], expected[key])
+        for key in set(stored) | set(expected)
+        if stored[key] != expected[key]
+    }
+
+
+def rollup_counts(staff, first_month, last_month):
+    """Sum a staff member's rollups over whole months: ``{(kind, key): count}``."""
+    rows = (
+        WorkloadRollup.objects.filter(
+            staff=staff, month__range=(first_month, last_month)
+        )
+        .values_list("kind", "key")
+        .annotate(total=Sum("count"))
+        .order_by()
+    )
+    return Counter({(kind, key): total for kind, key, total in rows})
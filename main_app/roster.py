@@ -0,0 +1,253 @@
+# In main_app/roster.py
+
+import calendar
+import datetime
+from collections import namedtuple
+
+from django.template.loader import render_to_string
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from .catalogs import catalog
+from .models import Shift, User
+from .roster_cache import roster_cache
+
+
+class RosterRow:
+    """One staff member's line in a RosterMatrix.
+
+    Behaves like a read-only ``{day: [shifts]}`` mapping so templates can keep
+    using ``row.days|get_item:day``, but it never materialises that dict.
+    """
+
+    __slots__ = ("_matrix", "_index", "staff")
+
+    def __init__(self, matrix, index, staff):
+        self._matrix = matrix
+        self._index = index
+        self.staff = staff
+
+    @property
+    def days(self):
+        return self
+
+    def get(self, day, default=()):
+        return self._matrix.cell(self._index, day) or default
+
+
+class RosterMatrix:
+    """Staff x day grid for one month.
+
+    Only occupied cells are stored, as tuples keyed by ``(row, day)``, so an
+    empty roster costs nothing per staff member or per day.
+    """
+
+    __slots__ = ("year", "month", "num_days", "staff", "_cells")
+
+    def __init__(self, year, month, staff, cells):
+        self.year = year
+        self.month = month
+        self.num_days = calendar.monthrange(year, month)[1]
+        self.staff = staff
+        self._cells = cells
+
+    @property
+    def day_headers(self):
+        return range(1, self.num_days + 1)
+
+    def cell(self, row, day):
+        return self._cells.get((row, day), ())
+
+    def occupied_cells(self):
+        """Yield ``(row, day, shifts)`` for every cell with shifts, by row then day."""
+        for (row, day), shifts in sorted(self._cells.items()):
+            yield row, day, shifts
+
+    def __iter__(self):
+        for index, staff_member in enumerate(self.staff):
+            yield RosterRow(self, index, staff_member)
+
+    def __len__(self):
+        return len(self.staff)
+
+
+def build_roster_matrix(year, month):
+    """Load a month of shifts in a fixed number of queries.
+
+    Four queries regardless of head count: active staff, the month's shifts
+    (joined to their shift type), and one prefetch each for assignments and
+    clinics.
+    """
+    _, last_day = calendar.monthrange(year, month)
+    month_start = datetime.date(year, month, 1)
+    month_end = datetime.date(year, month, last_day)
+
+    staff = list(User.objects.filter(is_active=True).order_by("first_name"))
+    row_for_staff = {member.pk: index for index, member in enumerate(staff)}
+
+    shifts = (
+        Shift.objects.filter(
+            date__range=(month_start, month_end), staff__is_active=True
+        )
+        .select_related("shift_type")
+        .prefetch_related("assignments", "clinics")
+        .order_by("date", "shift_type__start_time", "pk")
+    )
+
+    cells = {}
+    for shift in shifts:
+        row = row_for_staff.get(shift.staff_id)
+        if row is None:
+            continue
+        key = (row, shift.date.day)
+        cells[key] = cells.get(key, ()) + (shift,)
+
+    return RosterMatrix(year, month, staff, cells)
+
+
+def build_roster_context(year, month):
+    """The cached ``roster`` entry of a month: its matrix and day headers."""
+    roster = build_roster_matrix(year, month)
+    return {"roster_data": roster, "day_headers": roster.day_headers}
+
+
+def cached_roster_context(year, month):
+    return roster_cache.month(year, month, "roster", lambda: build_roster_context(year, month))
+
+
+NURSE_ROLES = (User.Role.NURSE, User.Role.NURSE_MANAGER)
+
+
+def build_daily_snapshot(view_date, include_empty=True):
+    """Group one day's shifts by shift type and by role, in memory.
+
+    Returns ``{shift type name: {"shift_type", "nurse_shifts", "mas_shifts"}}``
+    ordered by shift start time, with staff ordered by first name inside each
+    group. Costs five queries however many shift types are configured; the
+    empty groups come from the shift type catalog.
+    """
+    shifts = (
+        Shift.objects.filter(date=view_date)
+        .select_related("staff", "shift_type")
+        .prefetch_related("assignments", "sub_assignments", "clinics", "emergency_roles")
+        .order_by("shift_type__start_time", "shift_type__name", "staff__first_name", "pk")
+    )
+
+    shifts_by_type = {}
+    if include_empty:
+        for shift_type in catalog("shift_types"):
+            shifts_by_type[shift_type.name] = {
+                "shift_type": shift_type,
+                "nurse_shifts": [],
+                "mas_shifts": [],
+            }
+
+    for shift in shifts:
+        group = shifts_by_type.setdefault(
+            shift.shift_type.name,
+            {"shift_type": shift.shift_type, "nurse_shifts": [], "mas_shifts": []},
+        )
+        if shift.staff.role in NURSE_ROLES:
+            group["nurse_shifts"].append(shift)
+        elif shift.staff.role == User.Role.MAS:
+            group["mas_shifts"].append(shift)
+
+    return shifts_by_type
+
+
+def cached_daily_snapshot(view_date, include_empty=True):
+    return roster_cache.day(
+        view_date,
+        "daily_snapshot" if include_empty else "daily_snapshot:staffed",
+        lambda: build_daily_snapshot(view_date, include_empty=include_empty),
+    )
+
+
+def render_daily_shifts(view_date, include_empty=True):
+    """Render the day's shift tables from the cached snapshot."""
+    shifts_by_type = cached_daily_snapshot(view_date, include_empty)
+    return render_to_string(
+        "daily_detail_shifts.html",
+        {"view_date": view_date, "shifts_by_type": shifts_by_type},
+    )
+
+
+def daily_pdf_html(view_date):
+    """HTML of the printable daily schedule, as fed to xhtml2pdf."""
+    return render_to_string(
+        "daily_detail.html",
+        {
+            "view_date": view_date,
+            "shifts_html": render_daily_shifts(view_date, include_empty=False),
+            "is_for_pdf": True,
+        },
+    )
+
+
+# Form prefix used by the daily assignment grid -> Shift many-to-many field.
+SHIFT_TASK_FIELDS = {
+    "main": "assignments",
+    "sub": "sub_assignments",
+    "clinic": "clinics",
+    "emergency": "emergency_roles",
+}
+
+ShiftTask = namedtuple(
+    "ShiftTask", "task_type shift_id staff_id shift_type_id date task_id"
+)
+
+
+def iter_shift_tasks(**shift_filters):
+    """Yield a ShiftTask for every task link on the shifts matching the filters.
+
+    Reads the four through tables directly (one query each) instead of
+    instantiating shifts and walking their related managers.
+    """
+    for task_type, field_name in SHIFT_TASK_FIELDS.items():
+        field = Shift._meta.get_field(field_name)
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        rows = field.remote_field.through.objects.filter(
+            **{f"{source}__{lookup}": value for lookup, value in shift_filters.items()}
+        ).values_list(
+            f"{source}_id",
+            f"{source}__staff_id",
+            f"{source}__shift_type_id",
+            f"{source}__date",
+            f"{target}_id",
+        )
+        for row in rows:
+            yield ShiftTask(task_type, *row)
+
+
+def build_selection_index(view_date):
+    """Map (task_type, shift_type_id, task_id) -> staff_id for one day."""
+    return {
+        (link.task_type, link.shift_type_id, link.task_id): link.staff_id
+        for link in iter_shift_tasks(date=view_date)
+    }
+
+
+class StaffOptions:
+    """Staff ``<option>`` lists for the daily assignment grid.
+
+    The full list (``html``) goes into the page once; each select carries
+    only its selected option and copies the full list in when it is first
+    focused, so the page grows with staff + cells rather than staff x cells.
+    """
+
+    def __init__(self, staff):
+        self._names = {member.pk: member.get_full_name() for member in staff}
+        self.html = mark_safe(
+            "".join(
+                format_html('<option value="{}">{}</option>', pk, name)
+                for pk, name in self._names.items()
+            )
+        )
+
+    def render(self, selected_staff_id=None):
+        if selected_staff_id not in self._names:
+            return ""
+        return format_html(
+            '<option value="{}" selected>{}</option>', selected_staff_id, self._names[selected_staff_id]
+        )
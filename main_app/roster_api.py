@@ -0,0 +1,190 @@
+# In main_app/roster_api.py
+
+import hashlib
+import json
+from collections import namedtuple
+
+from django.db.models import Q
+
+from .models import AssignmentStatus, RosterVersion, Shift
+from .roster import SHIFT_TASK_FIELDS, cached_daily_snapshot, cached_roster_context
+from .roster_cache import CATALOG_SCOPE, GLOBAL_SCOPE, day_scopes, month_scope, roster_cache, scope_versions
+
+API_VERSION = 1
+
+# Statuses travel as their index in this list.
+STATUSES = list(AssignmentStatus.values)
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+# A document of the API: its ETag, known after one small query, and a
+# callable producing the JSON body, only called when the client's copy is stale.
+Resource = namedtuple("Resource", "etag body")
+
+
+def version_etag(name, versions):
+    """Strong ETag for ``name`` at the given scope versions.
+
+    Every change to a shift, a staff member or a catalog bumps one of the
+    versions, so equal ETags mean byte-identical payloads.
+    """
+    key = f"v{API_VERSION}:{name}:" + ":".join(f"{scope}={version}" for scope, version in sorted(versions.items()))
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+def encode(payload):
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+class Catalogs:
+    """ID-indexed names of the shift types and tasks a payload refers to.
+
+    Filled from the shifts themselves rather than the in-memory catalogs, so
+    a payload never mixes new shifts with names from before a rename.
+    """
+
+    def __init__(self, task_types):
+        self.shift_types = {}
+        self.tasks = {task_type: {} for task_type in task_types}
+
+    def shift_type(self, shift_type):
+        self.shift_types[shift_type.pk] = [
+            shift_type.name,
+            shift_type.start_time.strftime("%H:%M"),
+            shift_type.end_time.strftime("%H:%M"),
+        ]
+        return shift_type.pk
+
+    def task_ids(self, shift, task_type):
+        names = self.tasks[task_type]
+        ids = []
+        for task in getattr(shift, SHIFT_TASK_FIELDS[task_type]).all():
+            names[task.pk] = task.name
+            ids.append(task.pk)
+        return ids
+
+    def as_dict(self):
+        return {"statuses": STATUSES, "shift_types": self.shift_types, "tasks": self.tasks}
+
+
+def monthly_roster_payload(year, month):
+    """The monthly roster grid: a staff list and one integer-coded entry per shift.
+
+    ``cells`` holds ``[row, day, shift_type_id, status, [main task ids],
+    [clinic ids]]``, ``row`` indexing ``staff``.
+    """
+    roster = cached_roster_context(year, month)["roster_data"]
+    catalogs = Catalogs(("main", "clinic"))
+    cells = [
+        [
+            row,
+            day,
+            catalogs.shift_type(shift.shift_type),
+            STATUS_CODES[shift.status],
+            catalogs.task_ids(shift, "main"),
+            catalogs.task_ids(shift, "clinic"),
+        ]
+        for row, day, shifts in roster.occupied_cells()
+        for shift in shifts
+    ]
+    return {
+        "api": API_VERSION,
+        "year": year,
+        "month": month,
+        "days": roster.num_days,
+        **catalogs.as_dict(),
+        "staff": [[member.pk, member.get_full_name(), member.role] for member in roster.staff],
+        "cells": cells,
+    }
+
+
+def _shift_row(catalogs, shift):
+    return [
+        catalogs.shift_type(shift.shift_type),
+        STATUS_CODES[shift.status],
+        *(catalogs.task_ids(shift, task_type) for task_type in SHIFT_TASK_FIELDS),
+    ]
+
+
+def daily_payload(day):
+    """One day's shifts in shift type order, nurses before MAS staff.
+
+    ``shifts`` holds ``[staff_id, shift_type_id, status, main, sub, clinic,
+    emergency]`` with the four task lists as ids.
+    """
+    catalogs = Catalogs(SHIFT_TASK_FIELDS)
+    staff = {}
+    shifts = []
+    for group in cached_daily_snapshot(day).values():
+        catalogs.shift_type(group["shift_type"])
+        for shift in group["nurse_shifts"] + group["mas_shifts"]:
+            staff[shift.staff_id] = [shift.staff.get_full_name(), shift.staff.role]
+            shifts.append([shift.staff_id, *_shift_row(catalogs, shift)])
+    return {
+        "api": API_VERSION,
+        "date": day.isoformat(),
+        **catalogs.as_dict(),
+        "staff": staff,
+        "shifts": shifts,
+    }
+
+
+def schedule_payload(user, today):
+    """A staff member's shifts from ``today`` on.
+
+    ``shifts`` holds ``[date, shift_type_id, status, main, sub, clinic,
+    emergency, notes]``.
+    """
+    catalogs = Catalogs(SHIFT_TASK_FIELDS)
+    shifts = (
+        Shift.objects.filter(staff=user, date__gte=today)
+        .select_related("shift_type")
+        .prefetch_related(*SHIFT_TASK_FIELDS.values())
+        .order_by("date", "shift_type__start_time", "pk")
+    )
+    return {
+        "api": API_VERSION,
+        "staff": user.pk,
+        "from": today.isoformat(),
+        "shifts": [[shift.date.isoformat(), *_shift_row(catalogs, shift), shift.notes] for shift in shifts],
+        **catalogs.as_dict(),
+    }
+
+
+def monthly_roster_resource(year, month):
+    scopes = [GLOBAL_SCOPE, month_scope(year, month)]
+    versions = scope_versions([*scopes, CATALOG_SCOPE])
+    return Resource(
+        version_etag(f"roster:{year}-{month}", versions),
+        lambda: roster_cache.get_or_build(
+            scopes, f"api_v{API_VERSION}_roster", lambda: encode(monthly_roster_payload(year, month)), versions
+        ),
+    )
+
+
+def daily_resource(day):
+    scopes = day_scopes(day)
+    versions = scope_versions([*scopes, CATALOG_SCOPE])
+    return Resource(
+        version_etag(f"daily:{day.isoformat()}", versions),
+        lambda: roster_cache.get_or_build(
+            scopes, f"api_v{API_VERSION}_daily", lambda: encode(daily_payload(day)), versions
+        ),
+    )
+
+
+def schedule_resource(user, today):
+    """The schedule changes with the global scope or any month from today's on.
+
+    Those versions are read in one query; the day is part of the ETag because
+    past shifts drop off the schedule at midnight.
+    """
+    versions = dict(
+        RosterVersion.objects.filter(
+            Q(scope=GLOBAL_SCOPE)
+            | Q(scope__startswith="month:", scope__gte=month_scope(today.year, today.month))
+        ).values_list("scope", "version")
+    )
+    return Resource(
+        version_etag(f"schedule:{user.pk}:{today.isoformat()}", versions),
+        lambda: encode(schedule_payload(user, today)),
+    )
@@ -0,0 +1,179 @@
+# In main_app/roster_cache.py
+
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+
+from .models import RosterVersion
+
+GLOBAL_SCOPE = "global"
+CATALOG_SCOPE = "catalog"
+
+
+def month_scope(year, month):
+    return f"month:{year:04d}-{month:02d}"
+
+
+def date_scope(day):
+    return f"date:{day.isoformat()}"
+
+
+def days_scope(year, month):
+    """Every day of a month at once, for changes spanning many days."""
+    return f"days:{year:04d}-{month:02d}"
+
+
+def day_scopes(day):
+    """The scopes a page showing ``day`` depends on."""
+    return [GLOBAL_SCOPE, days_scope(day.year, day.month), date_scope(day)]
+
+
+def months_between(start, end):
+    """Yield every (year, month) touched by the inclusive range start..end."""
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def current_version(scope):
+    return (
+        RosterVersion.objects.filter(scope=scope).values_list("version", flat=True).first()
+        or 0
+    )
+
+
+def scope_versions(scopes):
+    """``{scope: version}`` for ``scopes``, in one query; missing scopes are 0."""
+    versions = dict(
+        RosterVersion.objects.filter(scope__in=scopes).values_list("scope", "version")
+    )
+    return {scope: versions.get(scope, 0) for scope in scopes}
+
+
+class RosterCache:
+    """Read-through cache for roster contexts and rendered HTML fragments.
+
+    Entries are keyed by the version counters of the scopes they depend on
+    (``global`` plus a month, or a month's days and a date). Invalidation never deletes anything:
+    it bumps a counter in the database, so every worker stops finding the old
+    entries on its next lookup and the cache backend evicts them on its own
+    schedule (``MAX_ENTRIES``/``CULL_FREQUENCY``/``TIMEOUT`` in ``CACHES``).
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def month(self, year, month, name, builder):
+        return self.get_or_build([GLOBAL_SCOPE, month_scope(year, month)], name, builder)
+
+    def day(self, day, name, builder):
+        return self.get_or_build(day_scopes(day), name, builder)
+
+    def get_or_build(self, scopes, name, builder, versions=None):
+        """Return the cached value of ``name`` for the current ``scopes`` versions.
+
+        Pass ``versions`` (from ``scope_versions``) when they have already
+        been read for this request, to save the query; they should include
+        ``CATALOG_SCOPE``, which is read alongside ``scopes`` otherwise.
+        """
+        if versions is None:
+            versions = scope_versions([*scopes, CATALOG_SCOPE])
+        key = "roster:{}:{}".format(
+            name, ":".join(f"{scope}={versions.get(scope, 0)}" for scope in scopes)
+        )
+        value = self.backend.get(key)
+        if value is not None:
+            self._count(hit=True)
+            return value
+
+        self._count(hit=False)
+        # A catalog edit bumps ``global`` at once, but this worker may still
+        # hold the old catalogs until its next check; catch up first, or the
+        # entry would be built from stale names under the new key.
+        from .catalogs import registry
+
+        if CATALOG_SCOPE in versions:
+            registry.sync(versions[CATALOG_SCOPE])
+        else:
+            registry.sync(current_version(CATALOG_SCOPE))
+        value = builder()
+        self.backend.set(key, value)
+        return value
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+roster_cache = RosterCache(getattr(settings, "ROSTER_CACHE_ALIAS", "roster"))
+
+
+def bump_versions(scopes):
+    scopes = sorted(set(scopes))
+    if not scopes:
+        return
+    RosterVersion.objects.filter(scope__in=scopes).update(version=F("version") + 1)
+    RosterVersion.objects.bulk_create(
+        [RosterVersion(scope=scope, version=1) for scope in scopes],
+        ignore_conflicts=True,
+    )
+
+
+def invalidate_dates(dates):
+    """Expire every cached page that shows any of ``dates``."""
+    scopes = set()
+    for day in dates:
+        scopes.add(date_scope(day))
+        scopes.add(month_scope(day.year, day.month))
+    bump_versions(scopes)
+
+
+def invalidate_range(start, end):
+    """Expire the months overlapping start..end (monthly assignment pages)."""
+    bump_versions(month_scope(year, month) for year, month in months_between(start, end))
+
+
+def invalidate_date_range(start, end):
+    """Expire every cached page that shows a day in start..end.
+
+    Same effect as ``invalidate_dates`` over the range, with two version
+    bumps per month instead of two per day. The daily edit tokens (the
+    date scopes) are left alone.
+    """
+    bump_versions(
+        scope
+        for year, month in months_between(start, end)
+        for scope in (month_scope(year, month), days_scope(year, month))
+    )
+
+
+def invalidate_all():
+    bump_versions([GLOBAL_SCOPE])
+
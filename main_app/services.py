@@ -0,0 +1,370 @@
+# In main_app/services.py
+
+import calendar
+import datetime
+
+from django.db import transaction
+
+from .models import AssignmentStatus, MonthlyAssignment, RosterVersion, Shift
+from .rollups import rebuild_rollups
+from .roster import SHIFT_TASK_FIELDS
+from .roster_cache import date_scope, invalidate_date_range, invalidate_dates, invalidate_range
+from .signals import bulk_write
+
+
+class StaleRosterError(Exception):
+    """The day was saved by someone else after the form was loaded."""
+
+
+def _task_field(field_name):
+    """Return (through model, shift column, task column) for a task field."""
+    field = Shift._meta.get_field(field_name)
+    return (
+        field.remote_field.through,
+        field.m2m_field_name(),
+        field.m2m_reverse_field_name(),
+    )
+
+
+def delete_shifts(shifts):
+    """Delete shifts and their task links; return the number of shifts deleted.
+
+    QuerySet.delete() removes both in batched DELETEs. The per-row roster
+    and rollup handlers are silenced, so callers are responsible for
+    invalidating the roster pages they touched and rebuilding the rollups.
+    """
+    with bulk_write():
+        _, deleted = shifts.delete()
+    return deleted.get(Shift._meta.label, 0)
+
+
+def parse_daily_grid(data):
+    """Turn the daily assignment form into {(staff_id, shift_type_id): {field: {ids}}}."""
+    grid = {}
+    for key, staff_id in data.items():
+        task_type, _, rest = key.partition("_")
+        if task_type not in SHIFT_TASK_FIELDS or not staff_id:
+            continue
+        shift_type_id, _, task_id = rest.partition("_")
+        tasks = grid.setdefault(
+            (int(staff_id), int(shift_type_id)),
+            {field_name: set() for field_name in SHIFT_TASK_FIELDS.values()},
+        )
+        tasks[SHIFT_TASK_FIELDS[task_type]].add(int(task_id))
+    return grid
+
+
+def save_daily_grid(view_date, grid, expected_version=None):
+    """Apply a submitted daily grid as a diff against the day's shifts.
+
+    Unchanged shifts keep their checklist status, notes and approval; only
+    task links that were added or removed are written, with one bulk
+    statement per through table. The day's RosterVersion row doubles as a
+    per-date lock and an edit token: if ``expected_version`` no longer
+    matches, someone else saved in the meantime and StaleRosterError is
+    raised instead of overwriting their work.
+
+    Shifts that carry no tasks (e.g. generated from a rotation) are not part
+    of the grid and are left alone.
+    """
+    with transaction.atomic():
+        version, _ = RosterVersion.objects.select_for_update().get_or_create(
+            scope=date_scope(view_date)
+        )
+        stale = str(version.version) != str(expected_version)
+        if expected_version not in (None, "") and stale:
+            raise StaleRosterError(view_date)
+
+        existing = {
+            (staff_id, shift_type_id): shift_id
+            for shift_id, staff_id, shift_type_id in Shift.objects.filter(
+                date=view_date
+            ).values_list("pk", "staff_id", "shift_type_id")
+        }
+        links = {}
+        for field_name in SHIFT_TASK_FIELDS.values():
+            through, source, target = _task_field(field_name)
+            rows = through.objects.filter(**{f"{source}__date": view_date}).values_list(
+                "pk", f"{source}_id", f"{target}_id"
+            )
+            for link_id, shift_id, task_id in rows:
+                links.setdefault(field_name, {})[(shift_id, task_id)] = link_id
+
+        linked_shifts = {
+            shift_id for field_links in links.values() for shift_id, _ in field_links
+        }
+        removed_shifts = {
+            shift_id
+            for key, shift_id in existing.items()
+            if key not in grid and shift_id in linked_shifts
+        }
+        new_shifts = Shift.objects.bulk_create(
+            [
+                Shift(staff_id=staff_id, shift_type_id=shift_type_id, date=view_date)
+                for staff_id, shift_type_id in grid
+                if (staff_id, shift_type_id) not in existing
+            ]
+        )
+        shift_ids = dict(existing)
+        shift_ids.update(
+            {(shift.staff_id, shift.shift_type_id): shift.pk for shift in new_shifts}
+        )
+
+        links_added = links_removed = 0
+        for field_name in SHIFT_TASK_FIELDS.values():
+            through, source, target = _task_field(field_name)
+            current = links.get(field_name, {})
+            wanted = {
+                (shift_ids[key], task_id)
+                for key, tasks in grid.items()
+                for task_id in tasks[field_name]
+            }
+            stale_links = [
+                link_id
+                for (shift_id, task_id), link_id in current.items()
+                if (shift_id, task_id) not in wanted and shift_id not in removed_shifts
+            ]
+            if stale_links:
+                links_removed += through.objects.filter(pk__in=stale_links).delete()[0]
+            fresh_links = [
+                through(**{f"{source}_id": shift_id, f"{target}_id": task_id})
+                for shift_id, task_id in wanted
+                if (shift_id, task_id) not in current
+            ]
+            links_added += len(through.objects.bulk_create(fresh_links))
+
+        deleted = 0
+        if removed_shifts:
+            deleted = delete_shifts(Shift.objects.filter(pk__in=removed_shifts))
+
+        changed = bool(new_shifts or deleted or links_added or links_removed)
+        if changed:
+            invalidate_dates([view_date])
+            rebuild_rollups(
+                view_date,
+                view_date,
+                staff_ids={staff_id for staff_id, _ in existing} | {staff_id for staff_id, _ in grid},
+            )
+
+    return {
+        "created": len(new_shifts),
+        "deleted": deleted,
+        "links_added": links_added,
+        "links_removed": links_removed,
+        "changed": changed,
+    }
+
+
+def expand_rotation(rotation_days, staff_ids, start_date, end_date, offsets=None):
+    """Compute every (staff_id, date, shift_type_id) a rotation produces.
+
+    ``offsets`` maps a staff id to the rotation day (0-based) that person
+    starts on at ``start_date``. The working pattern is laid out once per
+    distinct offset and then reused for every employee sharing it.
+    """
+    pattern = [
+        None if day.is_day_off else day.shift_type_id for day in rotation_days
+    ]
+    # A working day without a shift type cannot be stored; treat it as off.
+    dates = [
+        start_date + datetime.timedelta(days=n)
+        for n in range((end_date - start_date).days + 1)
+    ]
+    offsets = offsets or {}
+    schedules = {}
+    for staff_id in staff_ids:
+        offset = offsets.get(staff_id, 0) % len(pattern)
+        if offset not in schedules:
+            schedules[offset] = [
+                (day, pattern[(n + offset) % len(pattern)])
+                for n, day in enumerate(dates)
+                if pattern[(n + offset) % len(pattern)] is not None
+            ]
+        for day, shift_type_id in schedules[offset]:
+            yield staff_id, day, shift_type_id
+
+
+def apply_rotation(
+    rotation_days,
+    staff_ids,
+    start_date,
+    end_date,
+    offsets=None,
+    dry_run=False,
+    batch_size=1000,
+):
+    """Replace the staff's shifts in start..end with a rotation.
+
+    The existing range is removed with batched DELETEs and the new
+    shifts are written with batched bulk_create, all in one transaction. With
+    ``dry_run`` nothing is written and only the counts are reported.
+    """
+    staff_ids = list(staff_ids)
+    existing = Shift.objects.filter(
+        staff_id__in=staff_ids, date__range=(start_date, end_date)
+    )
+    new_shifts = [
+        Shift(staff_id=staff_id, date=day, shift_type_id=shift_type_id)
+        for staff_id, day, shift_type_id in expand_rotation(
+            rotation_days, staff_ids, start_date, end_date, offsets
+        )
+    ]
+    if dry_run:
+        return {"created": len(new_shifts), "deleted": existing.count()}
+
+    with transaction.atomic():
+        deleted = delete_shifts(existing)
+        Shift.objects.bulk_create(new_shifts, batch_size=batch_size)
+        rebuild_rollups(start_date, end_date, staff_ids)
+        invalidate_date_range(start_date, end_date)
+    return {"created": len(new_shifts), "deleted": deleted}
+
+
+def committees_without_tasks(selections):
+    """Staff ids (as ints) given a committee but no task in ``selections``."""
+    return {
+        int(staff_id)
+        for staff_id, selection in selections.items()
+        if selection["committees"] and not selection["tasks"]
+    }
+
+
+def save_monthly_assignments(year, month, selections):
+    """Apply the monthly bulk-assignment grid as a diff.
+
+    ``selections`` maps a staff id (as a string, since it travels through
+    JSON) to ``{"tasks": [ids], "committees": [ids], "group": id or None}``.
+    Rows for the whole month are matched on (staff, task): new pairs are
+    bulk-inserted, pairs whose group or committee changed are bulk-updated,
+    and pairs no longer selected are deleted, so the status and notes of
+    untouched assignments survive a save. A committee chosen without any
+    task cannot be stored (every assignment needs a task): such selections
+    raise ValueError, see ``committees_without_tasks``.
+    """
+    missing_tasks = committees_without_tasks(selections)
+    if missing_tasks:
+        raise ValueError(f"Committees chosen without a task for staff {sorted(missing_tasks)}.")
+    _, last_day = calendar.monthrange(year, month)
+    month_start = datetime.date(year, month, 1)
+    month_end = datetime.date(year, month, last_day)
+
+    wanted = {}
+    for staff_id, selection in selections.items():
+        committee_ids = selection["committees"]
+        for task_id in selection["tasks"]:
+            wanted[(int(staff_id), int(task_id))] = (
+                selection["group"] or None,
+                int(committee_ids[0]) if committee_ids else None,
+            )
+
+    with transaction.atomic():
+        existing = {}
+        duplicates = []
+        for assignment in MonthlyAssignment.objects.filter(
+            start_date=month_start, end_date=month_end
+        ).only("pk", "staff_id", "task_id", "group_id", "committee_id"):
+            key = (assignment.staff_id, assignment.task_id)
+            if key in existing:
+                duplicates.append(assignment.pk)
+            else:
+                existing[key] = assignment
+
+        removed = duplicates + [
+            assignment.pk for key, assignment in existing.items() if key not in wanted
+        ]
+        changed = []
+        for key, (group_id, committee_id) in wanted.items():
+            assignment = existing.get(key)
+            if assignment is None:
+                continue
+            if (assignment.group_id, assignment.committee_id) != (group_id, committee_id):
+                assignment.group_id = group_id
+                assignment.committee_id = committee_id
+                changed.append(assignment)
+        new_assignments = [
+            MonthlyAssignment(
+                staff_id=staff_id,
+                task_id=task_id,
+                start_date=month_start,
+                end_date=month_end,
+                group_id=group_id,
+                committee_id=committee_id,
+                status=AssignmentStatus.PENDING,
+            )
+            for (staff_id, task_id), (group_id, committee_id) in wanted.items()
+            if (staff_id, task_id) not in existing
+        ]
+
+        deleted = 0
+        if removed:
+            # The per-row handlers are silenced; the month is invalidated below.
+            with bulk_write():
+                deleted, _ = MonthlyAssignment.objects.filter(pk__in=removed).delete()
+        MonthlyAssignment.objects.bulk_update(changed, ["group", "committee"], batch_size=500)
+        MonthlyAssignment.objects.bulk_create(new_assignments, batch_size=500)
+
+        if deleted or changed or new_assignments:
+            invalidate_range(month_start, month_end)
+
+    return {"created": len(new_assignments), "updated": len(changed), "deleted": deleted}
+
+
+CHECKLIST_FIELDS = ["status", "team_leader_notes", "is_approved_by_manager"]
+
+
+def parse_checklist(data, with_approval=False):
+    """Read ``status_<id>``/``notes_<id>``/``approve_<id>`` fields into a batch.
+
+    Returns ``{shift_id: {field: value}}``. Unknown statuses and malformed ids
+    are dropped. An unticked approval box leaves the approval as it was.
+    """
+    batch = {}
+    for key, value in data.items():
+        prefix, _, shift_id = key.partition("_")
+        if prefix != "status" or not shift_id.isdigit():
+            continue
+        if value not in AssignmentStatus.values:
+            continue
+        changes = {
+            "status": value,
+            "team_leader_notes": data.get(f"notes_{shift_id}", ""),
+        }
+        if with_approval and f"approve_{shift_id}" in data:
+            changes["is_approved_by_manager"] = True
+        batch[int(shift_id)] = changes
+    return batch
+
+
+def apply_checklist(batch, date, shift_type=None, exclude_staff=None):
+    """Write a checklist batch with one SELECT and one bulk UPDATE.
+
+    Only shifts on ``date`` (and of ``shift_type``, when given) can be
+    touched, so a forged form cannot reach other days' records. The workload
+    rollups of the staff whose shifts changed are then rebuilt for the month.
+    Returns the number of shifts that actually changed.
+    """
+    if not batch:
+        return 0
+    shifts = Shift.objects.filter(pk__in=batch, date=date)
+    if shift_type is not None:
+        shifts = shifts.filter(shift_type=shift_type)
+    if exclude_staff is not None:
+        shifts = shifts.exclude(staff=exclude_staff)
+
+    changed = []
+    for shift in shifts.only("pk", "staff_id", *CHECKLIST_FIELDS):
+        updates = {
+            field: value
+            for field, value in batch[shift.pk].items()
+            if getattr(shift, field) != value
+        }
+        if updates:
+            for field, value in updates.items():
+                setattr(shift, field, value)
+            changed.append(shift)
+
+    if changed:
+        with transaction.atomic():
+            Shift.objects.bulk_update(changed, CHECKLIST_FIELDS, batch_size=500)
+            rebuild_rollups(date, date, staff_ids={shift.staff_id for shift in changed})
+    return len(changed)
@@ -0,0 +1,259 @@
+# In main_app/signals.py
+
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .backends import forget_user
+from .catalogs import CATALOG_FOR_MODEL, invalidate_catalogs
+from .models import (
+    Assignment,
+    AssignmentGroup,
+    Clinic,
+    Committee,
+    EmergencyRole,
+    MonthlyAssignment,
+    MonthlyTask,
+    Shift,
+    ShiftType,
+    SubAssignment,
+    User,
+)
+from .roster import SHIFT_TASK_FIELDS
+from .rollups import apply_deltas, month_of, shift_deltas, task_key
+from .roster_cache import invalidate_all, invalidate_dates, invalidate_range
+
+CATALOG_MODELS = (
+    ShiftType,
+    Assignment,
+    SubAssignment,
+    Clinic,
+    EmergencyRole,
+    MonthlyTask,
+    Committee,
+    AssignmentGroup,
+)
+
+SHIFT_TASK_THROUGH_MODELS = (
+    Shift.assignments.through,
+    Shift.sub_assignments.through,
+    Shift.clinics.through,
+    Shift.emergency_roles.through,
+)
+
+
+_local = threading.local()
+
+
+@contextmanager
+def bulk_write():
+    """Silence the per-row roster and rollup handlers of shifts and assignments.
+
+    For the bulk services, which delete many rows through QuerySet.delete()
+    and then invalidate the roster and rebuild the rollups once for the
+    whole range themselves.
+    """
+    previous = getattr(_local, "bulk_write", False)
+    _local.bulk_write = True
+    try:
+        yield
+    finally:
+        _local.bulk_write = previous
+
+
+def in_bulk_write():
+    return getattr(_local, "bulk_write", False)
+
+
+# An edit can move a shift or an assignment to another date, so remember
+# where it was before the save to expire both the old and the new pages.
+@receiver(pre_save, sender=Shift)
+def remember_previous_shift_date(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        previous = (
+            Shift.objects.filter(pk=instance.pk)
+            .values("staff_id", "date", "shift_type_id", "status")
+            .first()
+        )
+        instance._previous_state = previous
+        instance._previous_date = previous and previous["date"]
+
+
+@receiver(pre_save, sender=MonthlyAssignment)
+def remember_previous_assignment_range(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance._previous_range = (
+            MonthlyAssignment.objects.filter(pk=instance.pk)
+            .values_list("start_date", "end_date")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Shift)
+@receiver(post_delete, sender=Shift)
+def shift_changed(sender, instance, **kwargs):
+    if in_bulk_write():
+        return
+    dates = {instance.date}
+    previous_date = getattr(instance, "_previous_date", None)
+    if previous_date:
+        dates.add(previous_date)
+    invalidate_dates(dates)
+
+
+@receiver(post_save, sender=MonthlyAssignment)
+@receiver(post_delete, sender=MonthlyAssignment)
+def monthly_assignment_changed(sender, instance, **kwargs):
+    if in_bulk_write():
+        return
+    invalidate_range(instance.start_date, instance.end_date)
+    previous_range = getattr(instance, "_previous_range", None)
+    if previous_range:
+        invalidate_range(*previous_range)
+
+
+def shift_tasks_changed(sender, instance, action, reverse, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if reverse:
+        # A task was edited from its own side; the affected dates are unknown.
+        invalidate_all()
+    else:
+        invalidate_dates([instance.date])
+
+
+for through_model in SHIFT_TASK_THROUGH_MODELS:
+    m2m_changed.connect(
+        shift_tasks_changed,
+        sender=through_model,
+        dispatch_uid=f"roster_cache_{through_model._meta.label_lower}",
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def staff_changed(sender, instance, update_fields=None, **kwargs):
+    # Every login saves last_login; that never shows up on a roster.
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_all()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+def catalog_changed(sender, **kwargs):
+    invalidate_all()
+    if sender in CATALOG_FOR_MODEL:
+        invalidate_catalogs()
+
+
+for catalog_model in CATALOG_MODELS:
+    post_save.connect(
+        catalog_changed,
+        sender=catalog_model,
+        dispatch_uid=f"roster_cache_save_{catalog_model._meta.label_lower}",
+    )
+    post_delete.connect(
+        catalog_changed,
+        sender=catalog_model,
+        dispatch_uid=f"roster_cache_delete_{catalog_model._meta.label_lower}",
+    )
+
+
+# Workload rollups. Saves and deletes adjust the counts by the difference
+# they make; the bulk services bypass these (bulk_create sends no signals,
+# deletes run inside bulk_write) and rebuild the months they wrote.
+TASK_TYPE_FOR_THROUGH = {
+    Shift._meta.get_field(field_name).remote_field.through: task_type
+    for task_type, field_name in SHIFT_TASK_FIELDS.items()
+}
+
+
+@receiver(post_save, sender=Shift)
+def shift_rollup_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, "_previous_state", None)
+    old_shift = Shift(pk=instance.pk, **previous) if previous else None
+    # Moving a shift to another person or month moves its tasks' counts too.
+    moved = old_shift is not None and (
+        (old_shift.staff_id, month_of(old_shift.date))
+        != (instance.staff_id, month_of(instance.date))
+    )
+    deltas = shift_deltas(instance, with_tasks=moved)
+    if old_shift is not None:
+        deltas.update(shift_deltas(old_shift, sign=-1, with_tasks=moved))
+    apply_deltas(deltas)
+    instance._previous_state = None
+
+
+@receiver(pre_delete, sender=Shift)
+def remember_deleted_shift_rollups(sender, instance, **kwargs):
+    if in_bulk_write():
+        return
+    # The task links are gone by post_delete, so count them now.
+    instance._rollup_deltas = shift_deltas(instance, sign=-1, with_tasks=True)
+
+
+@receiver(post_delete, sender=Shift)
+def shift_rollup_deleted(sender, instance, **kwargs):
+    apply_deltas(getattr(instance, "_rollup_deltas", {}))
+
+
+def shift_tasks_rollup(sender, instance, action, reverse, pk_set, **kwargs):
+    task_type = TASK_TYPE_FOR_THROUGH[sender]
+    field = Shift._meta.get_field(SHIFT_TASK_FIELDS[task_type])
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+
+    if action == "pre_clear":
+        cleared = getattr(instance, "_cleared_links", {})
+        cleared[sender] = list(
+            sender.objects.filter(**{target if reverse else source: instance.pk})
+            .values_list(f"{source}_id", f"{target}_id")
+        )
+        instance._cleared_links = cleared
+        return
+
+    sign = {"post_add": 1, "post_remove": -1, "post_clear": -1}.get(action)
+    if sign is None:
+        return
+    if action == "post_clear":
+        links = getattr(instance, "_cleared_links", {}).pop(sender, [])
+    elif reverse:
+        links = [(shift_id, instance.pk) for shift_id in pk_set]
+    else:
+        links = [(instance.pk, task_id) for task_id in pk_set]
+    if not links:
+        return
+
+    if reverse:
+        shifts = {
+            shift_id: (staff_id, date)
+            for shift_id, staff_id, date in Shift.objects.filter(
+                pk__in={shift_id for shift_id, _ in links}
+            ).values_list("pk", "staff_id", "date")
+        }
+    else:
+        shifts = {instance.pk: (instance.staff_id, instance.date)}
+
+    deltas = Counter()
+    for shift_id, task_id in links:
+        staff_id, date = shifts[shift_id]
+        deltas[task_key(staff_id, date, task_type, task_id)] += sign
+    apply_deltas(deltas)
+
+
+for through_model in SHIFT_TASK_THROUGH_MODELS:
+    m2m_changed.connect(
+        shift_tasks_rollup,
+        sender=through_model,
+        dispatch_uid=f"workload_rollup_{through_model._meta.label_lower}",
+    )
@@ -0,0 +1,85 @@
+# In main_app/staff_search.py
+
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import User
+from .pagination import keyset_page
+
+# Display order of the picker, and the keyset it pages on.
+STAFF_ORDERING = ("first_name", "last_name", "pk")
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+# employee_id is a 32-bit integer, so it has at most ten digits.
+EMPLOYEE_ID_DIGITS = 10
+# Sorts after every character, closing a prefix range.
+PREFIX_END = chr(0x10FFFF)
+# Local Bahraini numbers are stored with the country code.
+LOCAL_PHONE_PREFIX = "+973"
+
+
+def _prefix(field, prefix):
+    """``startswith`` written as a range, so the database can seek an index."""
+    return Q(**{f"{field}__gte": prefix, f"{field}__lt": prefix + PREFIX_END})
+
+
+def _employee_id_prefix(digits):
+    """Employee ids whose decimal form starts with ``digits``: one range per length."""
+    if digits.startswith("0") or len(digits) > EMPLOYEE_ID_DIGITS:
+        return Q(pk__in=[])
+    number = int(digits)
+    matches = Q(pk__in=[])
+    for extra in range(EMPLOYEE_ID_DIGITS - len(digits) + 1):
+        scale = 10 ** extra
+        matches |= Q(employee_id__gte=number * scale, employee_id__lt=(number + 1) * scale)
+    return matches
+
+
+def _term_filter(term):
+    term = term.lower()
+    matches = _prefix("first_lower", term) | _prefix("last_lower", term) | _prefix("username_lower", term)
+    digits = term.lstrip("+").replace(" ", "")
+    if digits.isdigit():
+        matches |= _employee_id_prefix(digits)
+        matches |= _prefix("phone_number", "+" + digits)
+        if not term.startswith("+"):
+            matches |= _prefix("phone_number", LOCAL_PHONE_PREFIX + digits)
+    return matches
+
+
+def staff_queryset(term="", role=None, group=None):
+    """Active staff matching ``term``, optionally narrowed to a role and a group.
+
+    ``term`` is a case-insensitive prefix of the first name, last name,
+    username, employee ID or phone number; "first last" narrows on both
+    names. Every branch of the search is a range over an index, so the cost
+    follows the number of matches rather than the size of the staff list.
+    """
+    staff = User.objects.filter(is_active=True).alias(
+        first_lower=Lower("first_name"),
+        last_lower=Lower("last_name"),
+        username_lower=Lower("username"),
+    )
+    words = term.split()
+    if len(words) > 1 and not "".join(words).lstrip("+").isdigit():
+        staff = staff.filter(
+            _prefix("first_lower", words[0].lower()),
+            _prefix("last_lower", " ".join(words[1:]).lower()),
+        )
+    elif words:
+        staff = staff.filter(_term_filter("".join(words)))
+    if role:
+        staff = staff.filter(role=role)
+    if group:
+        staff = staff.filter(assignment_group_id=group)
+    return staff
+
+
+def search_staff(term="", role=None, group=None, cursor=None, per_page=PAGE_SIZE):
+    """One page of ``staff_queryset`` in display order; raises InvalidCursor for a bad ``cursor``."""
+    return keyset_page(staff_queryset(term, role, group), STAFF_ORDERING, cursor, per_page)
+
+
+def staff_label(member):
+    return member.get_full_name() or member.username
@@ -0,0 +1,87 @@
+// Staff pickers: selects rendered with only the chosen staff members.
+// A search box above each one fills in matching staff from the lookup
+// endpoint, one page at a time, keeping whatever is already selected.
+(function () {
+    'use strict';
+
+    const DEBOUNCE_MS = 250;
+
+    function setUp(select) {
+        const search = document.createElement('input');
+        search.type = 'search';
+        search.className = 'form-control form-control-sm mb-1';
+        search.placeholder = 'Search by name, employee ID or phone';
+        search.setAttribute('aria-label', 'Search staff');
+
+        const more = document.createElement('button');
+        more.type = 'button';
+        more.className = 'btn btn-link btn-sm px-0';
+        more.textContent = 'Show more';
+        more.hidden = true;
+
+        select.parentNode.insertBefore(search, select);
+        select.parentNode.insertBefore(more, select.nextSibling);
+        if (select.multiple && !select.size) {
+            select.size = 10;
+        }
+
+        let next = null;
+        let request = 0;
+
+        function keepOnlyChosen() {
+            Array.from(select.options).forEach(function (option) {
+                if (option.value && !option.selected) {
+                    option.remove();
+                }
+            });
+        }
+
+        function load(cursor) {
+            const params = new URLSearchParams({ q: search.value.trim() });
+            if (select.dataset.role) {
+                params.set('role', select.dataset.role);
+            }
+            if (select.dataset.group) {
+                params.set('group', select.dataset.group);
+            }
+            if (cursor) {
+                params.set('cursor', cursor);
+            }
+            const current = ++request;
+            fetch(select.dataset.lookupUrl + '?' + params, { credentials: 'same-origin' })
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    if (current !== request) {
+                        return;
+                    }
+                    if (!cursor) {
+                        keepOnlyChosen();
+                    }
+                    const present = new Set(Array.from(select.options).map(function (o) { return o.value; }));
+                    (data.results || []).forEach(function (member) {
+                        if (!present.has(String(member.id))) {
+                            select.add(new Option(member.name, member.id));
+                        }
+                    });
+                    next = data.next;
+                    more.hidden = !next;
+                });
+        }
+
+        let timer = null;
+        search.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () { load(null); }, DEBOUNCE_MS);
+        });
+        more.addEventListener('click', function () {
+            if (next) {
+                load(next);
+            }
+        });
+        select.addEventListener('focus', function () { load(null); }, { once: true });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('select.staff-picker:not([disabled])').forEach(setUp);
+    });
+})();
@@ -1,10 +1,12 @@
 from django import template
 
+from main_app.roster import RosterRow
+
 register = template.Library()
 
 @register.filter
 def get_item(dictionary, key):
 
-    if isinstance(dictionary, dict):
+    if isinstance(dictionary, (dict, RosterRow)):
         return dictionary.get(key)
-    return None
\ No newline at end of file
+    return None
@@ -1,3 +1,2072 @@
-from django.test import TestCase
+import datetime
+import os
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    Assignment,
+    AssignmentGroup,
+    AssignmentStatus,
+    Clinic,
+    Committee,
+    EmergencyRole,
+    Job,
+    MonthlyAssignment,
+    MonthlyTask,
+    Rotation,
+    RotationDay,
+    RosterVersion,
+    Shift,
+    ShiftType,
+    SubAssignment,
+    User,
+    WorkloadRollup,
+)
+from .analytics import appraisal_rows, resolve_period, split_range, staff_activity_counts, workload_counts
+from .backends import user_cache_key
+from .benchmarks import CASES, Case, budget_failures, build_fixtures, run_benchmarks, unbenchmarked_views
+from .catalogs import CATALOG_SCOPE, catalog, registry as catalog_registry
+from .datasets import seed_dataset
+from . import metrics, views
+from .jobs import HANDLERS, job_handler, requeue_stale, run_pending, submit
+from .forms import RosterCsvExportForm, RosterPdfExportForm, RotationAssignForm, ShiftForm
+from .exports import SHIFT_EXPORT_HEADER, csv_lines, export_roster_pdf, iter_shift_rows
+from .imports import import_shifts
+from .pdf_cache import PdfCache, render_pdf
+from .rollups import rebuild_rollups, verify_rollups
+from .roster import (
+    build_daily_snapshot,
+    build_roster_matrix,
+    build_selection_index,
+    cached_daily_snapshot,
+    daily_pdf_html,
+)
+from .roster_api import STATUSES
+from .roster_cache import GLOBAL_SCOPE, bump_versions, current_version, date_scope, roster_cache
+from .staff_search import STAFF_ORDERING, staff_queryset
+from .pagination import seek_filter
+from .services import (
+    StaleRosterError,
+    apply_checklist,
+    apply_rotation,
+    expand_rotation,
+    parse_checklist,
+    save_daily_grid,
+    save_monthly_assignments,
+)
+
+
+def use_shared_cache(test):
+    """Configure ``test`` as production does when CACHE_BACKEND is set.
+
+    A file cache is shared between processes, which the session and user
+    caches need.
+    """
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    shared = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directory.name}
+    override = override_settings(
+        CACHES={**settings.CACHES, "users": shared},
+        SESSION_ENGINE="django.contrib.sessions.backends.cached_db",
+        SESSION_CACHE_ALIAS="users",
+        AUTH_USER_CACHE_ALIAS="users",
+    )
+    override.enable()
+    test.addCleanup(override.disable)
+
+
+def make_staff(count, start=0, **extra):
+    return [
+        User.objects.create(
+            username=f"staff{index}",
+            first_name=f"Staff{index:04d}",
+            phone_number=f"+9733{index:07d}",
+            **extra,
+        )
+        for index in range(start, start + count)
+    ]
+
+
+class RosterTestCase(TestCase):
+    def setUp(self):
+        # Version counters roll back with each test; cached entries do not.
+        caches[roster_cache.alias].clear()
+        roster_cache.reset_stats()
+        catalog_registry.clear()
+        pdf_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(pdf_dir.cleanup)
+        pdf_settings = override_settings(PDF_CACHE_DIR=pdf_dir.name)
+        pdf_settings.enable()
+        self.addCleanup(pdf_settings.disable)
+
+    def login(self, user):
+        """Log in with the session and user already cached, as on any page after the first."""
+        self.client.force_login(user)
+        self.client.get(reverse("main_app:profile"))
+
+
+class MonthlyRosterQueryBudgetTests(RosterTestCase):
+    ROSTER_QUERY_BUDGET = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.ward = Assignment.objects.create(name="Ward")
+        cls.clinic = Clinic.objects.create(name="Diabetes")
+        cls.manager = User.objects.create_user(
+            username="manager",
+            password="pass",
+            first_name="Manager",
+            phone_number="+97336000000",
+            role=User.Role.NURSE_MANAGER,
+        )
+
+    def add_shifts(self, staff, days):
+        for member in staff:
+            for day in days:
+                shift = Shift.objects.create(
+                    staff=member,
+                    date=datetime.date(2025, 3, day),
+                    shift_type=self.morning,
+                )
+                shift.assignments.add(self.ward)
+                shift.clinics.add(self.clinic)
+
+    def test_matrix_places_shifts_in_cells(self):
+        staff = make_staff(2)
+        self.add_shifts(staff[:1], [3])
+
+        roster = build_roster_matrix(2025, 3)
+        rows = {row.staff.pk: row for row in roster}
+
+        self.assertEqual(roster.num_days, 31)
+        self.assertEqual(len(rows[staff[0].pk].days.get(3)), 1)
+        self.assertEqual(rows[staff[0].pk].days.get(4), ())
+        self.assertEqual(rows[staff[1].pk].days.get(3), ())
+
+    def test_matrix_query_count_is_independent_of_staff(self):
+        self.add_shifts(make_staff(3), [1, 2])
+        with self.assertNumQueries(self.ROSTER_QUERY_BUDGET):
+            build_roster_matrix(2025, 3)
+
+        self.add_shifts(make_staff(40, start=3), [1, 2, 3])
+        with self.assertNumQueries(self.ROSTER_QUERY_BUDGET):
+            build_roster_matrix(2025, 3)
+
+    def test_view_query_count_is_independent_of_staff(self):
+        self.login(self.manager)
+        url = reverse("main_app:monthly_roster", args=[2025, 3])
+
+        self.add_shifts(make_staff(3), [1, 2])
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.add_shifts(make_staff(40, start=3), [1, 2, 3])
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.assertEqual(len(small), len(large))
+
+
+class RosterCacheTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.ward = Assignment.objects.create(name="Ward")
+        cls.manager = User.objects.create_user(
+            username="manager",
+            password="pass",
+            first_name="Manager",
+            phone_number="+97336000000",
+            role=User.Role.NURSE_MANAGER,
+        )
+        cls.nurse = make_staff(1)[0]
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.manager)
+        self.roster_url = reverse("main_app:monthly_roster", args=[2025, 3])
+        self.daily_url = reverse("main_app:daily_detail", args=[2025, 3, 4])
+
+    def test_repeat_views_are_served_from_cache(self):
+        for url in (self.roster_url, self.daily_url):
+            with CaptureQueriesContext(connection) as first:
+                self.client.get(url)
+            with CaptureQueriesContext(connection) as second:
+                self.client.get(url)
+            self.assertLess(len(second), len(first))
+        self.assertEqual(roster_cache.stats()["hits"], 2)
+
+    def test_shift_changes_expire_cached_pages(self):
+        self.client.get(self.roster_url)
+        self.client.get(self.daily_url)
+
+        shift = Shift.objects.create(
+            staff=self.nurse, date=datetime.date(2025, 3, 4), shift_type=self.morning
+        )
+        shift.assignments.add(self.ward)
+
+        self.assertContains(self.client.get(self.roster_url), "Ward")
+        self.assertContains(self.client.get(self.daily_url), "Ward")
+
+        shift.date = datetime.date(2025, 4, 1)
+        shift.save()
+        self.assertNotContains(self.client.get(self.roster_url), "Ward")
+
+    def test_catalog_rename_expires_cached_pages(self):
+        shift = Shift.objects.create(
+            staff=self.nurse, date=datetime.date(2025, 3, 4), shift_type=self.morning
+        )
+        shift.assignments.add(self.ward)
+        self.assertContains(self.client.get(self.daily_url), "Ward")
+
+        self.ward.name = "Triage"
+        self.ward.save()
+        self.assertContains(self.client.get(self.daily_url), "Triage")
+
+    def test_login_does_not_expire_cache(self):
+        self.client.get(self.roster_url)
+        self.client.login(username="manager", password="pass")
+        self.client.get(self.roster_url)
+        self.assertEqual(roster_cache.stats()["hits"], 1)
+
+
+class DailySnapshotTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = datetime.date(2025, 3, 4)
+        cls.night = ShiftType.objects.create(
+            name="Night", start_time=datetime.time(21), end_time=datetime.time(7)
+        )
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.nurses = make_staff(2)
+        cls.mas = make_staff(1, start=2, role=User.Role.MAS)[0]
+
+    def test_groups_by_type_and_role_in_order(self):
+        for member in reversed(self.nurses):
+            Shift.objects.create(staff=member, date=self.day, shift_type=self.morning)
+        Shift.objects.create(staff=self.mas, date=self.day, shift_type=self.night)
+
+        snapshot = build_daily_snapshot(self.day)
+
+        self.assertEqual(list(snapshot), ["Morning", "Night"])
+        self.assertEqual(
+            [shift.staff for shift in snapshot["Morning"]["nurse_shifts"]], self.nurses
+        )
+        self.assertEqual(snapshot["Night"]["nurse_shifts"], [])
+        self.assertEqual(len(snapshot["Night"]["mas_shifts"]), 1)
+
+        next_day = self.day + datetime.timedelta(days=1)
+        self.assertEqual(list(build_daily_snapshot(next_day)), ["Morning", "Night"])
+        self.assertEqual(build_daily_snapshot(next_day, include_empty=False), {})
+
+    def test_pdf_view_renders_snapshot(self):
+        Shift.objects.create(staff=self.nurses[0], date=self.day, shift_type=self.morning)
+        self.client.force_login(self.nurses[0])
+        response = self.client.get(reverse("main_app:daily_detail_pdf", args=[2025, 3, 4]))
+        self.assertEqual(response["Content-Type"], "application/pdf")
+
+    def test_query_count_is_independent_of_shift_types(self):
+        Shift.objects.create(staff=self.nurses[0], date=self.day, shift_type=self.morning)
+        catalog("shift_types")
+        with self.assertNumQueries(5):
+            build_daily_snapshot(self.day)
+
+        for hour in range(8, 14):
+            shift_type = ShiftType.objects.create(
+                name=f"Extra {hour}",
+                start_time=datetime.time(hour),
+                end_time=datetime.time(hour + 1),
+            )
+            Shift.objects.create(staff=self.nurses[1], date=self.day, shift_type=shift_type)
+        self.assertEqual(len(catalog("shift_types")), 8)
+        with self.assertNumQueries(5):
+            build_daily_snapshot(self.day)
+
+
+class DailyAssignFormTests(RosterTestCase):
+    STAFF = 200
+    TASKS_PER_KIND = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = datetime.date(2025, 3, 4)
+        cls.shift_types = [
+            ShiftType.objects.create(
+                name=name,
+                start_time=datetime.time(hour),
+                end_time=datetime.time(hour + 6),
+            )
+            for name, hour in (("Morning", 7), ("Afternoon", 13), ("Evening", 17))
+        ]
+        cls.tasks = {
+            model: [
+                model.objects.create(name=f"{model.__name__} {index}")
+                for index in range(cls.TASKS_PER_KIND)
+            ]
+            for model in (Assignment, SubAssignment, Clinic, EmergencyRole)
+        }
+        cls.staff = make_staff(cls.STAFF)
+        cls.manager = make_staff(1, start=cls.STAFF, role=User.Role.NURSE_MANAGER)[0]
+        for index, member in enumerate(cls.staff):
+            shift = Shift.objects.create(
+                staff=member, date=cls.day, shift_type=cls.shift_types[index % 3]
+            )
+            if index < 3 * cls.TASKS_PER_KIND:
+                # Each (shift type, task) cell gets exactly one staff member.
+                shift.assignments.add(cls.tasks[Assignment][index % cls.TASKS_PER_KIND])
+
+    def test_selection_index_maps_cells_to_staff(self):
+        selection = build_selection_index(self.day)
+        ward = self.tasks[Assignment][1]
+        self.assertEqual(selection[("main", self.shift_types[1].id, ward.id)], self.staff[1].id)
+        self.assertNotIn(("sub", self.shift_types[1].id, ward.id), selection)
+
+    def render(self):
+        caches[roster_cache.alias].clear()
+        catalog_registry.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("main_app:daily_assign", args=[2025, 3, 4]))
+        return len(queries), response.content.decode()
+
+    def test_form_lists_staff_once(self):
+        self.client.force_login(self.manager)
+        _, content = self.render()
+
+        selects = 4 * self.TASKS_PER_KIND * len(self.shift_types)
+        selected = self.TASKS_PER_KIND * len(self.shift_types)
+        # The active staff (and the manager) once, then each select's blank
+        # option and its current choice.
+        self.assertEqual(content.count("<option"), self.STAFF + 1 + selects + selected)
+        self.assertEqual(content.count(" selected>"), selected)
+
+    def test_form_grows_linearly_with_staff_and_cells(self):
+        self.client.force_login(self.manager)
+        small_queries, small = self.render()
+
+        # Twice the staff and twice the (shift type, task) cells.
+        for index, member in enumerate(make_staff(self.STAFF, start=self.STAFF + 1)):
+            Shift.objects.create(staff=member, date=self.day, shift_type=self.shift_types[index % 3])
+        for model in self.tasks:
+            for index in range(self.TASKS_PER_KIND, 2 * self.TASKS_PER_KIND):
+                model.objects.create(name=f"{model.__name__} {index}")
+        large_queries, large = self.render()
+
+        self.assertEqual(large_queries, small_queries)
+        # Linear growth at most doubles the page; a staff x cells term would
+        # roughly quadruple it.
+        self.assertLess(len(large), 2 * len(small))
+
+
+class DailyGridSaveTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = datetime.date(2025, 3, 4)
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.ward = Assignment.objects.create(name="Ward")
+        cls.triage = Assignment.objects.create(name="Triage")
+        cls.clinic = Clinic.objects.create(name="Diabetes")
+        cls.manager = make_staff(1, role=User.Role.NURSE_MANAGER)[0]
+        cls.staff = make_staff(30, start=1)
+
+    def grid(self, *entries):
+        fields = ("assignments", "sub_assignments", "clinics", "emergency_roles")
+        grid = {}
+        for staff, field, task in entries:
+            tasks = grid.setdefault(
+                (staff.pk, self.morning.pk), {name: set() for name in fields}
+            )
+            tasks[field].add(task.pk)
+        return grid
+
+    def test_unchanged_shifts_keep_their_checklist_state(self):
+        nurse, other = self.staff[:2]
+        save_daily_grid(
+            self.day,
+            self.grid((nurse, "assignments", self.ward), (other, "assignments", self.triage)),
+        )
+        Shift.objects.filter(staff=nurse).update(
+            status=AssignmentStatus.COMPLETED,
+            team_leader_notes="Done",
+            is_approved_by_manager=True,
+        )
+
+        save_daily_grid(
+            self.day,
+            self.grid((nurse, "assignments", self.ward), (nurse, "clinics", self.clinic)),
+        )
+
+        shift = Shift.objects.get(staff=nurse, date=self.day)
+        self.assertEqual(shift.status, AssignmentStatus.COMPLETED)
+        self.assertTrue(shift.is_approved_by_manager)
+        self.assertEqual(list(shift.clinics.all()), [self.clinic])
+        self.assertFalse(Shift.objects.filter(staff=other).exists())
+
+    def test_shifts_without_tasks_are_left_alone(self):
+        Shift.objects.create(staff=self.staff[0], date=self.day, shift_type=self.morning)
+        save_daily_grid(self.day, self.grid((self.staff[1], "assignments", self.ward)))
+        self.assertEqual(Shift.objects.filter(date=self.day).count(), 2)
+
+    def test_stale_version_is_rejected(self):
+        version = current_version(date_scope(self.day))
+        save_daily_grid(self.day, self.grid((self.staff[0], "assignments", self.ward)), version)
+        with self.assertRaises(StaleRosterError):
+            save_daily_grid(self.day, self.grid((self.staff[1], "assignments", self.ward)), version)
+        self.assertEqual(Shift.objects.get(date=self.day).staff, self.staff[0])
+
+    def test_statement_count_does_not_grow_with_staff(self):
+        def statements(day, staff):
+            entries = [(member, "assignments", self.ward) for member in staff]
+            with CaptureQueriesContext(connection) as queries:
+                save_daily_grid(day, self.grid(*entries))
+            return len(queries)
+
+        next_day = self.day + datetime.timedelta(days=1)
+        self.assertEqual(statements(self.day, self.staff[:2]), statements(next_day, self.staff))
+
+    def test_view_reports_conflicting_save(self):
+        self.client.force_login(self.manager)
+        url = reverse("main_app:daily_assign", args=[2025, 3, 4])
+        field = f"main_{self.morning.pk}_{self.ward.pk}"
+
+        response = self.client.post(url, {field: self.staff[0].pk, "roster_version": 0})
+        self.assertRedirects(response, reverse("main_app:daily_detail", args=[2025, 3, 4]))
+
+        response = self.client.post(
+            url, {field: self.staff[1].pk, "roster_version": 0}, follow=True
+        )
+        self.assertContains(response, "Someone else saved assignments")
+        self.assertEqual(Shift.objects.get(date=self.day).staff, self.staff[0])
+
+
+class RotationExpansionTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.night = ShiftType.objects.create(
+            name="Night", start_time=datetime.time(21), end_time=datetime.time(7)
+        )
+        rotation = Rotation.objects.create(name="2 on / 1 off", length_in_days=3)
+        RotationDay.objects.create(rotation=rotation, day_number=1, shift_type=cls.morning)
+        RotationDay.objects.create(rotation=rotation, day_number=2, shift_type=cls.night)
+        RotationDay.objects.create(rotation=rotation, day_number=3, is_day_off=True)
+        cls.rotation_days = list(rotation.days.all())
+        cls.staff = make_staff(20)
+        cls.start = datetime.date(2025, 1, 1)
+        cls.end = datetime.date(2025, 12, 31)
+
+    def test_stagger_follows_the_staff_ids_not_their_names(self):
+        first, second, third = self.staff[:3]
+        data = {
+            "employees": [third.pk, first.pk, second.pk],
+            "rotation": self.rotation_days[0].rotation_id,
+            "start_date": "2025-01-01",
+            "end_date": "2025-01-31",
+            "start_offset": 1,
+            "stagger": 2,
+        }
+        expected = {first.pk: 1, second.pk: 3, third.pk: 5}
+        form = RotationAssignForm(data=data)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.get_offsets(), expected)
+
+        first.first_name = "Zainab"
+        first.save()
+        form = RotationAssignForm(data=data)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.get_offsets(), expected)
+
+    def test_offsets_shift_each_employee_pattern(self):
+        first, second = self.staff[:2]
+        shifts = list(
+            expand_rotation(
+                self.rotation_days,
+                [first.pk, second.pk],
+                self.start,
+                self.start + datetime.timedelta(days=2),
+                offsets={second.pk: 1},
+            )
+        )
+        self.assertEqual(
+            shifts,
+            [
+                (first.pk, self.start, self.morning.pk),
+                (first.pk, self.start + datetime.timedelta(days=1), self.night.pk),
+                (second.pk, self.start, self.night.pk),
+                (second.pk, self.start + datetime.timedelta(days=2), self.morning.pk),
+            ],
+        )
+
+    def test_apply_replaces_range_in_batches(self):
+        staff_ids = [member.pk for member in self.staff]
+        Shift.objects.create(staff=self.staff[0], date=self.start, shift_type=self.night)
+
+        with CaptureQueriesContext(connection) as queries:
+            result = apply_rotation(self.rotation_days, staff_ids, self.start, self.end)
+
+        self.assertEqual(result["deleted"], 1)
+        self.assertEqual(result["created"], 20 * 244)
+        self.assertEqual(Shift.objects.count(), 20 * 244)
+        # Batched inserts: the statement count is a small fraction of the rows,
+        # including the rebuild of the rotated staff's workload rollups.
+        self.assertLess(len(queries), result["created"] / 50)
+        self.assertEqual(verify_rollups(), {})
+
+    def test_reapplying_deletes_the_old_shifts_in_bulk(self):
+        staff_ids = [member.pk for member in self.staff]
+        apply_rotation(self.rotation_days, staff_ids, self.start, self.end)
+        Shift.objects.first().sub_assignments.add(SubAssignment.objects.create(name="Triage"))
+
+        with CaptureQueriesContext(connection) as queries:
+            result = apply_rotation(self.rotation_days, staff_ids, self.start, self.end)
+
+        self.assertEqual(result["deleted"], 20 * 244)
+        self.assertEqual(Shift.sub_assignments.through.objects.count(), 0)
+        # No per-row delete handlers: shifts and task links go in batched DELETEs.
+        self.assertLess(len(queries), result["created"] / 25)
+        self.assertEqual(verify_rollups(), {})
+
+    def test_invalidates_months_rather_than_every_day(self):
+        day = datetime.date(2025, 6, 15)
+        cached_daily_snapshot(day)
+        before = roster_cache.misses
+
+        apply_rotation(self.rotation_days, [self.staff[0].pk], self.start, self.end)
+
+        # A month scope and a days scope for each of the 12 months.
+        self.assertEqual(RosterVersion.objects.filter(scope__regex=r"^(month|days):").count(), 24)
+        self.assertFalse(RosterVersion.objects.filter(scope__startswith="date:").exists())
+        self.assertEqual(len(cached_daily_snapshot(day)["Morning"]["nurse_shifts"]), 1)
+        self.assertEqual(roster_cache.misses, before + 1)
+
+    def test_dry_run_only_counts(self):
+        Shift.objects.create(staff=self.staff[0], date=self.start, shift_type=self.night)
+        result = apply_rotation(
+            self.rotation_days, [self.staff[0].pk], self.start, self.end, dry_run=True
+        )
+        self.assertEqual(result, {"created": 244, "deleted": 1})
+        self.assertEqual(Shift.objects.count(), 1)
+
+
+class JobQueueTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.rotation = Rotation.objects.create(name="Mornings", length_in_days=1)
+        RotationDay.objects.create(rotation=cls.rotation, day_number=1, shift_type=cls.morning)
+        cls.manager = make_staff(1, role=User.Role.NURSE_MANAGER)[0]
+        cls.staff = make_staff(3, start=1)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.manager)
+
+    def test_bulk_assign_queues_a_job_and_returns_immediately(self):
+        data = {
+            "employees": [member.pk for member in self.staff],
+            "rotation": self.rotation.pk,
+            "start_date": "2025-03-01",
+            "end_date": "2025-03-10",
+            "idempotency_key": "form-1",
+        }
+        response = self.client.post(reverse("main_app:bulk_assign"), data)
+        job = Job.objects.get()
+        self.assertRedirects(
+            response,
+            f"{reverse('main_app:job_status', args=[job.pk])}?next=%2F",
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(Shift.objects.count(), 0)
+
+        self.client.post(reverse("main_app:bulk_assign"), data)
+        self.assertEqual(Job.objects.count(), 1)
+
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(Shift.objects.count(), 30)
+        poll = self.client.get(reverse("main_app:job_poll", args=[job.pk])).json()
+        self.assertEqual(poll["status"], Job.Status.SUCCEEDED)
+        self.assertEqual(poll["result"], {"created": 30, "deleted": 0})
+        status_page = self.client.get(reverse("main_app:job_status", args=[job.pk]))
+        self.assertContains(status_page, "Succeeded")
+
+    def test_rotation_job_reports_progress_per_batch_of_staff(self):
+        job = submit("apply_rotation", {
+            "rotation_id": self.rotation.pk,
+            "staff_ids": [member.pk for member in self.staff],
+            "start_date": "2025-03-01",
+            "end_date": "2025-03-10",
+        })
+        with mock.patch("main_app.jobs.ROTATION_BATCH_STAFF", 2), mock.patch.object(
+            Job, "set_progress", autospec=True, side_effect=Job.set_progress
+        ) as set_progress:
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual(
+            [call.args[1:] for call in set_progress.call_args_list], [(0, 3), (2,), (3,)]
+        )
+        self.assertEqual((job.progress, job.total), (3, 3))
+        self.assertEqual(job.result, {"created": 30, "deleted": 0})
+
+    def test_progress_keeps_a_long_job_from_being_requeued(self):
+        an_hour_ago = timezone.now() - datetime.timedelta(hours=1)
+        requeued = []
+
+        @job_handler("slow")
+        def slow(job):
+            Job.objects.filter(pk=job.pk).update(locked_at=an_hour_ago)
+            job.set_progress(1, 2)
+            requeued.append(requeue_stale(timeout=60))
+            Job.objects.filter(pk=job.pk).update(locked_at=an_hour_ago)
+            requeued.append(requeue_stale(timeout=60))
+
+        self.addCleanup(HANDLERS.pop, "slow")
+        submit("slow", {})
+        run_pending()
+        self.assertEqual(requeued, [0, 1])
+
+    def test_failing_job_is_retried_then_marked_failed(self):
+        calls = []
+
+        @job_handler("flaky")
+        def flaky(job):
+            calls.append(job.attempts)
+            raise RuntimeError("boom")
+
+        self.addCleanup(HANDLERS.pop, "flaky")
+        job = submit("flaky", {}, max_attempts=2)
+
+        with self.assertLogs("main_app.jobs", level="ERROR"):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+
+        Job.objects.filter(pk=job.pk).update(run_after=job.created_at)
+        with self.assertLogs("main_app.jobs", level="ERROR"):
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(calls, [1, 2])
+        self.assertIn("RuntimeError: boom", job.error)
+
+
+class MonthlyAssignmentSaveTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.audit = MonthlyTask.objects.create(name="Audit")
+        cls.stock = MonthlyTask.objects.create(name="Stock")
+        cls.group_a = AssignmentGroup.objects.create(name="Group A")
+        cls.group_b = AssignmentGroup.objects.create(name="Group B")
+        cls.staff = make_staff(40)
+
+    def selections(self, staff, tasks, group):
+        return {
+            str(member.pk): {
+                "tasks": [task.pk for task in tasks],
+                "committees": [],
+                "group": group.pk,
+            }
+            for member in staff
+        }
+
+    def test_diff_keeps_status_and_notes_of_unchanged_rows(self):
+        nurse, other = self.staff[:2]
+        save_monthly_assignments(
+            2025, 3, self.selections([nurse, other], [self.audit], self.group_a)
+        )
+        MonthlyAssignment.objects.filter(staff=nurse).update(
+            status=AssignmentStatus.COMPLETED, notes="Done early"
+        )
+
+        selections = self.selections([nurse], [self.audit, self.stock], self.group_a)
+        result = save_monthly_assignments(2025, 3, selections)
+
+        self.assertEqual(result, {"created": 1, "updated": 0, "deleted": 1})
+        kept = MonthlyAssignment.objects.get(staff=nurse, task=self.audit)
+        self.assertEqual((kept.status, kept.notes), (AssignmentStatus.COMPLETED, "Done early"))
+        self.assertFalse(MonthlyAssignment.objects.filter(staff=other).exists())
+
+        save_monthly_assignments(2025, 3, self.selections([nurse], [self.audit], self.group_b))
+        kept.refresh_from_db()
+        self.assertEqual((kept.group, kept.status), (self.group_b, AssignmentStatus.COMPLETED))
+
+    def test_statement_count_does_not_grow_with_staff(self):
+        def statements(month, staff):
+            selections = self.selections(staff, [self.audit, self.stock], self.group_a)
+            with CaptureQueriesContext(connection) as queries:
+                save_monthly_assignments(2025, month, selections)
+            return len(queries)
+
+        self.assertEqual(statements(3, self.staff[:2]), statements(4, self.staff))
+
+    def test_committee_without_a_task_is_sent_back(self):
+        nurse = self.staff[0]
+        nurse.assignment_group = self.group_a
+        nurse.save()
+        committee = Committee.objects.create(name="Infection Control")
+        self.client.force_login(make_staff(1, start=40, role=User.Role.NURSE_MANAGER)[0])
+
+        response = self.client.post(
+            reverse("main_app:monthly_assignment_bulk_assign", args=[2025, 3]),
+            {f"committees_{nurse.pk}": [committee.pk], f"group_{nurse.pk}": self.group_a.pk},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "A committee needs at least one monthly task")
+        self.assertEqual(response.context["invalid_staff"], {nurse.pk})
+        self.assertContains(response, f'<option value="{committee.pk}" selected>', html=False)
+        self.assertFalse(Job.objects.exists())
+        with self.assertRaises(ValueError):
+            save_monthly_assignments(
+                2025, 3, {str(nurse.pk): {"tasks": [], "committees": [committee.pk], "group": None}}
+            )
+
+
+class ChecklistBatchTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = datetime.date(2025, 3, 10)
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.night = ShiftType.objects.create(
+            name="Night", start_time=datetime.time(21), end_time=datetime.time(7)
+        )
+        cls.staff = make_staff(30)
+        cls.shifts = Shift.objects.bulk_create(
+            [Shift(staff=member, date=cls.day, shift_type=cls.morning) for member in cls.staff]
+        )
+        cls.other_day = Shift.objects.create(
+            staff=cls.staff[0], date=datetime.date(2025, 3, 11), shift_type=cls.morning
+        )
+        cls.night_shift = Shift.objects.create(
+            staff=cls.staff[1], date=cls.day, shift_type=cls.night
+        )
+
+    def form(self, shifts, status=AssignmentStatus.COMPLETED, approve=False):
+        data = {}
+        for shift in shifts:
+            data[f"status_{shift.pk}"] = status
+            data[f"notes_{shift.pk}"] = f"Note {shift.pk}"
+            if approve:
+                data[f"approve_{shift.pk}"] = "on"
+        return data
+
+    def test_statement_count_does_not_grow_with_the_batch(self):
+        def statements(shifts):
+            batch = parse_checklist(self.form(shifts, approve=True), with_approval=True)
+            with CaptureQueriesContext(connection) as queries:
+                updated = apply_checklist(batch, date=self.day)
+            self.assertEqual(updated, len(shifts))
+            return len(queries)
+
+        self.assertEqual(statements(self.shifts[:2]), statements(self.shifts[2:]))
+        self.assertEqual(verify_rollups(), {})
+        self.assertEqual(
+            Shift.objects.filter(
+                date=self.day, status=AssignmentStatus.COMPLETED, is_approved_by_manager=True
+            ).count(),
+            len(self.shifts),
+        )
+        # Resubmitting the same form writes nothing.
+        batch = parse_checklist(self.form(self.shifts, approve=True), with_approval=True)
+        with self.assertNumQueries(1):
+            self.assertEqual(apply_checklist(batch, date=self.day), 0)
+
+    def test_scope_and_bad_input_are_ignored(self):
+        data = self.form([self.shifts[2], self.other_day, self.night_shift])
+        data[f"status_{self.shifts[3].pk}"] = "BOGUS"
+        data["status_abc"] = AssignmentStatus.COMPLETED
+
+        batch = parse_checklist(data)
+        self.assertNotIn("is_approved_by_manager", batch[self.shifts[2].pk])
+        updated = apply_checklist(batch, date=self.day, shift_type=self.morning)
+
+        self.assertEqual(updated, 1)
+        self.other_day.refresh_from_db()
+        self.night_shift.refresh_from_db()
+        self.assertEqual(self.other_day.status, AssignmentStatus.PENDING)
+        self.assertEqual(self.night_shift.status, AssignmentStatus.PENDING)
+
+    def test_manager_review_post(self):
+        manager = User.objects.create_user(
+            username="manager",
+            password="pass",
+            first_name="Manager",
+            phone_number="+97336000000",
+            role=User.Role.NURSE_MANAGER,
+        )
+        self.client.force_login(manager)
+        data = self.form(self.shifts[:5], status=AssignmentStatus.PARTIAL, approve=True)
+        data["date"] = self.day.isoformat()
+
+        response = self.client.post(reverse("main_app:manager_review"), data)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            Shift.objects.filter(
+                status=AssignmentStatus.PARTIAL, is_approved_by_manager=True
+            ).count(),
+            5,
+        )
+
+
+class StaffAnalyticsTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.night = ShiftType.objects.create(
+            name="Night", start_time=datetime.time(21), end_time=datetime.time(7)
+        )
+        cls.ward = Assignment.objects.create(name="Ward")
+        cls.triage = SubAssignment.objects.create(name="Triage")
+        cls.clinic = Clinic.objects.create(name="Diabetes")
+        cls.code_team = EmergencyRole.objects.create(name="Code Team")
+        cls.audit = MonthlyTask.objects.create(name="Audit")
+        cls.nurse = make_staff(1)[0]
+        cls.manager = User.objects.create_user(
+            username="manager",
+            password="pass",
+            first_name="Manager",
+            phone_number="+97336000000",
+            role=User.Role.NURSE_MANAGER,
+        )
+
+    def add_shifts(self, month, days):
+        for day in range(1, days + 1):
+            shift = Shift.objects.create(
+                staff=self.nurse,
+                date=datetime.date(2025, month, day),
+                shift_type=self.night if day % 3 == 0 else self.morning,
+            )
+            shift.assignments.add(self.ward)
+            shift.sub_assignments.add(self.triage)
+            if day % 2:
+                shift.clinics.add(self.clinic)
+            shift.emergency_roles.add(self.code_team)
+
+    def test_resolve_period(self):
+        self.assertEqual(
+            resolve_period(2025, 5, "quarter")[:4],
+            ("quarter", datetime.date(2025, 4, 1), datetime.date(2025, 6, 30), "Q2 2025"),
+        )
+        year = resolve_period(2024, 2, "year")
+        self.assertEqual((year.start, year.end), (datetime.date(2024, 1, 1), datetime.date(2024, 12, 31)))
+        self.assertEqual((year.previous, year.next), (datetime.date(2023, 1, 1), datetime.date(2025, 1, 1)))
+        self.assertEqual(resolve_period(2025, 2, "decade").end, datetime.date(2025, 2, 28))
+
+    def test_counts_are_a_fixed_number_of_queries(self):
+        self.add_shifts(3, 30)
+        self.add_shifts(4, 30)
+        MonthlyAssignment.objects.create(
+            staff=self.nurse,
+            task=self.audit,
+            start_date=datetime.date(2025, 3, 1),
+            end_date=datetime.date(2025, 3, 31),
+        )
+
+        catalog_registry.warm()
+        # One rollup query and the monthly tasks; names come from the catalogs.
+        with self.assertNumQueries(2):
+            counts = staff_activity_counts(
+                self.nurse, datetime.date(2025, 1, 1), datetime.date(2025, 12, 31)
+            )
+
+        self.assertEqual(counts["shift_types"], {"Morning": 40, "Night": 20})
+        self.assertEqual(list(counts["shift_types"]), ["Morning", "Night"])
+        self.assertEqual(counts["main"], {"Ward": 60})
+        self.assertEqual(counts["sub"], {"Triage": 60})
+        self.assertEqual(counts["clinic"], {"Diabetes": 30})
+        self.assertEqual(counts["emergency"], {"Code Team": 60})
+        self.assertEqual(counts["monthly_tasks"], {"Audit": 1})
+
+    def test_page_query_count_does_not_grow_with_the_range(self):
+        self.login(self.manager)
+        url = reverse("main_app:staff_analytics", args=[self.nurse.pk, 2025, 3])
+
+        def page_queries(period):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {"period": period})
+            self.assertEqual(response.status_code, 200)
+            return len(queries), response
+
+        self.add_shifts(3, 5)
+        page_queries("month")  # loads the catalogs
+        small, _ = page_queries("month")
+        self.add_shifts(2, 28)
+        large, response = page_queries("quarter")
+
+        self.assertEqual(small, large)
+        self.assertEqual(response.context["shift_type_counts"], {"Morning": 23, "Night": 10})
+        self.assertContains(response, "Q1 2025")
+
+
+class WorkloadRollupTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.night = ShiftType.objects.create(
+            name="Night", start_time=datetime.time(21), end_time=datetime.time(7)
+        )
+        cls.ward = Assignment.objects.create(name="Ward")
+        cls.triage = SubAssignment.objects.create(name="Triage")
+        cls.clinic = Clinic.objects.create(name="Diabetes")
+        cls.nurse, cls.other = make_staff(2)
+
+    def rollups(self, staff):
+        return {
+            (row.month.month, row.kind, row.key): row.count
+            for row in WorkloadRollup.objects.filter(staff=staff)
+        }
+
+    def test_migration_counts_shifts_written_before_the_table(self):
+        from importlib import import_module
+
+        from django.apps import apps
+
+        migration = import_module("main_app.migrations.0008_fill_workload_rollups")
+        for day in (datetime.date(2025, 2, 28), datetime.date(2025, 3, 4)):
+            Shift.objects.create(staff=self.nurse, date=day, shift_type=self.morning).clinics.add(self.clinic)
+        WorkloadRollup.objects.all().delete()
+
+        migration.fill_workload_rollups(apps, None)
+        self.assertEqual(verify_rollups(), {})
+        self.assertEqual(self.rollups(self.nurse)[(3, "clinic", str(self.clinic.pk))], 1)
+
+    def test_signals_keep_rollups_in_step(self):
+        shift = Shift.objects.create(
+            staff=self.nurse, date=datetime.date(2025, 3, 4), shift_type=self.morning
+        )
+        shift.assignments.add(self.ward)
+        shift.clinics.set([self.clinic])
+        self.ward.shift_set.add(
+            Shift.objects.create(
+                staff=self.nurse, date=datetime.date(2025, 3, 5), shift_type=self.night
+            )
+        )
+        self.assertEqual(
+            self.rollups(self.nurse),
+            {
+                (3, "shift_type", str(self.morning.pk)): 1,
+                (3, "shift_type", str(self.night.pk)): 1,
+                (3, "status", "PENDING"): 2,
+                (3, "main", str(self.ward.pk)): 2,
+                (3, "clinic", str(self.clinic.pk)): 1,
+            },
+        )
+
+        # Moving the shift to another person and month moves its tasks too.
+        shift.staff = self.other
+        shift.date = datetime.date(2025, 4, 1)
+        shift.status = AssignmentStatus.COMPLETED
+        shift.save()
+        shift.clinics.clear()
+        self.assertEqual(
+            self.rollups(self.other),
+            {
+                (4, "shift_type", str(self.morning.pk)): 1,
+                (4, "status", "COMPLETED"): 1,
+                (4, "main", str(self.ward.pk)): 1,
+            },
+        )
+
+        Shift.objects.filter(staff=self.nurse).delete()
+        self.ward.shift_set.remove(shift)
+        self.assertEqual(self.rollups(self.nurse), {})
+        self.assertEqual(verify_rollups(), {})
+
+    def test_bulk_services_rebuild_what_they_wrote(self):
+        day = datetime.date(2025, 3, 10)
+        save_daily_grid(
+            day,
+            {
+                (self.nurse.pk, self.morning.pk): {
+                    "assignments": {self.ward.pk},
+                    "sub_assignments": {self.triage.pk},
+                    "clinics": set(),
+                    "emergency_roles": set(),
+                }
+            },
+        )
+        shift = Shift.objects.get(staff=self.nurse, date=day)
+        apply_checklist({shift.pk: {"status": AssignmentStatus.PARTIAL}}, date=day)
+
+        self.assertEqual(verify_rollups(), {})
+        self.assertEqual(self.rollups(self.nurse)[(3, "status", "PARTIAL")], 1)
+
+    def test_verify_and_rebuild(self):
+        Shift.objects.create(
+            staff=self.nurse, date=datetime.date(2025, 3, 4), shift_type=self.morning
+        )
+        WorkloadRollup.objects.all().delete()
+        self.assertEqual(len(verify_rollups()), 2)
+
+        self.assertEqual(rebuild_rollups(datetime.date(2025, 3, 1)), 2)
+        self.assertEqual(verify_rollups(), {})
+
+    def test_partial_months_are_read_from_the_shifts(self):
+        for day in (datetime.date(2025, 1, 31), datetime.date(2025, 2, 14), datetime.date(2025, 3, 1)):
+            Shift.objects.create(staff=self.nurse, date=day, shift_type=self.morning)
+
+        self.assertEqual(
+            split_range(datetime.date(2025, 1, 15), datetime.date(2025, 3, 10)),
+            (
+                (datetime.date(2025, 2, 1), datetime.date(2025, 2, 1)),
+                [
+                    (datetime.date(2025, 1, 15), datetime.date(2025, 1, 31)),
+                    (datetime.date(2025, 3, 1), datetime.date(2025, 3, 10)),
+                ],
+            ),
+        )
+        counts = workload_counts(self.nurse, datetime.date(2025, 1, 15), datetime.date(2025, 3, 10))
+        self.assertEqual(counts[("shift_type", str(self.morning.pk))], 3)
+        counts = workload_counts(self.nurse, datetime.date(2025, 2, 2), datetime.date(2025, 2, 20))
+        self.assertEqual(counts[("status", "PENDING")], 1)
+
+
+class AppraisalBatchTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.audit = MonthlyTask.objects.create(name="Audit")
+        cls.ward_team = AssignmentGroup.objects.create(name="Ward Team")
+        cls.staff = make_staff(12)
+        User.objects.filter(pk__in=[member.pk for member in cls.staff[:4]]).update(
+            assignment_group=cls.ward_team
+        )
+        cls.manager = User.objects.create_user(
+            username="manager",
+            password="pass",
+            first_name="Manager",
+            phone_number="+97336000000",
+            role=User.Role.NURSE_MANAGER,
+        )
+        statuses = [
+            AssignmentStatus.COMPLETED,
+            AssignmentStatus.COMPLETED,
+            AssignmentStatus.PARTIAL,
+            AssignmentStatus.PENDING,
+        ]
+        for index, member in enumerate(cls.staff):
+            for day, status in enumerate(statuses[: index % 4 + 1], start=1):
+                # One shift in the partial first month, the rest in whole months.
+                Shift.objects.create(
+                    staff=member,
+                    date=datetime.date(2025, day + 1, 20),
+                    shift_type=cls.morning,
+                    status=status,
+                )
+            MonthlyAssignment.objects.create(
+                staff=member,
+                task=cls.audit,
+                start_date=datetime.date(2025, 3, 1),
+                end_date=datetime.date(2025, 3, 31),
+                status=AssignmentStatus.NOT_COMPLETED if index % 2 else AssignmentStatus.COMPLETED,
+            )
+
+    def test_rows_cost_the_same_for_any_head_count(self):
+        start, end = datetime.date(2025, 2, 10), datetime.date(2025, 6, 30)
+
+        def queries(staff):
+            with CaptureQueriesContext(connection) as captured:
+                rows = appraisal_rows(staff, start, end)
+            return len(captured), rows
+
+        few, _ = queries(User.objects.filter(pk=self.staff[0].pk))
+        many, rows = queries(User.objects.filter(pk__in=[member.pk for member in self.staff]))
+
+        self.assertEqual(few, many)
+        by_name = {row.staff.first_name: row for row in rows}
+        # Staff0003 has completed, completed, partial and a pending shift.
+        row = by_name["Staff0003"]
+        self.assertEqual((row.daily_total, row.daily_percent), (3, 66.7))
+        self.assertEqual((row.monthly_total, row.monthly_percent), (1, 0.0))
+        self.assertEqual(by_name["Staff0000"].daily_percent, 100.0)
+
+    def test_group_filter_sort_and_csv(self):
+        self.client.force_login(self.manager)
+        params = {
+            "start_date": "2025-01-01",
+            "end_date": "2025-12-31",
+            "group": self.ward_team.pk,
+            "sort": "-daily_total",
+        }
+        response = self.client.get(reverse("main_app:appraisal_batch"), params)
+
+        rows = response.context["rows"]
+        self.assertEqual(len(rows), 4)
+        self.assertEqual([row.daily_total for row in rows], [3, 3, 2, 1])
+
+        response = self.client.get(
+            reverse("main_app:appraisal_batch"), {**params, "format": "csv"}
+        )
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = response.content.decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(lines[0].startswith("Staff,Employee ID,Role,Daily Completed"))
+
+
+class DailyPdfCacheTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.nurses = make_staff(2)
+        cls.day = datetime.date(2025, 3, 4)
+        Shift.objects.create(staff=cls.nurses[0], date=cls.day, shift_type=cls.morning)
+
+    def test_unchanged_day_is_served_from_disk(self):
+        self.client.force_login(self.nurses[0])
+        url = reverse("main_app:daily_detail_pdf", args=[2025, 3, 4])
+
+        with mock.patch("main_app.pdf_cache.render_pdf", wraps=render_pdf) as render:
+            first = self.client.get(url)
+            second = self.client.get(url)
+            first_body = b"".join(first.streaming_content)
+            second_body = b"".join(second.streaming_content)
+            self.assertEqual(render.call_count, 1)
+
+            self.assertEqual(first_body, second_body)
+            self.assertEqual(first["ETag"], second["ETag"])
+            self.assertEqual(int(second["Content-Length"]), len(second_body))
+            self.assertEqual(second["Content-Type"], "application/pdf")
+
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+            self.assertEqual(not_modified.status_code, 304)
+
+            Shift.objects.create(staff=self.nurses[1], date=self.day, shift_type=self.morning)
+            changed = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+            self.assertEqual(changed.status_code, 200)
+            self.assertNotEqual(changed["ETag"], first["ETag"])
+            self.assertEqual(render.call_count, 2)
+
+    def test_least_recently_used_files_are_evicted_past_the_cap(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = PdfCache(directory, max_bytes=350)
+            for age, key in enumerate(["old", "used", "new"]):
+                cache.put(key, b"x" * 100)
+                os.utime(cache.path(key), (1000 + age, 1000 + age))
+            # Reading "old" makes it the most recently used file.
+            cache.get("old").close()
+            cache.put("newest", b"x" * 100)
+
+            self.assertEqual(
+                sorted(path.stem for path in cache.directory.glob("*.pdf")),
+                ["new", "newest", "old"],
+            )
+
+
+class RosterPdfExportTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.nurse = make_staff(1)[0]
+        cls.manager = make_staff(1, start=1, role=User.Role.NURSE_MANAGER)[0]
+        cls.start = datetime.date(2025, 3, 1)
+        for offset in range(3):
+            Shift.objects.create(
+                staff=cls.nurse,
+                date=cls.start + datetime.timedelta(days=offset),
+                shift_type=cls.morning,
+            )
+
+    def setUp(self):
+        super().setUp()
+        export_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(export_dir.cleanup)
+        self.export_dir = export_dir.name
+
+    def page_count(self, path):
+        from pypdf import PdfReader
+
+        return len(PdfReader(path, strict=True).pages)
+
+    def test_export_forms_check_the_date_range(self):
+        def errors(form_class, start, end, **data):
+            form = form_class(data={"start_date": start, "end_date": end, **data})
+            form.is_valid()
+            return form.errors.get("end_date")
+
+        self.assertIsNone(errors(RosterPdfExportForm, "2025-01-01", "2026-01-01"))
+        self.assertEqual(
+            errors(RosterPdfExportForm, "2025-03-02", "2025-03-01"),
+            ["End date must be on or after the start date."],
+        )
+        self.assertEqual(
+            errors(RosterPdfExportForm, "2025-01-01", "2026-01-02"),
+            ["Choose at most 366 days at a time."],
+        )
+        self.assertEqual(
+            errors(RosterCsvExportForm, "2025-03-02", "2025-03-01", export="shifts"),
+            ["End date must be on or after the start date."],
+        )
+        self.assertIsNone(errors(RosterCsvExportForm, "2025-01-01", "2026-01-02", export="shifts"))
+
+    def test_days_are_merged_in_order_and_reuse_the_cache(self):
+        output = os.path.join(self.export_dir, "march.pdf")
+        end = self.start + datetime.timedelta(days=2)
+        with mock.patch("main_app.pdf_cache.render_pdf", wraps=render_pdf) as render:
+            self.assertEqual(export_roster_pdf(self.start, end, output, workers=1), 3)
+            self.assertEqual(render.call_count, 3)
+            pages = self.page_count(output)
+            self.assertGreaterEqual(pages, 3)
+
+            export_roster_pdf(self.start, end, output, workers=1)
+            self.assertEqual(render.call_count, 3)
+            self.assertEqual(self.page_count(output), pages)
+
+    def test_days_are_built_and_written_one_window_at_a_time(self):
+        output = os.path.join(self.export_dir, "lazy.pdf")
+        built = []
+        with mock.patch("main_app.exports.daily_pdf_html", side_effect=lambda day: built.append(day) or daily_pdf_html(day)):
+            export_roster_pdf(
+                self.start, self.start + datetime.timedelta(days=2), output, workers=1,
+                progress=lambda done, total: self.assertEqual(len(built), done),
+            )
+        self.assertEqual(len(built), 3)
+        self.assertFalse(os.path.exists(f"{output}.part"))
+
+    def test_process_pool_renders_missing_days(self):
+        output = os.path.join(self.export_dir, "pool.pdf")
+        end = self.start + datetime.timedelta(days=1)
+        self.assertEqual(export_roster_pdf(self.start, end, output, workers=2), 2)
+        self.assertGreaterEqual(self.page_count(output), 2)
+
+    def test_export_runs_as_a_job_and_downloads(self):
+        self.client.force_login(self.nurse)
+        self.assertEqual(self.client.get(reverse("main_app:roster_pdf_export")).status_code, 403)
+
+        stale = os.path.join(self.export_dir, "roster_old.pdf")
+        open(stale, "wb").close()
+        os.utime(stale, (0, 0))
+        self.client.force_login(self.manager)
+        with override_settings(EXPORT_DIR=self.export_dir, PDF_EXPORT_WORKERS=1):
+            response = self.client.post(
+                reverse("main_app:roster_pdf_export"),
+                {"start_date": "2025-03-01", "end_date": "2025-03-02", "idempotency_key": "pdf-1"},
+            )
+            job = Job.objects.get(idempotency_key="pdf-1")
+            download = reverse("main_app:roster_pdf_download", args=[job.pk])
+            self.assertIn("next=", response["Location"])
+            self.assertEqual(self.client.get(download).status_code, 404)
+
+            run_pending()
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.Status.SUCCEEDED)
+            self.assertEqual((job.progress, job.total), (2, 2))
+            self.assertFalse(os.path.exists(stale))
+
+            response = self.client.get(download)
+            self.assertEqual(response["Content-Type"], "application/pdf")
+            self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+
+class RosterCsvExportTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.ward = Assignment.objects.create(name="Ward")
+        cls.triage = Assignment.objects.create(name="Triage")
+        cls.clinic = Clinic.objects.create(name="Diabetes")
+        cls.audit = MonthlyTask.objects.create(name="Audit")
+        cls.staff = make_staff(5)
+        cls.manager = User.objects.create_user(
+            username="manager",
+            password="pass",
+            first_name="Manager",
+            phone_number="+97336000000",
+            role=User.Role.NURSE_MANAGER,
+        )
+        for day in range(1, 6):
+            for member in cls.staff:
+                shift = Shift.objects.create(
+                    staff=member, date=datetime.date(2025, 3, day), shift_type=cls.morning
+                )
+                shift.assignments.add(cls.ward, cls.triage)
+                shift.clinics.add(cls.clinic)
+        MonthlyAssignment.objects.create(
+            staff=cls.staff[0],
+            task=cls.audit,
+            start_date=datetime.date(2025, 3, 1),
+            end_date=datetime.date(2025, 3, 31),
+        )
+
+    def test_rows_are_fetched_in_chunks_with_a_fixed_query_cost(self):
+        start, end = datetime.date(2025, 3, 1), datetime.date(2025, 3, 31)
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(iter_shift_rows(start, end, chunk_size=10))
+
+        self.assertEqual(len(rows), 25)
+        # Three chunks of one shift query and four through-table queries,
+        # plus the final empty page.
+        self.assertEqual(len(queries), 3 * 5 + 1)
+        self.assertEqual([row[0] for row in rows], sorted(row[0] for row in rows))
+        self.assertEqual(rows[0][6:9], ["Triage; Ward", "", "Diabetes"])
+
+    def test_view_streams_csv(self):
+        self.client.force_login(self.manager)
+        url = reverse("main_app:roster_csv_export")
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        response = self.client.get(
+            url, {"export": "shifts", "start_date": "2025-03-02", "end_date": "2025-03-03"}
+        )
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:4], ["Date", "Staff", "Employee ID", "Shift Type"])
+        self.assertEqual(len(lines), 1 + 10)
+
+        response = self.client.get(
+            url,
+            {"export": "monthly_assignments", "start_date": "2025-03-15", "end_date": "2025-04-15"},
+        )
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn("Audit", lines[1])
+
+
+class RosterImportTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.ward = Assignment.objects.create(name="Ward")
+        cls.triage = Assignment.objects.create(name="Triage")
+        cls.clinic = Clinic.objects.create(name="Diabetes")
+        cls.staff = make_staff(5)
+        cls.manager = User.objects.create_user(
+            username="manager",
+            password="pass",
+            first_name="Manager",
+            phone_number="+97336000000",
+            role=User.Role.NURSE_MANAGER,
+        )
+
+    def csv_file(self, rows):
+        return "".join(csv_lines(SHIFT_EXPORT_HEADER[:4] + ["Assignments", "Clinics", "Status"], rows))
+
+    def test_export_round_trips_with_a_fixed_query_cost(self):
+        for day in range(1, 11):
+            for member in self.staff:
+                shift = Shift.objects.create(
+                    staff=member,
+                    date=datetime.date(2025, 3, day),
+                    shift_type=self.morning,
+                    status=AssignmentStatus.COMPLETED,
+                )
+                shift.assignments.add(self.ward, self.triage)
+                shift.clinics.add(self.clinic)
+        start, end = datetime.date(2025, 3, 1), datetime.date(2025, 3, 31)
+        exported = "".join(csv_lines(SHIFT_EXPORT_HEADER, iter_shift_rows(start, end)))
+        Shift.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            report = import_shifts(exported.splitlines(keepends=True))
+
+        self.assertEqual(report.errors, [])
+        self.assertEqual((report.rows, report.shifts, report.links), (50, 50, 150))
+        # Lookups, the conflict check, the writes and the rollup rebuild;
+        # nothing is issued per row.
+        self.assertLess(len(queries), 30)
+        self.assertEqual(Shift.objects.filter(status=AssignmentStatus.COMPLETED).count(), 50)
+        self.assertEqual(Shift.assignments.through.objects.count(), 100)
+        self.assertEqual("".join(csv_lines(SHIFT_EXPORT_HEADER, iter_shift_rows(start, end))), exported)
+        self.assertEqual(verify_rollups(), {})
+
+    def test_invalid_rows_and_conflicts_block_the_whole_import(self):
+        Shift.objects.create(staff=self.staff[0], date=datetime.date(2025, 3, 1), shift_type=self.morning)
+        data = self.csv_file(
+            [
+                ["2025-03-01", "Staff0000", "", "Morning", "Ward", "", ""],
+                ["2025-03-01", "staff1", "", "Morning", "Ward; Nowhere", "", ""],
+                ["03/01/2025x", "Staff0002", "", "Night", "", "", ""],
+                ["2025-03-02", "Staff0003", "", "morning", "", "Diabetes", "Completed"],
+                ["2025-03-02", "staff3", "", "Morning", "", "", ""],
+            ]
+        )
+        report = import_shifts(data.splitlines(keepends=True))
+
+        self.assertEqual([line for line, _ in report.errors], [2, 3, 4, 4, 6])
+        self.assertIn("already exists", report.errors[0][1])
+        self.assertIn("Nowhere", report.errors[1][1])
+        self.assertIn("Duplicates line 5", report.errors[4][1])
+        self.assertEqual(Shift.objects.count(), 1)
+
+    def test_dry_run_and_view(self):
+        data = self.csv_file([["2025-03-04", "Staff0001", "", "Morning", "Triage", "Diabetes", ""]])
+        report = import_shifts(data.splitlines(keepends=True), dry_run=True)
+        self.assertEqual((report.ok, report.written, report.shifts, report.links), (True, False, 1, 2))
+        self.assertFalse(Shift.objects.exists())
+
+        self.client.force_login(self.manager)
+        url = reverse("main_app:roster_import")
+        response = self.client.post(url, {"file": SimpleUploadedFile("roster.csv", data.encode())})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["report"].written)
+        shift = Shift.objects.get()
+        self.assertEqual(list(shift.assignments.all()), [self.triage])
+        self.assertEqual(list(shift.clinics.all()), [self.clinic])
+
+
+@skipUnless(connection.vendor == "sqlite", "The plan format checked here is SQLite's.")
+class QueryPlanTests(TestCase):
+    """The hot roster queries search an index instead of scanning the table."""
+
+    start = datetime.date(2025, 3, 1)
+    end = datetime.date(2025, 3, 31)
+
+    def assertSearchesIndex(self, queryset, table, index):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf"SEARCH {table} USING (COVERING )?INDEX {index} ", plan)
+
+    def test_shift_queries(self):
+        unique_index = next(
+            name
+            for name, details in connection.introspection.get_constraints(
+                connection.cursor(), Shift._meta.db_table
+            ).items()
+            if details["unique"] and details["columns"] == ["staff_id", "date", "shift_type_id"]
+        )
+        queries = [
+            # Monthly roster.
+            (
+                Shift.objects.filter(date__range=(self.start, self.end), staff__is_active=True)
+                .select_related("shift_type")
+                .order_by("date", "shift_type__start_time", "pk"),
+                "shift_date_type_idx",
+            ),
+            # Daily schedule and manager review.
+            (Shift.objects.filter(date=self.start), "shift_date_type_idx"),
+            # Team leader checklist.
+            (
+                Shift.objects.filter(date=self.start, shift_type_id=1).exclude(staff_id=2),
+                "shift_date_type_idx",
+            ),
+            # Staff analytics shift history.
+            (
+                Shift.objects.filter(staff_id=1, date__range=(self.start, self.end)).order_by("date"),
+                unique_index,
+            ),
+            # Department appraisal report, partial months.
+            (
+                Shift.objects.filter(
+                    staff_id__in=[1, 2],
+                    status__in=[AssignmentStatus.COMPLETED, AssignmentStatus.PARTIAL],
+                    date__range=(self.start, self.end),
+                )
+                .values_list("staff_id", "status")
+                .annotate(total=Count("pk"))
+                .order_by(),
+                "shift_staff_status_date_idx",
+            ),
+        ]
+        for queryset, index in queries:
+            with self.subTest(index=index):
+                self.assertSearchesIndex(queryset, Shift._meta.db_table, index)
+
+    def test_staff_search_queries(self):
+        table = User._meta.db_table
+        for field, index in (
+            ("first_lower", "user_first_name_lower_idx"),
+            ("last_lower", "user_last_name_lower_idx"),
+            ("username_lower", "user_username_lower_idx"),
+        ):
+            with self.subTest(index=index):
+                self.assertSearchesIndex(
+                    staff_queryset().filter(**{f"{field}__gte": "am", f"{field}__lt": "an"}),
+                    table,
+                    index,
+                )
+        self.assertSearchesIndex(
+            staff_queryset().filter(seek_filter(STAFF_ORDERING, ["Amal", "Hasan", 2]))
+            .order_by(*STAFF_ORDERING),
+            table,
+            "user_name_order_idx",
+        )
+
+    def test_monthly_assignment_queries(self):
+        table = MonthlyAssignment._meta.db_table
+        # Monthly assignment list, any page.
+        self.assertSearchesIndex(
+            MonthlyAssignment.objects.filter(
+                seek_filter(("-start_date", "-end_date", "-pk"), [self.start, self.end, 10])
+            ).order_by("-start_date", "-end_date", "-pk"),
+            table,
+            "monthly_assign_dates_idx",
+        )
+        # Monthly roster.
+        self.assertSearchesIndex(
+            MonthlyAssignment.objects.filter(start_date__lte=self.end, end_date__gte=self.start)
+            .select_related("staff", "task", "group", "committee")
+            .order_by("task__name"),
+            table,
+            "monthly_assign_dates_idx",
+        )
+        # Bulk monthly assign.
+        self.assertSearchesIndex(
+            MonthlyAssignment.objects.filter(start_date=self.start, end_date=self.end),
+            table,
+            "monthly_assign_dates_idx",
+        )
+        # Appraisal analytics.
+        self.assertSearchesIndex(
+            MonthlyAssignment.objects.filter(
+                staff_id=1,
+                end_date__gte=self.start,
+                start_date__lte=self.end,
+                status__in=[AssignmentStatus.COMPLETED, AssignmentStatus.PARTIAL],
+            ),
+            table,
+            "monthly_assign_status_idx",
+        )
+
+
+class BenchmarkSuiteTests(RosterTestCase):
+    def test_every_view_has_a_case_within_its_query_budget(self):
+        self.assertEqual(unbenchmarked_views(), set())
+
+        today = datetime.date.today()
+        created = seed_dataset(staff=12, start_date=today - datetime.timedelta(days=30), days=45)
+        self.assertEqual(created["staff"], 12)
+        self.assertEqual(verify_rollups(), {})
+        with tempfile.TemporaryDirectory() as export_dir, override_settings(EXPORT_DIR=export_dir):
+            results = run_benchmarks(build_fixtures(today), repeat=0, check_latency=False)
+
+        self.assertEqual(len(results), len(CASES))
+        failures = {result["name"]: result["failures"] for result in results if result["failures"]}
+        self.assertEqual(failures, {})
+
+    def test_latency_budgets_are_enforced(self):
+        def result(case, fixtures, repeat):
+            cold_ms = {"fast": 250.0, "slow": 251.4}[case.name]
+            return {"status": 200, "queries": 2, "cold_ms": cold_ms, "max_queries": 5, "max_ms": case.max_ms}
+
+        cases = [Case("fast", None, 5, 250), Case("slow", None, 5, 250)]
+        with mock.patch("main_app.benchmarks.run_case", side_effect=result):
+            checked = run_benchmarks(None, cases)
+            unchecked = run_benchmarks(None, cases, check_latency=False)
+        self.assertEqual([r["failures"] for r in checked], [[], ["251 ms (budget 250 ms)"]])
+        self.assertEqual([r["failures"] for r in unchecked], [[], []])
+        self.assertEqual(
+            budget_failures({"status": 500, "queries": 6, "max_queries": 5, "cold_ms": 300.0, "max_ms": 250}),
+            ["HTTP 500", "6 queries (budget 5)", "300 ms (budget 250 ms)"],
+        )
+
+
+class GenerateDatasetTests(RosterTestCase):
+    def roster_pattern(self, prefix):
+        return sorted(
+            Shift.objects.filter(staff__username__startswith=prefix).values_list(
+                "staff__username", "date", "shift_type__name", "status", "assignments__name", "clinics__name"
+            )
+        )
+
+    def test_same_seed_generates_the_same_roster(self):
+        options = {"staff": 6, "years": 0.1, "start": datetime.date(2025, 1, 1), "seed": 3, "stdout": StringIO()}
+        call_command("generate_dataset", prefix="a", **options)
+        call_command("generate_dataset", prefix="b", **options)
+
+        first = [(username[1:], *rest) for username, *rest in self.roster_pattern("a")]
+        second = [(username[1:], *rest) for username, *rest in self.roster_pattern("b")]
+        self.assertTrue(first)
+        self.assertEqual(first, second)
+        self.assertEqual(User.objects.filter(username__startswith="b").count(), 6)
+        self.assertTrue(MonthlyAssignment.objects.filter(staff__username__startswith="b").exists())
+        self.assertEqual(verify_rollups(), {})
+
+        with self.assertRaisesMessage(CommandError, "already exist"):
+            call_command("generate_dataset", prefix="a", **options)
+
+
+class RequestMetricsTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.staff = make_staff(3)
+        for member in cls.staff:
+            Shift.objects.create(staff=member, date=datetime.date(2025, 3, 1), shift_type=cls.morning)
+        cls.manager = User.objects.create_user(
+            username="manager",
+            password="pass",
+            first_name="Manager",
+            phone_number="+97336000000",
+            role=User.Role.NURSE_MANAGER,
+        )
+
+    def setUp(self):
+        super().setUp()
+        metrics.registry.clear()
+
+    def test_views_are_recorded_and_exposed_to_managers(self):
+        self.client.force_login(self.manager)
+        self.client.get(reverse("main_app:monthly_roster", args=[2025, 3]))
+
+        response = self.client.get(reverse("main_app:metrics"))
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        body = response.content.decode()
+        self.assertIn("# TYPE nursing_request_duration_seconds histogram", body)
+        self.assertIn('nursing_db_queries_count{view="main_app:monthly_roster"} 1', body)
+        self.assertIn('nursing_template_duration_seconds_bucket{view="main_app:monthly_roster",le="+Inf"} 1', body)
+        template_sum = next(
+            float(line.split()[-1])
+            for line in body.splitlines()
+            if line.startswith('nursing_template_duration_seconds_sum{view="main_app:monthly_roster"}')
+        )
+        self.assertGreater(template_sum, 0)
+
+        self.client.force_login(self.staff[0])
+        self.assertEqual(self.client.get(reverse("main_app:metrics")).status_code, 403)
+
+    def test_repeated_statements_are_counted_and_logged_for_slow_requests(self):
+        stats = metrics.RequestStats()
+        for shift_id in (1, 2, 3):
+            stats.record_query(lambda *args: None, "SELECT * FROM shift WHERE id = %s", (shift_id,), False, {})
+        stats.record_query(lambda *args: None, "SELECT 1", (), False, {})
+        self.assertEqual((stats.queries, stats.duplicate_queries), (4, 2))
+        self.assertEqual(stats.top_repeated(), [("SELECT * FROM shift WHERE id = %s", 3)])
+
+        self.client.force_login(self.manager)
+        with override_settings(METRICS_SLOW_REQUEST_MS=0), self.assertLogs("main_app.metrics", "WARNING") as logs:
+            self.client.get(reverse("main_app:daily_detail", args=[2025, 3, 1]))
+        self.assertIn("(main_app:daily_detail) -> 200", logs.output[0])
+
+    def test_histogram_buckets_are_cumulative_and_inclusive(self):
+        metrics.registry.observe("main_app:index", {"db_queries": 2})
+        metrics.registry.observe("main_app:index", {"db_queries": 700})
+        body = metrics.registry.render()
+        self.assertIn('nursing_db_queries_bucket{view="main_app:index",le="2"} 1', body)
+        self.assertIn('nursing_db_queries_bucket{view="main_app:index",le="500"} 1', body)
+        self.assertIn('nursing_db_queries_bucket{view="main_app:index",le="1000"} 2', body)
+        self.assertIn('nursing_db_queries_sum{view="main_app:index"} 702.000000', body)
+
+
+class AuthFastPathTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.nurse = User.objects.create_user(
+            username="fatima", password="secret-pass", first_name="Fatima", phone_number="+97336111111"
+        )
+
+    def setUp(self):
+        use_shared_cache(self)
+
+    def authenticate(self, username, password):
+        with mock.patch(
+            "django.contrib.auth.hashers.PBKDF2PasswordHasher.encode", autospec=True,
+            side_effect=PBKDF2PasswordHasher.encode,
+        ) as encode, CaptureQueriesContext(connection) as queries:
+            user = authenticate(username=username, password=password)
+        return user, encode.call_count, len(queries)
+
+    def test_one_query_and_one_hash_per_attempt(self):
+        for login in ("fatima", "36111111", "+973 3611 1111"):
+            with self.subTest(login=login):
+                self.assertEqual(self.authenticate(login, "secret-pass"), (self.nurse, 1, 1))
+        self.assertEqual(self.authenticate("fatima", "wrong"), (None, 1, 1))
+        self.assertEqual(self.authenticate("nobody", "wrong"), (None, 1, 1))
+
+        self.nurse.is_active = False
+        self.nurse.save()
+        self.assertEqual(self.authenticate("fatima", "secret-pass")[0], None)
+
+    def test_page_views_read_the_user_from_the_shared_cache(self):
+        self.client.login(username="fatima", password="secret-pass")
+        url = reverse("main_app:my_schedule")
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["user"], self.nurse)
+        sql = " ".join(query["sql"] for query in queries)
+        self.assertNotIn('FROM "main_app_user"', sql)
+        self.assertNotIn('FROM "django_session"', sql)
+
+    def test_process_local_caches_are_not_used_for_users(self):
+        self.client.login(username="fatima", password="secret-pass")
+        url = reverse("main_app:my_schedule")
+        with override_settings(AUTH_USER_CACHE_ALIAS="default"):
+            self.client.get(url)
+            User.objects.filter(pk=self.nurse.pk).update(is_active=False)
+            self.assertEqual(self.client.get(url).status_code, 302)
+        self.assertIsNone(caches["default"].get(user_cache_key(self.nurse.pk)))
+
+    def test_logout_and_deactivation_end_cached_sessions(self):
+        url = reverse("main_app:my_schedule")
+        self.client.login(username="fatima", password="secret-pass")
+        self.client.get(url)
+        session_key = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.client.logout()
+        # The old cookie, as another worker or a copied browser would send it.
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.login(username="fatima", password="secret-pass")
+        self.client.get(url)
+        # A deactivated copy reaching the cache without the signal firing.
+        cached = caches["users"].get(user_cache_key(self.nurse.pk))
+        cached.is_active = False
+        caches["users"].set(user_cache_key(self.nurse.pk), cached)
+        User.objects.filter(pk=self.nurse.pk).update(is_active=False)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_changes_to_the_user_reach_the_next_request(self):
+        self.client.login(username="fatima", password="secret-pass")
+        url = reverse("main_app:my_schedule")
+        self.client.get(url)
+
+        self.nurse.first_name = "Fatema"
+        self.nurse.save()
+        self.assertEqual(self.client.get(url).context["user"].first_name, "Fatema")
+
+        self.nurse.set_password("new-pass")
+        self.nurse.save()
+        self.assertRedirects(self.client.get(url), f"{reverse('main_app:login')}?next={url}")
+
+
+class CatalogRegistryTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.night = ShiftType.objects.create(
+            name="Night", start_time=datetime.time(21), end_time=datetime.time(7)
+        )
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.ward = Assignment.objects.create(name="Ward")
+        cls.icu = Assignment.objects.create(name="ICU")
+
+    def test_reads_are_free_once_loaded(self):
+        with self.assertNumQueries(2):
+            shift_types = catalog("shift_types")
+        with self.assertNumQueries(0):
+            self.assertEqual(list(catalog("shift_types")), [self.morning, self.night])
+            self.assertEqual(shift_types.name(self.night.pk), "Night")
+            self.assertEqual(shift_types.get(0), None)
+        catalog("assignments")
+        with self.assertNumQueries(0):
+            self.assertEqual(catalog("assignments").names([self.ward.pk, self.icu.pk]), ["ICU", "Ward"])
+
+    def test_local_edit_is_seen_at_once(self):
+        catalog("assignments")
+        version = current_version(CATALOG_SCOPE)
+        self.ward.name = "Main Ward"
+        self.ward.save()
+        self.assertEqual(catalog("assignments").name(self.ward.pk), "Main Ward")
+        self.assertEqual(current_version(CATALOG_SCOPE), version + 1)
+
+    def test_other_workers_edit_is_seen_at_the_next_check(self):
+        # A queryset update sends no signal, as if another process had made it.
+        with override_settings(CATALOG_CHECK_SECONDS=60):
+            catalog("assignments")
+            Assignment.objects.filter(pk=self.ward.pk).update(name="Main Ward")
+            bump_versions([CATALOG_SCOPE])
+            self.assertEqual(catalog("assignments").name(self.ward.pk), "Ward")
+        with override_settings(CATALOG_CHECK_SECONDS=0):
+            self.assertEqual(catalog("assignments").name(self.ward.pk), "Main Ward")
+
+    def test_roster_cache_miss_builds_with_the_current_catalogs(self):
+        # Another worker renames a shift type: the global bump expires the
+        # snapshot here at once, long before this worker's next check.
+        day = datetime.date(2025, 3, 10)
+        with override_settings(CATALOG_CHECK_SECONDS=60):
+            self.assertIn("Night", cached_daily_snapshot(day))
+            ShiftType.objects.filter(pk=self.night.pk).update(name="Late Night")
+            bump_versions([CATALOG_SCOPE, GLOBAL_SCOPE])
+            snapshot = cached_daily_snapshot(day)
+        self.assertIn("Late Night", snapshot)
+        self.assertNotIn("Night", snapshot)
+
+    def test_shift_form_choices_come_from_the_catalogs(self):
+        catalog_registry.warm()
+        with self.assertNumQueries(0):
+            form = ShiftForm()
+            self.assertEqual(
+                [label for _, label in form.fields["assignments"].choices], ["ICU", "Ward"]
+            )
+            self.assertIn(f'value="{self.morning.pk}"', str(form["shift_type"]))
+
+
+class StaffLookupTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = AssignmentGroup.objects.create(name="Group 1")
+        cls.manager = User.objects.create_user(
+            username="manager",
+            password="pass",
+            first_name="Manager",
+            phone_number="+97336000000",
+            role=User.Role.NURSE_MANAGER,
+        )
+        cls.amina = User.objects.create(
+            username="aali", first_name="Amina", last_name="Ali", phone_number="+97331234567",
+            employee_id=4512, assignment_group=cls.group,
+        )
+        cls.amal = User.objects.create(
+            username="ahasan", first_name="Amal", last_name="Hasan", phone_number="+97339876543",
+            employee_id=98, role=User.Role.MAS,
+        )
+        User.objects.create(
+            username="gone", first_name="Amira", phone_number="+97337000001", is_active=False
+        )
+        cls.staff = make_staff(25)
+        cls.url = reverse("main_app:staff_lookup")
+
+    def lookup(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def names(self, **params):
+        return [member["name"] for member in self.lookup(**params)["results"]]
+
+    def test_prefix_search_on_every_field(self):
+        self.login(self.manager)
+        self.assertEqual(self.names(q="am"), ["Amal Hasan", "Amina Ali"])
+        self.assertEqual(self.names(q="HAS"), ["Amal Hasan"])
+        self.assertEqual(self.names(q="aal"), ["Amina Ali"])
+        self.assertEqual(self.names(q="amina al"), ["Amina Ali"])
+        self.assertEqual(self.names(q="451"), ["Amina Ali"])
+        self.assertEqual(self.names(q="3987"), ["Amal Hasan"])
+        self.assertEqual(self.names(q="+97331"), ["Amina Ali"])
+        self.assertEqual(self.names(q="am", role=User.Role.MAS), ["Amal Hasan"])
+        self.assertEqual(self.names(group=self.group.pk), ["Amina Ali"])
+
+    def test_keyset_pages_cover_everyone_once(self):
+        self.login(self.manager)
+        seen, cursor = [], None
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                page = self.lookup(q="staff", limit=10, **({"cursor": cursor} if cursor else {}))
+            # The session, the user and the page; see use_shared_cache for fewer.
+            self.assertEqual(len(queries), 3)
+            seen += [member["id"] for member in page["results"]]
+            cursor = page["next"]
+            if not cursor:
+                break
+        self.assertEqual(seen, [member.pk for member in self.staff])
+
+        self.assertEqual(self.client.get(self.url, {"cursor": "nonsense"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"role": "CHEF"}).status_code, 400)
+
+    def test_picker_renders_only_the_chosen_staff(self):
+        form = RotationAssignForm(initial={"employees": [self.amina.pk]})
+        html = str(form["employees"])
+        self.assertEqual(html.count("<option"), 1)
+        self.assertIn(f'data-lookup-url="{self.url}"', html)
+
+        form = ShiftForm(data={"staff": self.amal.pk})
+        self.assertIn(f'value="{self.amal.pk}" selected', str(form["staff"]))
+        self.assertEqual(str(form["staff"]).count("<option"), 2)
+        self.assertNotIn("staff", form.errors)
+
+
+class ListPaginationTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = make_staff(1, start=900, role=User.Role.NURSE_MANAGER)[0]
+        cls.group = AssignmentGroup.objects.create(name="Group 1")
+        cls.committee = Committee.objects.create(name="Infection Control")
+        cls.audit = MonthlyTask.objects.create(name="Audit")
+        cls.staff = make_staff(12, assignment_group=cls.group)
+        cls.assignments = [
+            MonthlyAssignment.objects.create(
+                staff=member,
+                task=cls.audit,
+                start_date=datetime.date(2025, month, 1),
+                end_date=datetime.date(2025, month, 28),
+                group=cls.group if month % 2 else None,
+                committee=cls.committee if month == 3 else None,
+            )
+            for month in range(1, 13)
+            for member in cls.staff[:5]
+        ]
+
+    def walk(self, url, params=None):
+        """Follow the next-page links; return the rows and the queries per page."""
+        rows, costs = [], []
+        params = dict(params or {})
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            rows += list(response.context["object_list"])
+            costs.append(len(queries))
+            if not response.context["next_page_query"]:
+                return rows, costs
+            params["cursor"] = response.context["page_obj"].next_cursor
+
+    def test_monthly_assignment_pages_cost_the_same_at_any_depth(self):
+        self.login(self.manager)
+        catalog_registry.warm()
+        url = reverse("main_app:monthly_assignment_list")
+        with mock.patch.object(views.MonthlyAssignmentListView, "paginate_by", 7):
+            rows, costs = self.walk(url)
+        expected = sorted(self.assignments, key=lambda a: (a.start_date, a.end_date, a.pk), reverse=True)
+        self.assertEqual(rows, expected)
+        self.assertEqual(len(set(costs)), 1)
+
+        rows, _ = self.walk(url, {"group": self.group.pk, "start_date": "2025-06-01"})
+        self.assertEqual({row.start_date.month for row in rows}, {7, 9, 11})
+        rows, _ = self.walk(url, {"committee": self.committee.pk})
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(self.client.get(url, {"cursor": "nope"}).status_code, 404)
+
+    def test_staff_list_filters_and_pages(self):
+        self.login(self.manager)
+        url = reverse("main_app:staff_list")
+        self.staff[0].is_active = False
+        self.staff[0].save()
+        with mock.patch.object(views.StaffListView, "paginate_by", 5):
+            rows, costs = self.walk(url)
+            self.assertEqual(rows, [*self.staff[1:], self.manager])
+            self.assertEqual(len(set(costs)), 1)
+            self.assertEqual(self.walk(url, {"status": "inactive"})[0], [self.staff[0]])
+            self.assertEqual(self.walk(url, {"role": User.Role.NURSE_MANAGER})[0], [self.manager])
+
+    def test_my_schedule_pages_through_upcoming_shifts(self):
+        morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        nurse = self.staff[1]
+        today = datetime.date.today()
+        shifts = [
+            Shift.objects.create(staff=nurse, date=today + datetime.timedelta(days=offset), shift_type=morning)
+            for offset in range(-3, 10)
+        ]
+        self.login(nurse)
+        url = reverse("main_app:my_schedule")
+        with mock.patch.object(views.MyScheduleView, "paginate_by", 4):
+            rows, costs = self.walk(url)
+        self.assertEqual(rows, shifts[3:])
+        self.assertEqual(len(set(costs)), 1)
+
+
+class RosterApiTests(RosterTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = datetime.date(2025, 3, 4)
+        cls.morning = ShiftType.objects.create(
+            name="Morning", start_time=datetime.time(7), end_time=datetime.time(14)
+        )
+        cls.ward = Assignment.objects.create(name="Ward")
+        cls.triage = SubAssignment.objects.create(name="Triage")
+        cls.nurse, cls.other = make_staff(2)
+        cls.shift = Shift.objects.create(staff=cls.nurse, date=cls.day, shift_type=cls.morning)
+        cls.shift.assignments.add(cls.ward)
+        cls.shift.sub_assignments.add(cls.triage)
+
+    def get(self, name, *args, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(reverse(f"main_app:{name}", args=args), **headers)
+
+    def test_monthly_roster_payload(self):
+        self.login(self.nurse)
+        data = self.get("api_monthly_roster", 2025, 3).json()
+        self.assertEqual(data["days"], 31)
+        self.assertEqual([row[0] for row in data["staff"]], [self.nurse.pk, self.other.pk])
+        self.assertEqual(data["cells"], [[0, 4, self.morning.pk, 0, [self.ward.pk], []]])
+        self.assertEqual(data["shift_types"], {str(self.morning.pk): ["Morning", "07:00", "14:00"]})
+        self.assertEqual(data["tasks"]["main"], {str(self.ward.pk): "Ward"})
+        self.assertEqual(data["statuses"][0], AssignmentStatus.PENDING)
+
+    def test_unchanged_roster_is_a_cheap_304(self):
+        self.login(self.nurse)
+        response = self.get("api_daily_detail", 2025, 3, 4)
+        etag = response["ETag"]
+        self.assertEqual(response.json()["shifts"][0][:2], [self.nurse.pk, self.morning.pk])
+        self.assertEqual(response.json()["tasks"]["sub"], {str(self.triage.pk): "Triage"})
+
+        # Without a shared cache: the session and the user, then one read of the versions.
+        with self.assertNumQueries(3):
+            response = self.get("api_daily_detail", 2025, 3, 4, etag=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_304_with_a_shared_cache_reads_only_the_versions(self):
+        use_shared_cache(self)
+        self.login(self.nurse)
+        etag = self.get("api_daily_detail", 2025, 3, 4)["ETag"]
+
+        # The session and the user come from the cache.
+        with self.assertNumQueries(1):
+            response = self.get("api_daily_detail", 2025, 3, 4, etag=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Another day's change leaves this day's ETag alone.
+        Shift.objects.create(staff=self.other, date=self.day + datetime.timedelta(days=1), shift_type=self.morning)
+        self.assertEqual(self.get("api_daily_detail", 2025, 3, 4, etag=etag).status_code, 304)
+        month_etag = self.get("api_monthly_roster", 2025, 3)["ETag"]
+
+        self.shift.status = AssignmentStatus.COMPLETED
+        self.shift.save()
+        response = self.get("api_daily_detail", 2025, 3, 4, etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["shifts"][0][2], STATUSES.index(AssignmentStatus.COMPLETED))
+        self.assertEqual(self.get("api_monthly_roster", 2025, 3, etag=month_etag).status_code, 200)
+
+    def test_my_schedule_lists_own_upcoming_shifts(self):
+        today = datetime.date.today()
+        upcoming = Shift.objects.create(staff=self.nurse, date=today, shift_type=self.morning, notes="Cover")
+        Shift.objects.create(staff=self.other, date=today, shift_type=self.morning)
+        self.login(self.nurse)
+
+        response = self.get("api_my_schedule")
+        self.assertEqual(
+            response.json()["shifts"],
+            [[today.isoformat(), self.morning.pk, 0, [], [], [], [], "Cover"]],
+        )
+        self.assertEqual(self.get("api_my_schedule", etag=response["ETag"]).status_code, 304)
+
+        upcoming.assignments.add(self.ward)
+        self.assertEqual(self.get("api_my_schedule", etag=response["ETag"]).status_code, 200)
+
+    def test_errors(self):
+        self.assertEqual(self.get("api_my_schedule").status_code, 403)
+        self.login(self.nurse)
+        self.assertEqual(self.get("api_monthly_roster", 2025, 13).status_code, 404)
+        self.assertEqual(self.get("api_daily_detail", 2025, 2, 30).status_code, 404)
+        # Only an impossible date is a 404; a bug building the payload is not.
+        with mock.patch("main_app.roster_api.daily_payload", side_effect=ValueError("bug")):
+            with self.assertRaisesMessage(ValueError, "bug"):
+                self.get("api_daily_detail", 2025, 3, 5)
@@ -35,10 +35,22 @@ urlpatterns = [
     path('checklist/', views.ChecklistView.as_view(), name='checklist'),
     path('manager-review/', views.ManagerReviewView.as_view(), name='manager_review'),
     path('appraisal/', views.AppraisalAnalyticsView.as_view(), name='appraisal_analytics'),
+    path('appraisal/batch/', views.AppraisalBatchView.as_view(), name='appraisal_batch'),
     path('staff/', views.StaffListView.as_view(), name='staff_list'),
+    path('staff/lookup/', views.StaffLookupView.as_view(), name='staff_lookup'),
     path('staff/<int:pk>/', views.StaffDetailView.as_view(), name='staff_detail'),
     path('staff/<int:pk>/edit/', views.StaffUpdateView.as_view(), name='staff_edit'),
     path('monthly-assignments/<int:year>/<int:month>/', views.MonthlyAssignmentDisplayView.as_view(), name='monthly_assignment_display'),
     path('monthly-assignments/bulk-assign/<int:year>/<int:month>/', views.MonthlyAssignmentBulkAssignView.as_view(), name='monthly_assignment_bulk_assign'),
     path('monthly-assignments/today/', views.MonthlyAssignmentTodayRedirectView.as_view(), name='monthly_assignment_today'),
+    path('roster/pdf/', views.RosterPdfExportView.as_view(), name='roster_pdf_export'),
+    path('roster/csv/', views.RosterCsvExportView.as_view(), name='roster_csv_export'),
+    path('roster/import/', views.RosterImportView.as_view(), name='roster_import'),
+    path('roster/pdf/<int:pk>/download/', views.RosterPdfDownloadView.as_view(), name='roster_pdf_download'),
+    path('jobs/<int:pk>/', views.JobStatusView.as_view(), name='job_status'),
+    path('jobs/<int:pk>/poll/', views.JobPollView.as_view(), name='job_poll'),
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
+    path('api/v1/roster/<int:year>/<int:month>/', views.MonthlyRosterApiView.as_view(), name='api_monthly_roster'),
+    path('api/v1/daily/<int:year>/<int:month>/<int:day>/', views.DailyDetailApiView.as_view(), name='api_daily_detail'),
+    path('api/v1/my-schedule/', views.MyScheduleApiView.as_view(), name='api_my_schedule'),
 ]
\ No newline at end of file
@@ -12,21 +12,15 @@ from django.views.generic import (
     RedirectView,
     FormView,
     DetailView,
+    View,
 )
 from django.urls import reverse_lazy, reverse
 from .models import (
     AssignmentGroup,
-    AssignmentStatus,
-    Committee,
     User,
     Shift,
-    ShiftType,
-    Assignment,
-    SubAssignment,
-    Clinic,
-    EmergencyRole,
     MonthlyAssignment,
-    MonthlyTask,
+    Job,
 )
 from .forms import (
     ShiftForm,
@@ -36,17 +30,65 @@ from .forms import (
     ProfileUpdateForm,
     MonthlyAssignmentForm,
     AppraisalFilterForm,
+    AppraisalBatchForm,
+    RosterPdfExportForm,
+    RosterCsvExportForm,
+    RosterImportForm,
     StaffUpdateForm,
+    MonthlyAssignmentFilterForm,
+    StaffFilterForm,
+    ScheduleFilterForm,
+)
+from .catalogs import catalog
+from .roster import (
+    SHIFT_TASK_FIELDS,
+    StaffOptions,
+    cached_roster_context,
+    build_selection_index,
+    daily_pdf_html,
+    iter_shift_tasks,
+    render_daily_shifts,
+)
+from .analytics import (
+    ASSESSED_STATUSES,
+    PERIOD_MONTHS,
+    appraisal_rows,
+    resolve_period,
+    shift_status_counts,
+    staff_activity_counts,
+    status_counts,
+)
+from .roster_cache import current_version, date_scope, roster_cache
+from .exports import CSV_EXPORTS, csv_lines
+from .imports import import_shifts
+from .metrics import registry
+from .pagination import InvalidCursor, keyset_page
+from .roster_api import daily_resource, monthly_roster_resource, schedule_resource
+from .staff_search import MAX_PAGE_SIZE, PAGE_SIZE, STAFF_ORDERING, search_staff, staff_label
+from .jobs import submit
+from .services import (
+    StaleRosterError,
+    apply_checklist,
+    apply_rotation,
+    committees_without_tasks,
+    parse_checklist,
+    parse_daily_grid,
+    save_daily_grid,
 )
 from django.urls import reverse_lazy
 from dateutil.relativedelta import relativedelta
 from django.shortcuts import redirect
 import datetime
 import calendar
-from io import BytesIO
-from django.http import HttpResponse
-from xhtml2pdf import pisa
-from collections import Counter
+import csv
+import io
+import uuid
+from pathlib import Path
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import url_has_allowed_host_and_scheme, urlencode
+from .pdf_cache import PdfRenderError, content_key, get_pdf_cache
 
 
 class ManagerRequiredMixin(UserPassesTestMixin):
@@ -54,6 +96,39 @@ class ManagerRequiredMixin(UserPassesTestMixin):
         return self.request.user.role == "MANAGER"
 
 
+class KeysetPaginationMixin:
+    """Page a ListView with a ``cursor`` query parameter over ``keyset``.
+
+    Each page is one seek on the ordering, so deep pages cost no more than
+    the first. The context gets ``next_page_query`` and ``first_page_query``
+    (the current query string with the cursor replaced) for pagination.html.
+    """
+    keyset = ()
+    paginate_by = 50
+
+    def paginate_queryset(self, queryset, page_size):
+        try:
+            page = keyset_page(queryset, self.keyset, self.request.GET.get('cursor'), page_size)
+        except InvalidCursor:
+            raise Http404("Invalid page cursor.")
+        return None, page, page.items, page.next_cursor is not None
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.copy()
+        query.pop('cursor', None)
+        context['first_page_query'] = query.urlencode() if 'cursor' in self.request.GET else None
+        context['next_page_query'] = None
+        if context['page_obj'].next_cursor:
+            query['cursor'] = context['page_obj'].next_cursor
+            context['next_page_query'] = query.urlencode()
+        return context
+
+
+def redirect_to_job(job, next_url):
+    return redirect(f"{reverse('main_app:job_status', args=[job.pk])}?{urlencode({'next': str(next_url)})}")
+
+
 class DashboardView(LoginRequiredMixin, ListView):
     model = Shift
     template_name = "dashboard.html"
@@ -132,14 +207,20 @@ class UserCreateView(LoginRequiredMixin, ManagerRequiredMixin, CreateView):
             "main_app:monthly_roster", kwargs={"year": today.year, "month": today.month}
         )
 
-class StaffListView(LoginRequiredMixin, ManagerRequiredMixin, ListView):
+class StaffListView(LoginRequiredMixin, ManagerRequiredMixin, KeysetPaginationMixin, ListView):
     model = User
     template_name = 'staff_list.html'
     context_object_name = 'staff_members'
-    ordering = ['first_name']
+    keyset = STAFF_ORDERING
+
     def get_queryset(self):
-        queryset = User.objects.filter(is_active=True).order_by('first_name')
-        return queryset
+        self.filter_form = StaffFilterForm(self.request.GET)
+        return self.filter_form.filter(User.objects.all())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['filter_form'] = self.filter_form
+        return context
 
 class StaffDetailView(LoginRequiredMixin, ManagerRequiredMixin, DetailView):
     model = User
@@ -173,56 +254,31 @@ class MonthlyRosterView(LoginRequiredMixin, TemplateView):
 
         year = self.kwargs.get("year", datetime.date.today().year)
         month = self.kwargs.get("month", datetime.date.today().month)
-        _, last_day = calendar.monthrange(year, month)
-        month_start = datetime.date(year, month, 1)
-        month_end = datetime.date(year, month, last_day)
-        context['monthly_assignments'] = MonthlyAssignment.objects.filter(
-            start_date__lte=month_end,
-            end_date__gte=month_start
-        ).select_related('staff', 'task').order_by('task__name')
         current_date = datetime.date(year, month, 1)
 
         context["previous_month"] = current_date - relativedelta(months=1)
         context["next_month"] = current_date + relativedelta(months=1)
-
-        all_staff = User.objects.filter(is_active=True).order_by("first_name")
-
-        shifts_for_month = (
-            Shift.objects.filter(date__year=year, date__month=month)
-            .select_related("staff", "shift_type")
-            .prefetch_related(
-                "assignments", "sub_assignments", "clinics", "emergency_roles"
-            )
-        )
-
-        month_name = calendar.month_name[month]
-        num_days = calendar.monthrange(year, month)[1]
-        day_headers = range(1, num_days + 1)
-
-        roster_data = []
-        for staff_member in all_staff:
-            days_data = {day: [] for day in day_headers}
-
-            staff_shifts = shifts_for_month.filter(staff=staff_member)
-
-            for shift in staff_shifts:
-                day_number = shift.date.day
-                days_data[day_number].append(shift)
-
-            roster_data.append(
-                {
-                    "staff": staff_member,
-                    "days": days_data,
-                }
-            )
-
-        context["roster_data"] = roster_data
-        context["day_headers"] = day_headers
-        context["month_name"] = month_name
+        context["month_name"] = calendar.month_name[month]
         context["year"] = year
-
+        context["month_start"] = current_date
+        context["month_end"] = context["next_month"] - datetime.timedelta(days=1)
+
+        is_manager = self.request.user.role == "MANAGER"
+        variant = "manager" if is_manager else "staff"
+        context["roster_table"] = roster_cache.month(
+            year,
+            month,
+            f"roster_table_html:{variant}",
+            lambda: self.render_roster_table(year, month, is_manager),
+        )
         return context
 
+    def render_roster_table(self, year, month, is_manager):
+        return render_to_string(
+            "monthly_roster_table.html",
+            {**cached_roster_context(year, month), "year": year, "month": month, "is_manager": is_manager},
+        )
+
 
 class DailyDetailView(LoginRequiredMixin, TemplateView):
     template_name = "daily_detail.html"
@@ -235,36 +291,30 @@ class DailyDetailView(LoginRequiredMixin, TemplateView):
         view_date = datetime.date(year, month, day)
         context["view_date"] = view_date
 
-        all_shifts_for_day = Shift.objects.filter(date=view_date).select_related(
-            "staff", "shift_type"
-        ).prefetch_related(
-            "assignments", "sub_assignments", "clinics", "emergency_roles"
+        context["shifts_html"] = roster_cache.day(
+            view_date, "daily_shifts_html", lambda: render_daily_shifts(view_date)
         )
-    
-        shift_types = ShiftType.objects.order_by('start_time')
-
-        shifts_by_type = {}
-        for shift_type in shift_types:
-            shifts_in_group = all_shifts_for_day.filter(shift_type=shift_type)
-            
-            shifts_by_type[shift_type.name] = {
-                'nurse_shifts': shifts_in_group.filter(staff__role__in=['NURSE', 'MANAGER']),
-                'mas_shifts': shifts_in_group.filter(staff__role='MAS')
-            }
-        
-        context['shifts_by_type'] = shifts_by_type
         return context
 
 
-class MyScheduleView(LoginRequiredMixin, ListView):
+class MyScheduleView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Shift
     template_name = "my_schedule.html"
     context_object_name = "my_shifts"
+    keyset = ("date", "shift_type__start_time", "pk")
+    paginate_by = 30
 
     def get_queryset(self):
-        return Shift.objects.filter(
-            staff=self.request.user, date__gte=datetime.date.today()
-        ).order_by("date", "shift_type__start_time")
+        self.filter_form = ScheduleFilterForm(self.request.GET)
+        shifts = Shift.objects.filter(staff=self.request.user).select_related("shift_type").prefetch_related(
+            "assignments", "sub_assignments", "clinics", "emergency_roles"
+        )
+        return self.filter_form.filter(shifts, datetime.date.today())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["filter_form"] = self.filter_form
+        return context
 
 
 class DailyAssignRedirectView(LoginRequiredMixin, ManagerRequiredMixin, FormView):
@@ -290,48 +340,51 @@ class DailyAssignView(LoginRequiredMixin, ManagerRequiredMixin, TemplateView):
 
         context["view_date"] = view_date
         start_date = view_date - datetime.timedelta(days=5)
-        recent_shifts = Shift.objects.filter(
-            date__range=(start_date, view_date - datetime.timedelta(days=1))
-        )
 
         history = {}
-        for shift in recent_shifts:
-            staff_id_str = str(shift.staff_id)
-            if staff_id_str not in history:
-                history[staff_id_str] = {
-                    "main": {},
-                    "sub": {},
-                    "clinic": {},
-                    "emergency": {},
-                }
-
-            for task in shift.assignments.all():
-                history[staff_id_str]["main"][str(task.id)] = shift.date.isoformat()
-            for task in shift.sub_assignments.all():
-                history[staff_id_str]["sub"][str(task.id)] = shift.date.isoformat()
-            for task in shift.clinics.all():
-                history[staff_id_str]["clinic"][str(task.id)] = shift.date.isoformat()
-            for task in shift.emergency_roles.all():
-                history[staff_id_str]["emergency"][
-                    str(task.id)
-                ] = shift.date.isoformat()
+        for link in iter_shift_tasks(
+            date__range=(start_date, view_date - datetime.timedelta(days=1))
+        ):
+            staff_history = history.setdefault(
+                str(link.staff_id),
+                {"main": {}, "sub": {}, "clinic": {}, "emergency": {}},
+            )
+            last_seen = link.date.isoformat()
+            task_history = staff_history[link.task_type]
+            if task_history.get(str(link.task_id), "") < last_seen:
+                task_history[str(link.task_id)] = last_seen
 
         context["history_json"] = json.dumps(history)
+        context["roster_version"] = current_version(date_scope(view_date))
 
-        context["main_assignments"] = Assignment.objects.all()
-        context["sub_assignments"] = SubAssignment.objects.all()
-        context["clinics"] = Clinic.objects.all()
-        context["emergency_roles"] = EmergencyRole.objects.all()
+        shift_types = catalog("shift_types").items
+        context["shift_types"] = shift_types
 
-        context["shift_types"] = ShiftType.objects.all()
-        context["staff_members"] = User.objects.filter(is_active=True).order_by(
-            "first_name"
+        staff_options = StaffOptions(
+            User.objects.filter(is_active=True).order_by("first_name")
         )
+        selection = build_selection_index(view_date)
+        context["staff_options"] = staff_options.html
 
-        existing_shifts = Shift.objects.filter(date=view_date).prefetch_related(
-            "assignments", "sub_assignments", "clinics", "emergency_roles"
-        )
-        context["existing_shifts"] = existing_shifts
+        def grid_rows(task_type, tasks):
+            return [
+                {
+                    "task": task,
+                    "cells": [
+                        {
+                            "shift_type_id": shift_type.id,
+                            "options": staff_options.render(
+                                selection.get((task_type, shift_type.id, task.id))
+                            ),
+                        }
+                        for shift_type in shift_types
+                    ],
+                }
+                for task in tasks
+            ]
+
+        for task_type, field_name in SHIFT_TASK_FIELDS.items():
+            context[f"{task_type}_rows"] = grid_rows(task_type, catalog(field_name))
 
         return context
 
@@ -339,45 +392,24 @@ class DailyAssignView(LoginRequiredMixin, ManagerRequiredMixin, TemplateView):
         view_date = datetime.date(
             self.kwargs.get("year"), self.kwargs.get("month"), self.kwargs.get("day")
         )
-        staff_shift_tasks = {}
-
-        for key, staff_id in request.POST.items():
-            if key in ["csrfmiddlewaretoken"] or not staff_id:
-                continue
-
-            parts = key.split("_")
-            task_type = parts[0]
-            shift_type_id = int(parts[1])
-            task_id = int(parts[2])
-
-            dict_key = (staff_id, shift_type_id)
-            if dict_key not in staff_shift_tasks:
-                staff_shift_tasks[dict_key] = {
-                    "assignments": [],
-                    "sub_assignments": [],
-                    "clinics": [],
-                    "emergency_roles": [],
-                }
-
-            if task_type == "main":
-                staff_shift_tasks[dict_key]["assignments"].append(task_id)
-            elif task_type == "sub":
-                staff_shift_tasks[dict_key]["sub_assignments"].append(task_id)
-            elif task_type == "clinic":
-                staff_shift_tasks[dict_key]["clinics"].append(task_id)
-            elif task_type == "emergency":
-                staff_shift_tasks[dict_key]["emergency_roles"].append(task_id)
-
-        Shift.objects.filter(date=view_date).delete()
-
-        for (staff_id, shift_type_id), tasks in staff_shift_tasks.items():
-            new_shift = Shift.objects.create(
-                staff_id=staff_id, shift_type_id=shift_type_id, date=view_date
+        try:
+            save_daily_grid(
+                view_date,
+                parse_daily_grid(request.POST),
+                expected_version=request.POST.get("roster_version"),
+            )
+        except StaleRosterError:
+            messages.error(
+                request,
+                "Someone else saved assignments for this day while you were editing. "
+                "Your changes were not saved; please review the latest version.",
+            )
+            return redirect(
+                "main_app:daily_assign",
+                year=view_date.year,
+                month=view_date.month,
+                day=view_date.day,
             )
-            new_shift.assignments.set(tasks["assignments"])
-            new_shift.sub_assignments.set(tasks["sub_assignments"])
-            new_shift.clinics.set(tasks["clinics"])
-            new_shift.emergency_roles.set(tasks["emergency_roles"])
 
         return redirect(
             "main_app:daily_detail",
@@ -402,27 +434,35 @@ class BulkAssignView(LoginRequiredMixin, ManagerRequiredMixin, FormView):
         if not rotation_days:
             return super().form_invalid(form)
 
-        for employee in employees:
-            Shift.objects.filter(
-                staff=employee, date__range=(start_date, end_date)
-            ).delete()
-
-            current_date = start_date
-            day_counter = 0
-            while current_date <= end_date:
-                rotation_day = rotation_days[day_counter % len(rotation_days)]
-
-                if not rotation_day.is_day_off:
-                    Shift.objects.create(
-                        staff=employee,
-                        date=current_date,
-                        shift_type=rotation_day.shift_type,
-                    )
-
-                current_date += datetime.timedelta(days=1)
-                day_counter += 1
-
-        return super().form_valid(form)
+        if form.cleaned_data["dry_run"]:
+            result = apply_rotation(
+                rotation_days,
+                [employee.pk for employee in employees],
+                start_date,
+                end_date,
+                offsets=form.get_offsets(),
+                dry_run=True,
+            )
+            messages.info(
+                self.request,
+                f"Dry run: {result['created']} shifts would be created and "
+                f"{result['deleted']} existing shifts deleted.",
+            )
+            return self.render_to_response(self.get_context_data(form=form))
+
+        job = submit(
+            "apply_rotation",
+            {
+                "rotation_id": rotation.pk,
+                "staff_ids": [employee.pk for employee in employees],
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "offsets": form.get_offsets(),
+            },
+            idempotency_key=form.cleaned_data["idempotency_key"] or None,
+            user=self.request.user,
+        )
+        return redirect_to_job(job, self.get_success_url())
 
 
 class ProfileView(LoginRequiredMixin, DetailView):
@@ -450,46 +490,184 @@ from django.http import HttpRequest
 @login_required
 def daily_schedule_pdf_view(request: HttpRequest, year: int, month: int, day: int):
     view_date = datetime.date(year, month, day)
-    shifts = (
-        Shift.objects.filter(date=view_date)
-        .select_related("staff", "shift_type")
-        .order_by("shift_type__start_time", "staff__first_name")
+    html_string = daily_pdf_html(view_date)
+
+    etag = f'"{content_key(html_string)}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+
+    try:
+        _, pdf_file = get_pdf_cache().get_or_render(html_string)
+    except PdfRenderError:
+        return HttpResponse("Error Rendering PDF", status=400)
+
+    response = FileResponse(
+        pdf_file,
+        as_attachment=True,
+        filename=f"daily_schedule_{view_date}.pdf",
+        content_type="application/pdf",
     )
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
 
-    shifts_by_type = {}
-    for shift in shifts:
-        shift_type_name = shift.shift_type.name
-        if shift_type_name not in shifts_by_type:
-            shifts_by_type[shift_type_name] = {
-                "shift_type": shift.shift_type,
-                "nurse_shifts": [],
-                "mas_shifts": [],
-            }
-
-        if shift.staff.role in ["NURSE", "MANAGER"]:
-            shifts_by_type[shift_type_name]["nurse_shifts"].append(shift)
-        elif shift.staff.role == "MAS":
-            shifts_by_type[shift_type_name]["mas_shifts"].append(shift)
-
-    context: dict[str, object] = {
-        "view_date": view_date,
-        "shifts_by_type": shifts_by_type,
-        "is_for_pdf": True,
-    }
 
-    html_string = render_to_string("daily_detail.html", context)
+class RosterPdfExportView(LoginRequiredMixin, ManagerRequiredMixin, FormView):
+    template_name = 'roster_pdf_export.html'
+    form_class = RosterPdfExportForm
+
+    def get_initial(self):
+        initial = super().get_initial()
+        initial.update(self.request.GET.dict())
+        return initial
+
+    def form_valid(self, form):
+        job = submit(
+            "export_roster_pdf",
+            {
+                "start_date": form.cleaned_data["start_date"].isoformat(),
+                "end_date": form.cleaned_data["end_date"].isoformat(),
+            },
+            idempotency_key=form.cleaned_data["idempotency_key"] or None,
+            user=self.request.user,
+        )
+        return redirect_to_job(job, reverse("main_app:roster_pdf_download", args=[job.pk]))
 
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html_string.encode("UTF-8")), result)
 
-    if not pdf.err:
-        response = HttpResponse(result.getvalue(), content_type="application/pdf")
-        response["Content-Disposition"] = (
-            f'attachment; filename="daily_schedule_{view_date}.pdf"'
+class RosterCsvExportView(LoginRequiredMixin, ManagerRequiredMixin, TemplateView):
+    template_name = 'roster_csv_export.html'
+
+    def get(self, request, *args, **kwargs):
+        form = RosterCsvExportForm(request.GET or None)
+        if not form.is_valid():
+            return self.render_to_response(self.get_context_data(form=form))
+
+        export = form.cleaned_data['export']
+        start_date = form.cleaned_data['start_date']
+        end_date = form.cleaned_data['end_date']
+        header, rows = CSV_EXPORTS[export]
+        response = StreamingHttpResponse(
+            csv_lines(header, rows(start_date, end_date)), content_type='text/csv'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{export}_{start_date}_{end_date}.csv"'
         )
         return response
 
-    return HttpResponse("Error Rendering PDF", status=400)
+
+class RosterImportView(LoginRequiredMixin, ManagerRequiredMixin, FormView):
+    template_name = 'roster_import.html'
+    form_class = RosterImportForm
+
+    def form_valid(self, form):
+        upload = form.cleaned_data['file']
+        dry_run = form.cleaned_data['dry_run']
+        try:
+            report = import_shifts(io.TextIOWrapper(upload.file, encoding='utf-8-sig'), dry_run=dry_run)
+        except (UnicodeDecodeError, csv.Error) as e:
+            form.add_error('file', f"Could not read the file as CSV: {e}")
+            return self.form_invalid(form)
+
+        if report.written:
+            messages.success(self.request, f"Imported {report.shifts} shift(s) with {report.links} task link(s).")
+        elif report.ok:
+            messages.info(self.request, f"Dry run: {report.shifts} shift(s) with {report.links} task link(s) would be imported.")
+        else:
+            messages.error(self.request, f"Nothing was imported: {len(report.errors)} problem(s) found.")
+        return self.render_to_response(self.get_context_data(form=form, report=report))
+
+
+class MetricsView(LoginRequiredMixin, ManagerRequiredMixin, View):
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def date_from_url(kwargs):
+    """The date named by ``year``, ``month`` and (optionally) ``day`` URL kwargs; 404 if impossible."""
+    try:
+        return datetime.date(kwargs['year'], kwargs['month'], kwargs.get('day', 1))
+    except ValueError:
+        raise Http404("No such date.")
+
+
+class RosterApiView(LoginRequiredMixin, View):
+    """Read-only JSON view of a roster_api Resource, with conditional GET.
+
+    Subclasses set ``resource`` to the roster_api factory and return its
+    arguments from ``resource_args()``. A client sending the ETag it holds
+    gets an empty 304 after one version query, unless the shifts behind the
+    document changed since.
+    """
+    raise_exception = True
+
+    def get(self, request, *args, **kwargs):
+        resource = self.resource(*self.resource_args())
+        not_modified = get_conditional_response(request, etag=resource.etag)
+        if not_modified is None:
+            response = HttpResponse(resource.body(), content_type='application/json')
+        else:
+            response = not_modified
+        response['ETag'] = resource.etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class MonthlyRosterApiView(RosterApiView):
+    resource = staticmethod(monthly_roster_resource)
+
+    def resource_args(self):
+        month_start = date_from_url(self.kwargs)
+        return month_start.year, month_start.month
+
+
+class DailyDetailApiView(RosterApiView):
+    resource = staticmethod(daily_resource)
+
+    def resource_args(self):
+        return (date_from_url(self.kwargs),)
+
+
+class MyScheduleApiView(RosterApiView):
+    resource = staticmethod(schedule_resource)
+
+    def resource_args(self):
+        return self.request.user, datetime.date.today()
+
+
+class StaffLookupView(LoginRequiredMixin, ManagerRequiredMixin, View):
+    """JSON search behind the staff pickers: ``q``, ``role``, ``group``, ``cursor``, ``limit``."""
+
+    def get(self, request, *args, **kwargs):
+        role = request.GET.get('role') or None
+        group = request.GET.get('group') or None
+        limit = request.GET.get('limit') or PAGE_SIZE
+        if role and role not in User.Role.values:
+            return JsonResponse({'error': 'Unknown role.'}, status=400)
+        if (group and not group.isdigit()) or not str(limit).isdigit():
+            return JsonResponse({'error': 'group and limit must be numbers.'}, status=400)
+        try:
+            page = search_staff(
+                request.GET.get('q', '').strip(),
+                role=role,
+                group=group,
+                cursor=request.GET.get('cursor') or None,
+                per_page=min(max(int(limit), 1), MAX_PAGE_SIZE),
+            )
+        except InvalidCursor as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        return JsonResponse({
+            'results': [
+                {
+                    'id': member.pk,
+                    'name': staff_label(member),
+                    'employee_id': member.employee_id,
+                    'role': member.role,
+                }
+                for member in page.items
+            ],
+            'next': page.next_cursor,
+        })
 
 
 class StaffAnalyticsView(LoginRequiredMixin, ManagerRequiredMixin, DetailView):
@@ -499,54 +677,37 @@ class StaffAnalyticsView(LoginRequiredMixin, ManagerRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        staff_member = self.get_object()
+        staff_member = self.object
 
         year = self.kwargs.get("year")
         month = self.kwargs.get("month")
-        current_date = datetime.date(year, month, 1)
+        period = resolve_period(year, month, self.request.GET.get("period", "month"))
 
-        context["previous_month"] = current_date - relativedelta(months=1)
-        context["next_month"] = current_date + relativedelta(months=1)
+        context["period"] = period
+        context["periods"] = list(PERIOD_MONTHS)
+        context["previous_month"] = period.previous
+        context["next_month"] = period.next
         context["month_name"] = calendar.month_name[month]
         context["year"] = year
+        context["month"] = month
 
         shifts = Shift.objects.filter(
-            staff=staff_member, date__year=year, date__month=month
+            staff=staff_member, date__range=(period.start, period.end)
+        ).select_related("shift_type").prefetch_related(
+            "assignments", "sub_assignments", "clinics", "emergency_roles"
         ).order_by("date")
 
         context["shift_history"] = shifts
 
-        monthly_assignments = MonthlyAssignment.objects.filter(
-            staff=staff_member, 
-            start_date__year=year, 
-            start_date__month=month
-        ).select_related('task')
-
-        shift_type_counts = Counter()
-        assignment_counts = Counter()
-        sub_assignment_counts = Counter()
-        clinic_counts = Counter()
-        emergency_role_counts = Counter()
-        monthly_task_counts = Counter(ma.task.name for ma in monthly_assignments)
-        
-
-        for shift in shifts:
-            shift_type_counts[shift.shift_type.name] += 1
-            for assignment in shift.assignments.all():
-                assignment_counts[assignment.name] += 1
-            for sub_assignment in shift.sub_assignments.all():
-                sub_assignment_counts[sub_assignment.name] += 1
-            for clinic in shift.clinics.all():
-                clinic_counts[clinic.name] += 1
-            for emergency_role in shift.emergency_roles.all():
-                emergency_role_counts[emergency_role.name] += 1
+        counts = staff_activity_counts(staff_member, period.start, period.end)
+        shift_type_counts = counts["shift_types"]
 
         context["shift_type_counts"] = dict(shift_type_counts)
-        context["assignment_counts"] = dict(assignment_counts)
-        context["sub_assignment_counts"] = dict(sub_assignment_counts)
-        context["clinic_counts"] = dict(clinic_counts)
-        context["emergency_role_counts"] = dict(emergency_role_counts)
-        context['monthly_task_counts'] = dict(monthly_task_counts)
+        context["assignment_counts"] = dict(counts["main"])
+        context["sub_assignment_counts"] = dict(counts["sub"])
+        context["clinic_counts"] = dict(counts["clinic"])
+        context["emergency_role_counts"] = dict(counts["emergency"])
+        context['monthly_task_counts'] = dict(counts["monthly_tasks"])
 
         chart_labels = list(shift_type_counts.keys())
         chart_data = list(shift_type_counts.values())
@@ -555,17 +716,26 @@ class StaffAnalyticsView(LoginRequiredMixin, ManagerRequiredMixin, DetailView):
         context["chart_data_json"] = json.dumps(chart_data)
 
         return context
-class MonthlyAssignmentListView(LoginRequiredMixin, ManagerRequiredMixin, ListView):
+class MonthlyAssignmentListView(LoginRequiredMixin, ManagerRequiredMixin, KeysetPaginationMixin, ListView):
     model = MonthlyAssignment
     template_name = 'monthlyassignment_list.html'
     context_object_name = 'assignments'
-    ordering = ['-start_date']
+    # Newest first; matches the (start_date, end_date) index, which ends in the row id.
+    keyset = ('-start_date', '-end_date', '-pk')
+
+    def get_queryset(self):
+        self.filter_form = MonthlyAssignmentFilterForm(self.request.GET)
+        return self.filter_form.filter(
+            MonthlyAssignment.objects.select_related('staff', 'task', 'group', 'committee')
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         today = datetime.date.today()
         context['year'] = today.year
         context['month'] = today.month
+        context['month_name'] = calendar.month_name[today.month]
+        context['filter_form'] = self.filter_form
         return context
 
 class MonthlyAssignmentDisplayView(LoginRequiredMixin, TemplateView):
@@ -585,14 +755,27 @@ class MonthlyAssignmentDisplayView(LoginRequiredMixin, TemplateView):
         context['previous_month'] = current_date - relativedelta(months=1)
         context['next_month'] = current_date + relativedelta(months=1)
 
-        monthly_assignments = MonthlyAssignment.objects.filter(
-            start_date__lte=month_end,
-            end_date__gte=month_start
-        ).select_related('staff', 'task').order_by('task__name')
-
-        context['monthly_assignments'] = monthly_assignments
+        context['assignments_html'] = roster_cache.month(
+            year, month, 'monthly_assignments_html',
+            lambda: self.render_assignments(year, month, month_start, month_end)
+        )
         return context
 
+    def render_assignments(self, year, month, month_start, month_end):
+        monthly_assignments = roster_cache.month(
+            year, month, 'monthly_assignments',
+            lambda: list(
+                MonthlyAssignment.objects.filter(
+                    start_date__lte=month_end,
+                    end_date__gte=month_start
+                ).select_related('staff', 'task', 'group', 'committee').order_by('task__name')
+            )
+        )
+        return render_to_string(
+            'monthly_assignment_display_list.html',
+            {'monthly_assignments': monthly_assignments}
+        )
+
 class MonthlyAssignmentTodayRedirectView(RedirectView):
     def get_redirect_url(self, *args, **kwargs):
         today = datetime.date.today()
@@ -615,67 +798,65 @@ class MonthlyAssignmentBulkAssignView(LoginRequiredMixin, ManagerRequiredMixin,
         
         groups = AssignmentGroup.objects.prefetch_related('staff_members').order_by('name')
         
-        context['all_tasks'] = MonthlyTask.objects.all().order_by('name')
-        context['all_committees'] = Committee.objects.all().order_by('name')
-        
-        existing_assignments = MonthlyAssignment.objects.filter(
-            start_date=month_start, end_date=month_end
-        ).select_related('task', 'committee')
+        context['all_tasks'] = catalog('monthly_tasks').items
+        context['all_committees'] = catalog('committees').items
         
-        assignment_map = {}
-        for assign in existing_assignments:
-            if assign.staff_id not in assignment_map:
-                assignment_map[assign.staff_id] = {'tasks': [], 'committees': []}
-            assignment_map[assign.staff_id]['tasks'].append(assign.task_id)
-            if assign.committee_id:
-                assignment_map[assign.staff_id]['committees'].append(assign.committee_id)
-        
-        context['assignment_map'] = assignment_map
+        if 'assignment_map' not in kwargs:
+            existing_assignments = MonthlyAssignment.objects.filter(
+                start_date=month_start, end_date=month_end
+            ).select_related('task', 'committee')
+
+            assignment_map = {}
+            for assign in existing_assignments:
+                if assign.staff_id not in assignment_map:
+                    assignment_map[assign.staff_id] = {'tasks': [], 'committees': []}
+                assignment_map[assign.staff_id]['tasks'].append(assign.task_id)
+                if assign.committee_id:
+                    assignment_map[assign.staff_id]['committees'].append(assign.committee_id)
+            context['assignment_map'] = assignment_map
+        context.setdefault('invalid_staff', set())
         context['groups'] = groups
+        context['idempotency_key'] = uuid.uuid4().hex
         return context
 
     def post(self, request, *args, **kwargs):
         year = self.kwargs.get('year')
         month = self.kwargs.get('month')
-        _, last_day = calendar.monthrange(year, month)
-        month_start = datetime.date(year, month, 1)
-        month_end = datetime.date(year, month, last_day)
 
-        MonthlyAssignment.objects.filter(start_date=month_start, end_date=month_end).delete()
-
-        all_staff = User.objects.filter(is_active=True)
-        for staff in all_staff:
-            task_ids = request.POST.getlist(f'tasks_{staff.id}')
-            committee_ids = request.POST.getlist(f'committees_{staff.id}')
-
-            group_id = request.POST.get(f'group_{staff.id}')
-
-            if not task_ids and not committee_ids:
-                continue
-
-            if not task_ids:
-                MonthlyAssignment.objects.create(
-                    staff=staff,
-                    task=None,
-                    start_date=month_start,
-                    end_date=month_end,
-                    group_id=group_id if group_id else None,
-                    committee_id=committee_ids[0] if committee_ids else None
-                )
-            else:
-                for task_id in task_ids:
-                    MonthlyAssignment.objects.create(
-                        staff=staff,
-                        task_id=task_id,
-                        start_date=month_start,
-                        end_date=month_end,
-                        group_id=group_id if group_id else None,
-                        committee_id=committee_ids[0] if committee_ids else None,
-                        status=AssignmentStatus.PENDING
-                    )
-        
-        messages.success(request, f"Monthly assignments for {calendar.month_name[month]} {year} saved.")
-        return redirect('main_app:monthly_assignment_display', year=year, month=month)
+        selections = {}
+        for staff_id in User.objects.filter(is_active=True).values_list('pk', flat=True):
+            task_ids = request.POST.getlist(f'tasks_{staff_id}')
+            committee_ids = request.POST.getlist(f'committees_{staff_id}')
+            group_id = request.POST.get(f'group_{staff_id}')
+            if task_ids or committee_ids:
+                selections[str(staff_id)] = {
+                    'tasks': [int(task_id) for task_id in task_ids],
+                    'committees': [int(committee_id) for committee_id in committee_ids],
+                    'group': int(group_id) if group_id else None,
+                }
+
+        invalid_staff = committees_without_tasks(selections)
+        if invalid_staff:
+            # Sent back with the submitted choices, so nothing has to be re-entered.
+            messages.error(
+                request,
+                "A committee needs at least one monthly task. Choose a task for the "
+                "highlighted staff, or clear their committee.",
+            )
+            assignment_map = {int(staff_id): selection for staff_id, selection in selections.items()}
+            return self.render_to_response(
+                self.get_context_data(assignment_map=assignment_map, invalid_staff=invalid_staff)
+            )
+
+        job = submit(
+            'save_monthly_assignments',
+            {'year': year, 'month': month, 'selections': selections},
+            idempotency_key=request.POST.get('idempotency_key') or None,
+            user=request.user,
+        )
+        return redirect_to_job(
+            job, reverse('main_app:monthly_assignment_display', kwargs={'year': year, 'month': month})
+        )
 
 class MonthlyAssignmentCreateView(LoginRequiredMixin, ManagerRequiredMixin, CreateView):
     model = MonthlyAssignment
@@ -697,34 +878,43 @@ class MonthlyAssignmentDeleteView(LoginRequiredMixin, ManagerRequiredMixin, Dele
 class ChecklistView(LoginRequiredMixin, TemplateView):
     template_name = 'checklist.html'
 
+    def get_leader_shift(self):
+        return Shift.objects.filter(
+            staff=self.request.user,
+            date=datetime.date.today(),
+            assignments__name__icontains='Team Leader'
+        ).select_related('shift_type').first()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         today = datetime.date.today()
         team_leader = self.request.user
 
-        leader_shifts = Shift.objects.filter(staff=team_leader, date=today, assignments__name__icontains='Team Leader')
+        leader_shift = self.get_leader_shift()
 
         shifts_to_assess = Shift.objects.none()
 
-        if leader_shifts.exists():
-            leader_shift_type = leader_shifts.first().shift_type
+        if leader_shift:
             shifts_to_assess = Shift.objects.filter(
                 date=today,
-                shift_type=leader_shift_type
-            ).exclude(staff=team_leader).select_related('staff')
+                shift_type=leader_shift.shift_type
+            ).exclude(staff=team_leader).select_related('staff').prefetch_related(
+                'assignments', 'sub_assignments'
+            )
 
         context['shifts_to_assess'] = shifts_to_assess
-        context['is_team_leader_today'] = leader_shifts.exists()
+        context['is_team_leader_today'] = leader_shift is not None
         return context
 
     def post(self, request, *args, **kwargs):
-        for key, value in request.POST.items():
-            if key.startswith('status_'):
-                shift_id = key.split('_')[1]
-                shift = Shift.objects.get(id=shift_id)
-                shift.status = value
-                shift.team_leader_notes = request.POST.get(f'notes_{shift_id}', '')
-                shift.save()
+        leader_shift = self.get_leader_shift()
+        if leader_shift:
+            apply_checklist(
+                parse_checklist(request.POST),
+                date=leader_shift.date,
+                shift_type=leader_shift.shift_type,
+                exclude_staff=request.user,
+            )
 
         messages.success(request, "Checklist saved successfully!")
         return redirect('main_app:checklist')
@@ -755,17 +945,7 @@ class ManagerReviewView(LoginRequiredMixin, ManagerRequiredMixin, TemplateView):
 
         view_date = datetime.datetime.strptime(date_str, '%Y-%m-%d').date()
 
-        for key, value in request.POST.items():
-            if key.startswith('status_'):
-                shift_id = key.split('_')[1]
-                shift = Shift.objects.get(id=shift_id)
-                shift.status = value
-                shift.team_leader_notes = request.POST.get(f'notes_{shift_id}', '')
-                
-                if f'approve_{shift_id}' in request.POST:
-                    shift.is_approved_by_manager = True
-                
-                shift.save()
+        apply_checklist(parse_checklist(request.POST, with_approval=True), date=view_date)
         
         messages.success(request, f"Checklist for {view_date} has been updated and approved.")
         return redirect(f"{reverse('main_app:manager_review')}?date={date_str}")
@@ -785,14 +965,9 @@ class AppraisalAnalyticsView(LoginRequiredMixin, ManagerRequiredMixin, TemplateV
             context['selected_staff'] = staff
             context['date_range'] = (start_date, end_date)
 
-            daily_shifts = Shift.objects.filter(
-                staff=staff,
-                date__range=(start_date, end_date),
-                status__in=['COMPLETED', 'PARTIAL', 'NOT_COMPLETED']
-            )
-            daily_status_counts = Counter(s.status for s in daily_shifts)
+            daily_status_counts = shift_status_counts(staff, start_date, end_date)
             
-            total_daily = daily_shifts.count()
+            total_daily = sum(daily_status_counts.values())
             completed_daily = daily_status_counts.get('COMPLETED', 0)
             daily_completion_percent = (completed_daily / total_daily * 100) if total_daily > 0 else 0
             
@@ -806,9 +981,9 @@ class AppraisalAnalyticsView(LoginRequiredMixin, ManagerRequiredMixin, TemplateV
                 start_date__lte=end_date,
                 status__in=['COMPLETED', 'PARTIAL', 'NOT_COMPLETED']
             )
-            monthly_status_counts = Counter(ma.status for ma in monthly_assignments)
+            monthly_status_counts = status_counts(monthly_assignments)
 
-            total_monthly = monthly_assignments.count()
+            total_monthly = sum(monthly_status_counts.values())
             completed_monthly = monthly_status_counts.get('COMPLETED', 0)
             monthly_completion_percent = (completed_monthly / total_monthly * 100) if total_monthly > 0 else 0
 
@@ -816,4 +991,132 @@ class AppraisalAnalyticsView(LoginRequiredMixin, ManagerRequiredMixin, TemplateV
             context['monthly_chart_labels'] = json.dumps(list(monthly_status_counts.keys()))
             context['monthly_chart_data'] = json.dumps(list(monthly_status_counts.values()))
 
-        return context
\ No newline at end of file
+        return context
+
+class AppraisalBatchView(LoginRequiredMixin, ManagerRequiredMixin, TemplateView):
+    template_name = 'appraisal_batch.html'
+    sort_keys = {
+        'name': lambda row: row.staff.get_full_name().lower(),
+        'daily': lambda row: row.daily_percent,
+        'daily_total': lambda row: row.daily_total,
+        'monthly': lambda row: row.monthly_percent,
+        'monthly_total': lambda row: row.monthly_total,
+    }
+
+    def get(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
+        if request.GET.get('format') == 'csv' and 'rows' in context:
+            return self.render_csv(context)
+        return self.render_to_response(context)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = AppraisalBatchForm(self.request.GET or None)
+        context['form'] = form
+
+        if form.is_valid():
+            start_date = form.cleaned_data['start_date']
+            end_date = form.cleaned_data['end_date']
+            group = form.cleaned_data['group']
+            staff = User.objects.filter(is_active=True)
+            if group:
+                staff = staff.filter(assignment_group=group)
+
+            sort = self.request.GET.get('sort', 'name')
+            if sort.lstrip('-') not in self.sort_keys:
+                sort = 'name'
+            rows = sorted(
+                appraisal_rows(staff, start_date, end_date),
+                key=self.sort_keys[sort.lstrip('-')],
+                reverse=sort.startswith('-'),
+            )
+
+            query = self.request.GET.copy()
+            query.pop('sort', None)
+            query.pop('format', None)
+            context['rows'] = rows
+            context['sort'] = sort
+            context['query'] = query.urlencode()
+            context['group'] = group
+            context['date_range'] = (start_date, end_date)
+            context['statuses'] = ASSESSED_STATUSES
+        return context
+
+    def render_csv(self, context):
+        start_date, end_date = context['date_range']
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = (
+            f'attachment; filename="appraisal_{start_date}_{end_date}.csv"'
+        )
+        statuses = context['statuses']
+        writer = csv.writer(response)
+        writer.writerow(
+            ['Staff', 'Employee ID', 'Role']
+            + [f'Daily {status.label}' for status in statuses]
+            + ['Daily Assessed', 'Daily Completion %']
+            + [f'Monthly {status.label}' for status in statuses]
+            + ['Monthly Assessed', 'Monthly Completion %']
+        )
+        for row in context['rows']:
+            writer.writerow(
+                [row.staff.get_full_name(), row.staff.employee_id or '', row.staff.get_role_display()]
+                + [row.daily.get(status.value, 0) for status in statuses]
+                + [row.daily_total, row.daily_percent]
+                + [row.monthly.get(status.value, 0) for status in statuses]
+                + [row.monthly_total, row.monthly_percent]
+            )
+        return response
+
+
+class JobAccessMixin(UserPassesTestMixin):
+    def test_func(self):
+        job = self.get_object()
+        return self.request.user.role == "MANAGER" or job.created_by_id == self.request.user.pk
+
+
+class JobStatusView(LoginRequiredMixin, JobAccessMixin, DetailView):
+    model = Job
+    template_name = 'job_status.html'
+    context_object_name = 'job'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        next_url = self.request.GET.get('next', '')
+        if url_has_allowed_host_and_scheme(next_url, allowed_hosts={self.request.get_host()}):
+            context['next_url'] = next_url
+        return context
+
+
+class RosterPdfDownloadView(LoginRequiredMixin, JobAccessMixin, DetailView):
+    model = Job
+
+    def render_to_response(self, context, **response_kwargs):
+        job = self.object
+        if job.kind != "export_roster_pdf" or job.status != Job.Status.SUCCEEDED:
+            raise Http404("This export is not ready.")
+        filename = Path(job.result["file"]).name
+        try:
+            pdf_file = open(Path(settings.EXPORT_DIR) / filename, "rb")
+        except FileNotFoundError:
+            raise Http404("This export is no longer available.")
+        return FileResponse(
+            pdf_file, as_attachment=True, filename=filename, content_type="application/pdf"
+        )
+
+
+class JobPollView(LoginRequiredMixin, JobAccessMixin, DetailView):
+    model = Job
+
+    def render_to_response(self, context, **response_kwargs):
+        job = self.object
+        return JsonResponse({
+            'id': job.pk,
+            'kind': job.kind,
+            'status': job.status,
+            'progress': job.progress,
+            'total': job.total,
+            'attempts': job.attempts,
+            'finished': job.is_finished,
+            'result': job.result,
+            'error': job.error.strip().splitlines()[-1] if job.error else '',
+        })